@@ -1,22 +1,24 @@
 import os
-import json
 import shutil
 import asyncio
 import time  # <--- Added for rate limiting
 from collections import deque # <--- Added for rate limiting
 from uuid import uuid4
 import pandas as pd
-import urllib.parse
 from datetime import datetime
-from collections import Counter
 from flask import Flask, render_template, request, redirect, url_for, session, flash, jsonify
-
-from twikit import Client
+from flask.json.provider import JSONProvider
 
 # Import your existing modules
-from core.bot import update_from_trends, twikit_login
-from core.configs import NEWS_DATA_STORE_DIR
+from core.bot import update_from_trends
+from core.configs import NEWS_DATA_STORE_DIR, FEED_PAGE_SIZE, FEED_MAX_PAGE_SIZE
 from core.colored import cprint, Colors
+from core import serde
+from core.store import news_store
+from core.feed_cache import FeedCache
+from core.search_index import search_index
+from core.x_session import x_session
+from core.utils import clean_sources, normalize_tag, with_display_fields
 
 # --- RATE LIMIT CONFIG ---
 RATE_LIMIT_MAX = 2         # Max requests
@@ -24,26 +26,26 @@ RATE_LIMIT_WINDOW = 600     # Time window in seconds (10 minutes)
 # Stores timestamps of recent requests
 update_request_history = deque()
 
+
+
+class ORJSONProvider(JSONProvider):
+    """Routes jsonify / request.json through core.serde (orjson)."""
+
+    def dumps(self, obj, **kwargs):
+        return serde.dumps_str(obj)
+
+    def loads(self, s, **kwargs):
+        return serde.loads(s)
+
+
 app = Flask(__name__)
+app.json = ORJSONProvider(app)
 app.secret_key = str(uuid4())
 
 
 # --- HELPERS ---
 
 
-def safe_parse_timestamp(ts_str):
-    if not ts_str:
-        return datetime.now()
-    try:
-        return datetime.fromisoformat(ts_str)
-    except Exception:
-        try:
-            clean_ts = ts_str.split('+')[0].split('.')[0].replace('Z', '')
-            return datetime.strptime(clean_ts, "%Y-%m-%dT%H:%M:%S")
-        except:
-            return datetime.now()
-
-
 def get_relative_time(dt):
     if dt.tzinfo is not None and dt.tzinfo.utcoffset(dt) is not None:
         now = datetime.now(dt.tzinfo)
@@ -64,81 +66,55 @@ def get_relative_time(dt):
     return dt.strftime("%Y-%m-%d")
 
 
-def to_bold_unicode(text):
-    if not text:
-        return ""
-    normal = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789"
-    bold = "𝗔𝗕𝗖𝗗𝗘𝗙𝗚𝗛𝗜𝗝𝗞𝗟𝗠𝗡𝗢𝗣𝗤𝗥𝗦𝗧𝗨𝗩𝗪𝗫𝗬𝗭𝗮𝗯𝗰𝗱𝗲𝗳𝗴𝗵𝗶𝗷𝗸𝗹𝗺𝗻𝗼𝗽𝗾𝗿𝘀𝘁𝘂𝘃𝘄𝘅𝘆𝘇𝟬𝟭𝟮𝟯𝟰𝟱𝟲𝟕𝟴𝟵"
-    return text.translate(str.maketrans(normal, bold))
+def build_record(data):
+    data = with_display_fields(data)
+    return {
+        "id": data.get("id"),
+        "headline": data.get("headline_str") or "Untitled",
+        "content": data.get("content_str") or "",
+        "tags": data["display_tags_list"],
+        "sources": clean_sources(data.get("source_list", [])),
+        "datetime": datetime.fromtimestamp(data["timestamp_epoch"]),
+        "fmt_time": data["fmt_time_str"],
+        "x_link": data["x_intent_url"]
+    }
 
 
-def load_data():
-    items = []
-    if not os.path.exists(NEWS_DATA_STORE_DIR):
-        return []
+feed_cache = FeedCache(build_record)
 
-    folders = os.listdir(NEWS_DATA_STORE_DIR)
-    for folder in folders:
-        folder_path = os.path.join(NEWS_DATA_STORE_DIR, folder)
-        json_path = os.path.join(folder_path, "data.json")
-
-        if not os.path.exists(json_path):
-            continue
 
-        try:
-            with open(json_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-
-            item_id = data.get("id", folder)
-            dt = safe_parse_timestamp(data.get("timestamp_str"))
-
-            # Tags
-            raw_tags = data.get("tags_list", [])
-            if isinstance(raw_tags, str):
-                raw_tags = raw_tags.split()
-            tags = [str(t).replace("#", "").strip() for t in raw_tags if t]
-
-            # Sources
-            raw_sources = data.get("source_list", [])
-            if isinstance(raw_sources, str):
-                raw_sources = raw_sources.split()
-            sources = [str(s) for s in raw_sources if s]
-
-            # Twitter Intent
-            headline = data.get("headline_str") or "Untitled"
-            content = data.get("content_str") or ""
-            tweet_body = f"{to_bold_unicode(headline)}\n\n{content}\n\n" + \
-                " ".join([f"#{t}" for t in tags])
-            x_intent = "https://x.com/intent/tweet?text=" + \
-                urllib.parse.quote(tweet_body)
-
-            items.append({
-                "id": item_id,
-                "headline": headline,
-                "content": content,
-                "tags": tags,
-                "sources": sources,
-                "datetime": dt,
-                "display_time": get_relative_time(dt),
-                "fmt_time": dt.strftime('%b %d, %I:%M %p'),
-                "x_link": x_intent
-            })
-        except Exception as e:
-            print(f"Skipped {folder}: {e}")
+def parse_page_size(value):
+    try:
+        return max(1, min(int(value), FEED_MAX_PAGE_SIZE))
+    except (TypeError, ValueError):
+        return FEED_PAGE_SIZE
+
+
+def load_page(cursor=None, tag=None, search=None, limit=FEED_PAGE_SIZE):
+    """One page of feed records (newest first) and the cursor for the next one."""
+    feed_cache.refresh()
+    if search:
+        # Ranked by relevance; the cursor is the rank offset of the next page
+        offset = int(cursor) if cursor else 0
+        allowed = news_store.ids_for_tag(tag) if tag else None
+        ids, total = search_index.search(search, limit=limit, offset=offset, allowed=allowed)
+        next_cursor = str(offset + limit) if offset + limit < total else None
+    else:
+        ids, next_cursor = news_store.page(limit=limit, cursor=cursor, tag=tag)
+    items = []
+    for item_id in ids:
+        record = feed_cache.get(item_id)
+        if record is None:
             continue
-
-    # Sort items (Newest first)
-    items.sort(key=lambda x: x['datetime'], reverse=True)
-    return items
+        # Only the relative label depends on "now"; everything else is cached per item
+        items.append(dict(record, display_time=get_relative_time(record["datetime"])))
+    return items, next_cursor
 
 # --- ROUTES ---
 
 
 @app.route('/')
 def index():
-    # Load Data
-    items = load_data()
-
     # Session Keywords Defaults
     DEFAULT_KEYWORDS = ["#BreakingNews", "#Karnataka", "#news", "#india"]
 
@@ -147,32 +123,95 @@ def index():
     elif not session['trending_keywords']:  # If list exists but is empty
         session['trending_keywords'] = DEFAULT_KEYWORDS
 
-    # Stats & Tags
-    all_tags = [t for item in items for t in item["tags"]]
-    tag_counts = Counter(all_tags).most_common(20)
-    unique_topics = len(set(all_tags))
-
-    # Backend Filtering (Optional now that we have frontend search, but good for deep linking)
-    search_query = request.args.get('search', '').lower()
+    # Backend Filtering: tag + search are applied server-side, one page at a time
+    search_query = request.args.get('search', '').strip()
     selected_tag = request.args.get('tag', 'All')
+    page_size = parse_page_size(request.args.get('limit'))
+    tag = None if selected_tag == "All" else selected_tag
 
-    if selected_tag != "All":
-        items = [i for i in items if selected_tag in i['tags']]
+    items, next_cursor = load_page(tag=tag, search=search_query, limit=page_size)
 
-    # We return ALL items for the search query to allow JS realtime filtering
-    # But if a tag is selected, we only return those tagged items.
+    # Stats & Tags (maintained aggregates, no per-request recount)
+    tag_counts = news_store.tag_counts(20)
+    unique_topics = news_store.unique_tag_count()
 
     return render_template('index.html',
                            items=items,
-                           news_count=len(items),
+                           next_cursor=next_cursor,
+                           page_size=page_size,
+                           news_count=news_store.count(tag=tag),
                            topics_count=unique_topics,
                            tag_counts=tag_counts,
                            selected_tag=selected_tag,
+                           selected_tag_key=normalize_tag(selected_tag) if tag else None,
                            keywords=session['trending_keywords'],
                            search_query=search_query,
                            store_dir=os.path.abspath(NEWS_DATA_STORE_DIR))
 
 
+@app.route('/api/feed')
+def feed_page():
+    """Next page of rendered cards for infinite scroll and server-side search."""
+    selected_tag = request.args.get('tag', 'All')
+    try:
+        items, next_cursor = load_page(
+            cursor=request.args.get('cursor') or None,
+            tag=None if selected_tag == "All" else selected_tag,
+            search=request.args.get('search', '').strip(),
+            limit=parse_page_size(request.args.get('limit'))
+        )
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+
+    return jsonify({
+        "status": "success",
+        "html": render_template('_news_cards.html', items=items),
+        "count": len(items),
+        "next_cursor": next_cursor
+    })
+
+
+@app.route('/search')
+def search():
+    """Ranked full-text search over headlines, content and tags (JSON)."""
+    query = request.args.get('q', '').strip()
+    selected_tag = request.args.get('tag', 'All')
+    limit = parse_page_size(request.args.get('limit'))
+    try:
+        offset = max(0, int(request.args.get('offset', 0)))
+    except ValueError:
+        return jsonify({"status": "error", "message": "offset must be an integer"}), 400
+
+    t0 = time.perf_counter()
+    feed_cache.refresh()
+    allowed = news_store.ids_for_tag(selected_tag) if selected_tag != "All" else None
+    ids, total = search_index.search(query, limit=limit, offset=offset, allowed=allowed)
+    took_ms = (time.perf_counter() - t0) * 1000
+
+    results = []
+    for item_id in ids:
+        record = feed_cache.get(item_id)
+        if record is None:
+            continue
+        results.append({
+            "id": record["id"],
+            "headline": record["headline"],
+            "content": record["content"],
+            "tags": record["tags"],
+            "fmt_time": record["fmt_time"],
+            "display_time": get_relative_time(record["datetime"]),
+            "x_link": record["x_link"]
+        })
+
+    return jsonify({
+        "status": "success",
+        "query": query,
+        "total": total,
+        "took_ms": round(took_ms, 2),
+        "results": results
+    })
+
+
 @app.route('/keyword/add', methods=['POST'])
 def add_keyword():
     kw = request.form.get('keyword')
@@ -212,10 +251,7 @@ def edit_keyword():
 @app.route('/update-trends', methods=['POST'])
 def update_trends():
     global update_request_history
-    
-    client = Client('en-US')
-    asyncio.run(twikit_login(client))
-    
+
     now = time.time()
     while update_request_history and update_request_history[0] < now - RATE_LIMIT_WINDOW:
         update_request_history.popleft()
@@ -231,9 +267,10 @@ def update_trends():
         flash("Please add at least one keyword.")
         return redirect(url_for('index'))
 
-    # Call bot function (it handles its own client now)
+    # Runs on the shared, already logged-in X session
     print(f"[keywords] {kws}")
-    asyncio.run(update_from_trends(client=client, keywords=kws))
+    x_session.run(lambda client: update_from_trends(client=client, keywords=kws))
+    feed_cache.invalidate()
 
     flash("Maal Updated Successfully!")
     return redirect(url_for('index'))
@@ -241,13 +278,21 @@ def update_trends():
 
 @app.route('/delete/<item_id>')
 def delete_item(item_id):
-    target_path = os.path.join(NEWS_DATA_STORE_DIR, item_id)
+    try:
+        target_path = news_store.item_folder(item_id)
+    except ValueError as e:
+        flash(f"Error deleting: {e}")
+        return redirect(url_for('index'))
+    # folder first: if it cannot be removed, the item stays indexed and visible
     if os.path.exists(target_path):
         try:
             shutil.rmtree(target_path)
-            flash("Item deleted.")
         except Exception as e:
             flash(f"Error deleting: {e}")
+            return redirect(url_for('index'))
+        flash("Item deleted.")
+    news_store.delete(item_id)
+    feed_cache.invalidate()
     return redirect(url_for('index'))
 
 
@@ -0,0 +1,80 @@
+# search benchmark
+
+"""
+Query latency of core.search_index over a synthetic corpus (target: under
+10 ms per query at 100k items). Items mix a Zipf-distributed vocabulary with
+a handful of topical words, so common terms match tens of thousands of items.
+Each query runs once to warm up, then the best of `repeat` runs is reported.
+
+    python -m benchmarks.search_bench [n_items]
+"""
+
+import sys
+import time
+import random
+import itertools
+
+from core.search_index import SearchIndex
+from core.utils import new_item_id
+
+TARGET_MS = 10.0
+TOPICAL = ["india", "cricket", "bengaluru", "government", "minister", "election", "karnataka",
+           "rain", "traffic", "police", "market", "startup", "indian", "industry", "indore"]
+QUERIES = ["india", "cricket", "minister", "india cricket", "bengaluru government minister",
+           "ind", "karnataka rain traffic", "police ind", "word123", "startup market india"]
+
+
+class _MemoryStore:
+    """Just enough of NewsStore for SearchIndex: items to index, no listeners."""
+
+    def __init__(self, items):
+        self.items = items
+
+    def add_listener(self, listener):
+        pass
+
+    def iter_items(self):
+        for data in self.items:
+            yield 0.0, data
+
+
+def make_corpus(n, seed=7):
+    rng = random.Random(seed)
+    vocab = [f"word{i}" for i in range(20_000)]
+    cum_weights = list(itertools.accumulate(1 / (i + 1) for i in range(len(vocab))))
+
+    def words(k):
+        picked = rng.choices(vocab, cum_weights=cum_weights, k=k)
+        picked += rng.sample(TOPICAL, rng.randint(1, 4))
+        rng.shuffle(picked)
+        return " ".join(picked)
+
+    return [{
+        "id": new_item_id(),
+        "headline_str": words(8),
+        "content_str": words(60),
+        "tags_list": [f"#{w}" for w in rng.sample(TOPICAL, 2)],
+    } for _ in range(n)]
+
+
+def main(n=100_000, repeat=5):
+    t0 = time.perf_counter()
+    index = SearchIndex(store=_MemoryStore(make_corpus(n)))
+    index.ensure_loaded()
+    print(f"{n} items, corpus + index built in {time.perf_counter() - t0:.1f}s")
+
+    worst = 0.0
+    for query in QUERIES:
+        index.search(query)  # warm-up
+        best = float("inf")
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            ids, total = index.search(query)
+            best = min(best, time.perf_counter() - t0)
+        worst = max(worst, best)
+        print(f"{query!r:34} {best * 1000:6.2f} ms   {total:6} hits")
+    print(f"slowest {worst * 1000:.2f} ms (target {TARGET_MS:.0f} ms): {'ok' if worst * 1000 < TARGET_MS else 'MISSED'}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,78 @@
+# serialization benchmark
+
+"""
+Per-item save/load cost of the old stdlib path (json.dump(indent=4) /
+json.load on text files) against core.serde (compact orjson bytes).
+
+    python -m benchmarks.serde_bench [n_items]
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+
+from core import serde
+from core.utils import new_item_id, derive_display_fields
+
+
+def make_item(i):
+    data = {
+        "id": new_item_id(),
+        "headline_str": f"ಬೆಂಗಳೂರು ನಗರದಲ್ಲಿ ಭಾರೀ ಮಳೆ - ಸುದ್ದಿ {i}",
+        "content_str": "ನಗರದ ಹಲವು ಭಾಗಗಳಲ್ಲಿ ಸಂಚಾರ ದಟ್ಟಣೆ ಉಂಟಾಗಿದೆ. " * 12,
+        "tags_list": ["#ಮಳೆ", "#ಬೆಂಗಳೂರು", f"#tag{i % 50}"],
+        "sources_list": [f"https://x.com/user/status/{10**17 + i}"],
+        "timestamp_str": "2026-10-17T10:00:00+05:30",
+    }
+    data.update(derive_display_fields(data))
+    return data
+
+
+def stdlib_save(path, data):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=4)
+
+
+def stdlib_load(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def run(label, items, root, save, load):
+    paths = [os.path.join(root, f"{i}.json") for i in range(len(items))]
+    t0 = time.perf_counter()
+    for path, data in zip(paths, items):
+        save(path, data)
+    t_save = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for path in paths:
+        load(path)
+    t_load = time.perf_counter() - t0
+
+    size = sum(os.path.getsize(p) for p in paths)
+    n = len(items)
+    print(f"{label:8} save {t_save * 1e6 / n:7.1f} us/item   load {t_load * 1e6 / n:7.1f} us/item   "
+          f"{size / n:7.0f} B/item")
+    return t_save, t_load
+
+
+def main(n=50_000):
+    items = [make_item(i) for i in range(n)]
+    root = tempfile.mkdtemp(prefix="serde_bench_")
+    try:
+        os.makedirs(os.path.join(root, "stdlib"))
+        os.makedirs(os.path.join(root, "orjson"))
+        print(f"{n} items")
+        s_save, s_load = run("stdlib", items, os.path.join(root, "stdlib"), stdlib_save, stdlib_load)
+        o_save, o_load = run("orjson", items, os.path.join(root, "orjson"), serde.write_json, serde.read_json)
+        print(f"speedup  save {s_save / o_save:.1f}x   load {s_load / o_load:.1f}x")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50_000)
@@ -1,21 +1,30 @@
 import os
-import json
 import asyncio
-import time
 
 from twikit import Client
 
 from core.configs import (
     COOKIES_PATH,
-    NEWS_FETCH_INTERVAL,
+    POLL_BUDGET,
+    PIPELINE_GENERATE_WORKERS,
+    GENERATE_BATCH_SIZE,
 )
 from core.news_engine import NewsEngine
-from core.llms import get_llm_response
+from core.llms import get_llm_response, aget_llm_response, router
+from core.llms.cache import response_cache
+from core.llms.tokens import token_stats
 from core.llms.prompts import NEWS_GENERATE_SYSTEM_PROMPT, NEWS_GENERATE_PROMPT
 from core.llms.parser import Parser
 from core.models import NewsItemModel
 from core.colored import cprint, Colors
-from core.trends_pipeline import build_trends_news_items, search_trending_news_on_x
+from core import serde
+from core.seen_tweets import seen_tweets
+from core.story_index import story_index, merge_sources
+from core.pipeline import TrendsPipeline
+from core.news_batcher import NewsBatcher, prompt_fields
+from core.keyword_poller import KeywordPoller
+from core.x_search import get_scheduler
+from core.x_pool import ClientPool
 
 
 # --- Initialize NewsEngine ---
@@ -43,36 +52,83 @@ async def twikit_login(client: Client):
     # await client.save_cookies(COOKIES_PATH)
 
 
-def write_and_save_full_news(raw_news: dict, verbose=True):
-    cprint(f" [PROCESS] Processing news item: {raw_news.get('headline_str', 'Unknown')[:50]}...", color=Colors.Text.BLUE)
-    raw_news_without_sources = {k: v for k, v in raw_news.items() if k != "sources"}
-    messages = [
+def dedupe_story(raw_news: dict, verbose=True):
+    """
+    Already published? Folds the new sources into that item instead of writing
+    it again. Returns True when the story was handled this way.
+    """
+    duplicate = story_index.match(raw_news)
+    if not duplicate:
+        return False
+    item_id, score = duplicate
+    added = merge_sources(item_id, raw_news.get('sources', []))
+    seen_tweets.mark(raw_news.get('tweet_ids', []))
+    cprint(f" [DEDUPE] Same story as {item_id} (similarity {score:.2f}), merged {added} new sources.", color=Colors.Text.YELLOW)
+    return True
+
+
+def news_messages(raw_news: dict):
+    return [
         {"role": "system", "content": NEWS_GENERATE_SYSTEM_PROMPT},
-        {"role": "user", "content": NEWS_GENERATE_PROMPT.format(raw_news=raw_news_without_sources)}
+        {"role": "user", "content": NEWS_GENERATE_PROMPT.format(raw_news=prompt_fields(raw_news))}
     ]
 
+
+def generate_news(raw_news: dict, verbose=True):
+    """LLM step: raw story -> parsed news JSON."""
     if verbose:
         cprint(" [LLM] Dispatching request to LLM...", color=Colors.Text.MAGENTA)
 
-    response = get_llm_response(messages)
+    response = get_llm_response(news_messages(raw_news), validate=Parser().is_news_json)
+    return parse_news(response, verbose=verbose)
+
+
+async def agenerate_news(raw_news: dict, verbose=True):
+    """Async LLM step; many of these run at once, capped by LLM_CONCURRENCY."""
+    if verbose:
+        cprint(" [LLM] Dispatching request to LLM...", color=Colors.Text.MAGENTA)
+
+    response = await aget_llm_response(news_messages(raw_news), validate=Parser().is_news_json)
+    return parse_news(response, verbose=verbose)
+
 
+def parse_news(response, verbose=True):
     if verbose:
         cprint(f"[LLM] Raw Response:\n{response}", color=Colors.Text.CYAN)
 
     news_json = Parser().get_news_json(response)
 
     if verbose:
-        cprint(f"[PARSER] Parsed News JSON:\n{json.dumps(dict(news_json), indent=4)}", color=Colors.Text.CYAN)
+        cprint(f"[PARSER] Parsed News JSON:\n{serde.pretty(news_json)}", color=Colors.Text.CYAN)
+    return news_json
 
+
+def save_news(raw_news: dict, news_json: dict, verbose=True):
+    """Writes the generated item to disk and the store, and marks its tweets seen."""
+    if not news_json.get('headline_str'):
+        raise ValueError("empty news item, not saved")
     news_json['source_list'] = raw_news.get('sources', [])
     news_json['timestamp_str'] = raw_news.get('timestamp', '')
     news_item = NewsItemModel.from_dict(news_json)
     news_item.create_dir()
     cprint(" [SYSTEM] Saving news data to disk...", color=Colors.Text.YELLOW)
     news_item.save_json()
-    
+    seen_tweets.mark(raw_news.get('tweet_ids', []))
+
     if verbose:
         cprint(f"[MAAL] Saved News Item: {news_item.id}", color=Colors.Text.GREEN)
+    return news_item
+
+
+def write_and_save_full_news(raw_news: dict, verbose=True):
+    cprint(f" [PROCESS] Processing news item: {raw_news.get('headline_str', 'Unknown')[:50]}...", color=Colors.Text.BLUE)
+    if dedupe_story(raw_news, verbose=verbose):
+        return
+    news_json = generate_news(raw_news, verbose=verbose)
+    if not news_json.get('headline_str'):
+        cprint(" [PROCESS] Empty LLM answer, item skipped.", color=Colors.Text.RED)
+        return
+    save_news(raw_news, news_json, verbose=verbose)
     cprint(" [PROCESS] Item processing completed.", color=Colors.Text.GREEN)
 
 
@@ -87,23 +143,33 @@ def update_maal(verbose=True):
 
 
 async def update_from_trends(client: Client, keywords=[], verbose=True):
+    """
+    One cycle: search, cluster, generate and save as a streaming pipeline
+    (core.pipeline), so each story is saved as soon as it is ready.
+    Returns {keyword: new (unseen) qualifying tweets} for the keywords searched.
+    """
     # raw_items = await build_trends_news_items(client, top_n_keywords=30, per_keyword=6)
-    raw_items = await search_trending_news_on_x(client, per_keyword=10, keywords=keywords, min_like=100, min_rt=10, verbose=verbose)
-    if verbose:
-        cprint(f" [ENGINE] Retrieved {len(raw_items)} news items from trends.", color=Colors.Text.GREEN)
-    for raw_news in raw_items:
-        if verbose:
-            cprint(f"[MAAL] From Trends kw='{raw_news['keyword']}'", color=Colors.Text.GREEN)
-        write_and_save_full_news(raw_news, verbose=verbose)
+    generate, workers = agenerate_news, PIPELINE_GENERATE_WORKERS
+    if GENERATE_BATCH_SIZE > 1:
+        # enough workers waiting on the batcher to fill every concurrent request
+        batcher = NewsBatcher(single=agenerate_news, verbose=verbose)
+        generate, workers = batcher.generate, PIPELINE_GENERATE_WORKERS * GENERATE_BATCH_SIZE
+    pipeline = TrendsPipeline(
+        client, keywords,
+        generate=generate, save=save_news, dedupe=dedupe_story,
+        per_keyword=10, min_like=100, min_rt=10, workers=workers, verbose=verbose
+    )
+    return await pipeline.run()
 
 
 # --- Main Loop ---
 async def main():
     
     # --- Auth ---
-    client = Client('en-US')
-
-    await twikit_login(client)
+    # One client per cookie file in COOKIES_PATHS; searches are spread
+    # across the accounts by remaining quota.
+    client = ClientPool()
+    await client.start()
     cprint(" [BOT] Login sequence finished.", color=Colors.Text.GREEN)
 
     trending_keywords = [
@@ -119,19 +185,30 @@ async def main():
         "#thailand"
     ]
 
+    # Each keyword is re-polled on its own schedule, driven by how much new
+    # news it produced, within a shared search-request budget.
+    poller = KeywordPoller(trending_keywords, budget=POLL_BUDGET * max(len(client.accounts), 1))
+    scheduler = get_scheduler(client)
+
     try:
         while True:
-            cprint("[MAAL] Updating maal...", color=Colors.Text.YELLOW)
-            # update_maal()
-            await update_from_trends(client=client, keywords=trending_keywords)
+            due = poller.due()
+            if due:
+                cprint(f"[MAAL] Updating maal for {len(due)} keywords...", color=Colors.Text.YELLOW)
+                # update_maal()
+                requests_before = scheduler.requests
+                yields = await update_from_trends(client=client, keywords=due)
+                poller.record(yields, requests_used=scheduler.requests - requests_before)
+                poller.log()
+                response_cache.log()
+                router.log()
+                token_stats.log()
 
             # COUNTDOWN
-            for i in range(NEWS_FETCH_INTERVAL, 0, -1):
-                # Generate the # symbols, starting with NEWS_FETCH_INTERVAL and decreasing
-                hashes = "#" * i
-                # Print the countdown with the decreasing number of hashes
-                print(f"  {i:0{len(str(NEWS_FETCH_INTERVAL))}d} seconds...", end='\r')
-                time.sleep(1)
+            wait = poller.seconds_until_next()
+            for i in range(wait, 0, -1):
+                print(f"  {i:0{len(str(wait))}d} seconds...", end='\r')
+                await asyncio.sleep(1)
     except KeyboardInterrupt:
         cprint("[END] Stopping bot due to keyboard interrupt.", color=Colors.Text.RED)
 
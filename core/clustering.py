@@ -0,0 +1,140 @@
+# story clustering
+
+"""
+Groups tweets into stories by content instead of by the keyword that found them.
+
+Each tweet is reduced to a MinHash signature over its word shingles. Banding
+the signatures (LSH) puts likely-similar tweets into shared buckets, so only
+tweets that share a bucket are compared: near-linear work instead of all
+pairs. Candidate pairs whose estimated Jaccard similarity clears the
+threshold are joined (union-find), which also merges one story that was
+found under several keywords.
+"""
+
+import re
+import hashlib
+import random
+from collections import defaultdict, Counter
+
+from core.search_index import tokenize
+
+NUM_PERM = 96
+BANDS = 32             # 32 bands x 3 rows: tweets are short, so bands stay narrow;
+                       # pairs at 0.5 Jaccard share a bucket ~99% of the time
+SIMILARITY = 0.45      # estimated Jaccard needed to join two tweets
+SHINGLE_SIZE = 1       # word sets: tweets about one story reorder words more than they share phrases
+MERSENNE = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+
+URL_RE = re.compile(r"https?://\S+")
+MENTION_RE = re.compile(r"@\w+")
+# function words would make any two English tweets look alike
+STOPWORDS = frozenset(
+    "the an and or of in on at to for from by with as is are was were be been it its this that "
+    "these those will has have had not no but after before over into about than then so rt amp".split()
+)
+
+_rng = random.Random(1)  # fixed seed: signatures are comparable across runs
+PERMUTATIONS = [(_rng.randrange(1, MERSENNE), _rng.randrange(0, MERSENNE)) for _ in range(NUM_PERM)]
+
+
+def content_terms(text):
+    """Tokens of a tweet or article without URLs, mentions and stopwords."""
+    return [t for t in tokenize(MENTION_RE.sub(" ", URL_RE.sub(" ", text or ""))) if t not in STOPWORDS]
+
+
+def shingles(text, size=SHINGLE_SIZE):
+    tokens = content_terms(text)
+    if len(tokens) < size:
+        return set(tokens)
+    return {" ".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)}
+
+
+def minhash(shingle_set):
+    if not shingle_set:
+        return None
+    hashes = [int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little")
+              for s in shingle_set]
+    return tuple(
+        min(((a * h + b) % MERSENNE) & MAX_HASH for h in hashes)
+        for a, b in PERMUTATIONS
+    )
+
+
+def similarity(sig_a, sig_b):
+    """Estimated Jaccard similarity of two MinHash signatures."""
+    return sum(x == y for x, y in zip(sig_a, sig_b)) / len(sig_a)
+
+
+class _UnionFind:
+    def __init__(self, n):
+        self.parent = list(range(n))
+
+    def find(self, i):
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, i, j):
+        ri, rj = self.find(i), self.find(j)
+        if ri != rj:
+            self.parent[rj] = ri
+
+
+def cluster_texts(texts, threshold=SIMILARITY, bands=BANDS):
+    """Groups of indices into texts, each group one story, largest first."""
+    sigs = [minhash(shingles(t)) for t in texts]
+    rows = NUM_PERM // bands
+    uf = _UnionFind(len(texts))
+
+    for band in range(bands):
+        buckets = defaultdict(list)
+        for i, sig in enumerate(sigs):
+            if sig is not None:
+                buckets[sig[band * rows:(band + 1) * rows]].append(i)
+        for members in buckets.values():
+            for n, i in enumerate(members):
+                for j in members[n + 1:]:
+                    if uf.find(i) != uf.find(j) and similarity(sigs[i], sigs[j]) >= threshold:
+                        uf.union(i, j)
+
+    groups = defaultdict(list)
+    for i in range(len(texts)):
+        groups[uf.find(i)].append(i)
+    return sorted(groups.values(), key=len, reverse=True)
+
+
+def group_stories(tweets_by_keyword, threshold=SIMILARITY, min_size=2):
+    """
+    {keyword: [tweet dict]} -> [{"keyword", "keywords", "tweets"}], one entry per story.
+
+    A tweet returned for several keywords is counted once. Groups smaller than
+    min_size are not a story on their own; they are gathered per keyword,
+    like the keyword clusters this replaces, so no tweet is lost.
+    """
+    tweets, keywords_of = {}, defaultdict(list)
+    for kw, tws in tweets_by_keyword.items():
+        for tw in tws:
+            tweets.setdefault(tw["id"], tw)
+            if kw not in keywords_of[tw["id"]]:
+                keywords_of[tw["id"]].append(kw)
+
+    ids = list(tweets)
+    stories, leftovers = [], defaultdict(list)
+    for group in cluster_texts([tweets[i]["text"] for i in ids], threshold=threshold):
+        members = [ids[i] for i in group]
+        if len(members) < min_size:
+            for tweet_id in members:
+                leftovers[keywords_of[tweet_id][0]].append(tweets[tweet_id])
+            continue
+        counts = Counter(kw for tweet_id in members for kw in keywords_of[tweet_id])
+        stories.append({
+            "keyword": counts.most_common(1)[0][0],
+            "keywords": [kw for kw, _ in counts.most_common()],
+            "tweets": [tweets[tweet_id] for tweet_id in members],
+        })
+
+    for kw, tws in leftovers.items():
+        stories.append({"keyword": kw, "keywords": [kw], "tweets": tws})
+    return stories
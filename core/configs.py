@@ -9,11 +9,67 @@ load_dotenv()
 USERNAME = os.getenv('TWITTER_USERNAME')
 PASSWORD = os.getenv('TWITTER_PASSWORD')
 COOKIES_PATH = os.getenv('TWITTER_COOKIES_PATH')
+# one cookie file per account for the search pool (core.x_pool), comma separated
+COOKIES_PATHS = [p.strip() for p in os.getenv('TWITTER_COOKIES_PATHS', '').split(',') if p.strip()] or [COOKIES_PATH]
 
 BOT_HANDLE = USERNAME
 DEBUG_MODE = os.getenv('DEBUG_MODE', 'False').lower() in ['true', '1', 'yes']
 NEWS_FETCH_INTERVAL = int(os.getenv('NEWS_FETCH_INTERVAL', 600))  # 10 minutes
 NEWS_DATA_STORE_DIR = os.getenv('NEWS_DATA_STORE_DIR')
+NEWS_DB_PATH = os.getenv('NEWS_DB_PATH') or os.path.join(NEWS_DATA_STORE_DIR or '.', 'news.db')
+SEEN_TWEETS_DB_PATH = os.getenv('SEEN_TWEETS_DB_PATH') or os.path.join(NEWS_DATA_STORE_DIR or '.', 'seen_tweets.db')
+SEEN_TWEETS_TTL_HOURS = float(os.getenv('SEEN_TWEETS_TTL_HOURS', 72))  # > the 2-day tweet age cutoff
+STORY_DEDUPE_HOURS = float(os.getenv('STORY_DEDUPE_HOURS', 48))  # published items new stories are checked against
+STORY_DUP_SIMILARITY = float(os.getenv('STORY_DUP_SIMILARITY', 0.4))  # TF-IDF cosine for a duplicate story
+GROQ_KEY_MAX_WAIT = float(os.getenv('GROQ_KEY_MAX_WAIT', 90))          # longest a call queues for a free key (s)
+GROQ_KEY_ERROR_COOLDOWN = float(os.getenv('GROQ_KEY_ERROR_COOLDOWN', 15))  # key sits out after a server/network error
+GROQ_KEY_AUTH_COOLDOWN = float(os.getenv('GROQ_KEY_AUTH_COOLDOWN', 3600))  # key sits out after an auth error
+LLM_PROVIDERS = [p.strip() for p in os.getenv('LLM_PROVIDERS', 'groq,chutes').split(',') if p.strip()]  # routed backends, preferred first
+LLM_HEDGE = os.getenv('LLM_HEDGE', 'True').lower() in ['true', '1', 'yes']  # duplicate slow calls to the next provider
+LLM_HEDGE_MIN_DELAY = float(os.getenv('LLM_HEDGE_MIN_DELAY', 2))     # never hedge sooner than this (s)
+LLM_ROUTER_WINDOW = float(os.getenv('LLM_ROUTER_WINDOW', 600))        # latency/error stats window (s)
+LLM_MAX_ERROR_RATE = float(os.getenv('LLM_MAX_ERROR_RATE', 0.5))      # above this a provider is skipped
+RAW_NEWS_TOKEN_BUDGET = int(os.getenv('RAW_NEWS_TOKEN_BUDGET', 500))   # tweet text per story sent to the LLM
+# per-model overrides, "model=tokens,model=tokens"
+RAW_NEWS_TOKEN_BUDGETS = {
+    m.strip(): int(t) for m, _, t in (p.rpartition('=') for p in os.getenv('RAW_NEWS_TOKEN_BUDGETS', '').split(',') if '=' in p)
+}
+LLM_CACHE_PATH = os.getenv('LLM_CACHE_PATH') or os.path.join(NEWS_DATA_STORE_DIR or '.', 'llm_cache.db')
+LLM_CACHE_ENABLED = os.getenv('LLM_CACHE_ENABLED', 'True').lower() in ['true', '1', 'yes']
+LLM_CACHE_TTL_HOURS = float(os.getenv('LLM_CACHE_TTL_HOURS', 72))  # cached responses older than this are dropped
+LLM_CACHE_MAX_MB = float(os.getenv('LLM_CACHE_MAX_MB', 64))        # LRU eviction above this size
+FEED_CACHE_REFRESH_SECONDS = float(os.getenv('FEED_CACHE_REFRESH_SECONDS', 2))  # min gap between disk rescans
+FEED_PAGE_SIZE = int(os.getenv('FEED_PAGE_SIZE', 30))
+FEED_MAX_PAGE_SIZE = int(os.getenv('FEED_MAX_PAGE_SIZE', 100))
+X_SEARCH_CONCURRENCY = int(os.getenv('X_SEARCH_CONCURRENCY', 4))  # searches in flight at once
+X_SEARCH_RESERVE = int(os.getenv('X_SEARCH_RESERVE', 1))          # quota left untouched per window
+X_SEARCH_BURST = int(os.getenv('X_SEARCH_BURST', 10))             # no spacing while more than this remains
+X_SEARCH_MAX_WAIT = float(os.getenv('X_SEARCH_MAX_WAIT', 120))    # give up instead of waiting longer (s)
+X_SEARCH_MAX_PAGES = int(os.getenv('X_SEARCH_MAX_PAGES', 5))       # result pages followed per keyword
+X_SEARCH_TIME_BUDGET = float(os.getenv('X_SEARCH_TIME_BUDGET', 45))  # seconds per keyword stream
+X_POOL_BENCH_SECONDS = int(os.getenv('X_POOL_BENCH_SECONDS', 1800))  # logged-out account sits out this long
+X_SESSION_REFRESH_SECONDS = int(os.getenv('X_SESSION_REFRESH_SECONDS', 1800))  # background auth re-check
+PIPELINE_QUEUE_SIZE = int(os.getenv('PIPELINE_QUEUE_SIZE', 64))        # bound of each stage queue
+LLM_CONCURRENCY = int(os.getenv('LLM_CONCURRENCY', 8))                # LLM calls in flight per process
+CHUTES_TIMEOUT = float(os.getenv('CHUTES_TIMEOUT', 120))                # read timeout; for streams, max gap between chunks
+CHUTES_CONNECT_TIMEOUT = float(os.getenv('CHUTES_CONNECT_TIMEOUT', 10))
+CHUTES_RETRIES = int(os.getenv('CHUTES_RETRIES', 3))                      # on connect errors and 429/5xx
+CHUTES_POOL_SIZE = int(os.getenv('CHUTES_POOL_SIZE', LLM_CONCURRENCY))    # kept-alive connections
+CHUTES_MAX_TOKENS = int(os.getenv('CHUTES_MAX_TOKENS', 2048))            # answer budget; a full generate batch needs ~350 per story
+PIPELINE_GENERATE_WORKERS = int(os.getenv('PIPELINE_GENERATE_WORKERS', LLM_CONCURRENCY))  # stories generated at once
+GENERATE_BATCH_SIZE = int(os.getenv('GENERATE_BATCH_SIZE', 5))            # max stories per LLM request (1 = no batching)
+GENERATE_BATCH_LINGER = float(os.getenv('GENERATE_BATCH_LINGER', 0.2))    # wait for more stories to batch (s)
+LLM_CONTEXT_TOKENS = int(os.getenv('LLM_CONTEXT_TOKENS', 8192))           # prompt + answer budget of one request (default)
+# per-model overrides, "model=tokens,model=tokens"
+LLM_CONTEXT_TOKENS_BY_MODEL = {
+    m.strip(): int(t) for m, _, t in (p.rpartition('=') for p in os.getenv('LLM_CONTEXT_TOKENS_BY_MODEL', '').split(',') if '=' in p)
+}
+PIPELINE_CLUSTER_LINGER = float(os.getenv('PIPELINE_CLUSTER_LINGER', 1.0))  # wait for more finished keywords (s)
+PIPELINE_LOG_SECONDS = float(os.getenv('PIPELINE_LOG_SECONDS', 10))      # stats log interval
+POLL_MIN_INTERVAL = int(os.getenv('POLL_MIN_INTERVAL', 120))       # hottest keywords, seconds
+POLL_MAX_INTERVAL = int(os.getenv('POLL_MAX_INTERVAL', 3600))      # quietest keywords, seconds
+POLL_BUDGET = int(os.getenv('POLL_BUDGET', 45))                    # search requests per account per window
+POLL_BUDGET_WINDOW = int(os.getenv('POLL_BUDGET_WINDOW', 900))     # seconds (X's 15 minute window)
 
 # # ---- Colored Logs After Loading ENVs ----
 
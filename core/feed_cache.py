@@ -0,0 +1,161 @@
+# feed cache
+
+"""
+Process-wide cache of parsed feed records.
+
+Records are kept in memory together with the mtime/size of the data.json they
+came from. A refresh is a cheap os.scandir + stat pass over the store folder:
+only folders that were added, changed or removed since the last refresh are
+re-parsed (and re-indexed in the news store), everything else is reused.
+"""
+
+import os
+import time
+import bisect
+import threading
+
+from core.configs import NEWS_DATA_STORE_DIR, FEED_CACHE_REFRESH_SECONDS
+from core.colored import cprint, Colors
+from core import serde
+from core.store import news_store
+from core.shards import iter_all_item_dirs
+
+
+class FeedCache:
+    def __init__(self, build_record, store=news_store, root=NEWS_DATA_STORE_DIR,
+                 refresh_interval=FEED_CACHE_REFRESH_SECONDS):
+        """
+        build_record(data: dict) -> dict turns a raw data.json dict into
+        whatever the front end renders; it is called once per item version.
+        """
+        self.build_record = build_record
+        self.store = store
+        self.root = root
+        self.refresh_interval = refresh_interval
+        self.version = 0  # bumped whenever the feed changes
+
+        self._records = {}  # item_id -> record
+        self._order = []    # sorted [(ts, item_id)], oldest first
+        self._ts = {}       # item_id -> ts
+        self._files = None  # relative folder path -> (item_id, mtime_ns, size)
+        self._checked_at = 0.0
+        self._lock = threading.RLock()
+
+    # --- public ---
+
+    def items(self, tag=None):
+        """Records newest first, optionally restricted to one tag."""
+        self.refresh()
+        with self._lock:
+            ids = (item_id for _, item_id in reversed(self._order))
+            if tag:
+                tagged = self.store.ids_for_tag(tag)
+                ids = (i for i in ids if i in tagged)
+            return [self._records[i] for i in ids]
+
+    def get(self, item_id):
+        """Cached record for one id; falls back to the store for items not seen yet."""
+        record = self._records.get(item_id)
+        if record is None:
+            row = self.store.get_with_ts(item_id)
+            if row is None:
+                return None
+            with self._lock:
+                self._put(item_id, *row)
+                record = self._records.get(item_id)
+        return record
+
+    def refresh(self, force=False):
+        """Re-parses only what changed on disk. Returns the number of changed items."""
+        with self._lock:
+            now = time.monotonic()
+            if not force and self._files is not None and now - self._checked_at < self.refresh_interval:
+                return 0
+            self._checked_at = now
+
+            if self._files is None:
+                self._bootstrap()
+
+            on_disk = self._scan()
+            changed = 0
+
+            for rel_path, (mtime_ns, size) in on_disk.items():
+                known = self._files.get(rel_path)
+                if known and known[1] == mtime_ns and known[2] == size:
+                    continue
+                if self._reload(rel_path, mtime_ns, size):
+                    changed += 1
+
+            # An id that is still on disk under another path was moved
+            # (e.g. by migrate-layout), not deleted.
+            live_ids = {self._files[p][0] for p in on_disk if p in self._files}
+            for rel_path in set(self._files) - set(on_disk):
+                item_id = self._files.pop(rel_path)[0]
+                if item_id not in live_ids:
+                    self.store.delete(item_id)
+                    self._drop(item_id)
+                changed += 1
+
+            if changed:
+                self.version += 1
+            return changed
+
+    def invalidate(self):
+        """Forces the next call to rescan the store folder."""
+        self._checked_at = 0.0
+
+    # --- internals ---
+
+    def _bootstrap(self):
+        """Seeds records from the store so a restart does not re-parse every file."""
+        self._files = self.store.file_states()
+        for ts, data in self.store.iter_items():
+            self._put(data["id"], ts, data)
+        self.version += 1
+
+    def _scan(self):
+        """{relative folder path: (mtime_ns, size)} of every data.json on disk."""
+        out = {}
+        for rel_path, path in iter_all_item_dirs(self.root):
+            try:
+                st = os.stat(os.path.join(path, "data.json"))
+            except OSError:
+                continue
+            out[rel_path] = (st.st_mtime_ns, st.st_size)
+        return out
+
+    def _reload(self, rel_path, mtime_ns, size):
+        folder = os.path.join(self.root, rel_path)
+        try:
+            data = serde.read_json(os.path.join(folder, "data.json"))
+            data.setdefault("id", os.path.basename(rel_path))
+        except Exception as e:
+            cprint(f" [FEED] Skipped {rel_path}: {e}", color=Colors.Text.YELLOW)
+            return False
+
+        old = self._files.get(rel_path)
+        if old and old[0] != data["id"]:
+            self._drop(old[0])
+        ts = self.store.upsert(data, path=folder)
+        self._files[rel_path] = (data["id"], mtime_ns, size)
+        self._put(data["id"], ts, data)
+        return True
+
+    def _put(self, item_id, ts, data):
+        self._drop(item_id)
+        try:
+            self._records[item_id] = self.build_record(data)
+        except Exception as e:
+            cprint(f" [FEED] Skipped {item_id}: {e}", color=Colors.Text.YELLOW)
+            return
+        self._ts[item_id] = ts
+        bisect.insort(self._order, (ts, item_id))
+
+    def _drop(self, item_id):
+        ts = self._ts.pop(item_id, None)
+        self._records.pop(item_id, None)
+        if ts is None:
+            return
+        i = bisect.bisect_left(self._order, (ts, item_id))
+        if i < len(self._order) and self._order[i] == (ts, item_id):
+            del self._order[i]
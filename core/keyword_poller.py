@@ -0,0 +1,144 @@
+# keyword polling
+
+"""
+Adaptive polling schedule for the bot's keywords.
+
+Each keyword has its own interval, driven by how many new qualifying tweets
+its last polls produced: a keyword that yields plenty is re-polled sooner
+(down to POLL_MIN_INTERVAL), a quiet one backs off exponentially (up to
+POLL_MAX_INTERVAL). Polls also share a global budget of POLL_BUDGET search
+requests per POLL_BUDGET_WINDOW, handed to the hottest due keywords first, so
+the fixed X quota goes where the news is.
+"""
+
+import time
+
+from core.configs import (
+    NEWS_FETCH_INTERVAL,
+    POLL_MIN_INTERVAL,
+    POLL_MAX_INTERVAL,
+    POLL_BUDGET,
+    POLL_BUDGET_WINDOW,
+)
+from core.colored import cprint, Colors
+
+HOT_YIELD = 3        # new tweets per poll that count as "hot"
+YIELD_SMOOTHING = 0.5  # EWMA weight of the latest poll
+
+
+class KeywordState:
+    def __init__(self, keyword, interval, now):
+        self.keyword = keyword
+        self.interval = interval
+        self.next_due = now      # poll everything once at start-up
+        self.avg_yield = 0.0     # EWMA of new tweets per poll
+        self.avg_cost = 1.0      # EWMA of search requests per poll
+        self.polls = 0
+
+    def snapshot(self, now):
+        return {
+            "interval": round(self.interval),
+            "due_in": max(0, round(self.next_due - now)),
+            "avg_yield": round(self.avg_yield, 2),
+        }
+
+
+class KeywordPoller:
+    def __init__(self, keywords, base_interval=NEWS_FETCH_INTERVAL, min_interval=POLL_MIN_INTERVAL,
+                 max_interval=POLL_MAX_INTERVAL, budget=POLL_BUDGET, window=POLL_BUDGET_WINDOW):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.base_interval = min(max(base_interval, min_interval), max_interval)
+        self.budget = budget
+        self.window = window
+        self._window_start = time.time()
+        self._spent = 0
+        self.states = {}
+        self.set_keywords(keywords)
+
+    # --- public ---
+
+    def set_keywords(self, keywords):
+        """Adds new keywords (due immediately) and forgets removed ones."""
+        now = time.time()
+        keywords = list(dict.fromkeys(keywords))
+        self.states = {
+            kw: self.states.get(kw) or KeywordState(kw, self.base_interval, now)
+            for kw in keywords
+        }
+
+    def due(self):
+        """Keywords to poll now, hottest first, within what is left of the budget."""
+        now = time.time()
+        self._roll_window(now)
+        ready = [st for st in self.states.values() if st.next_due <= now]
+        ready.sort(key=lambda st: (-st.avg_yield, st.next_due))
+
+        picked, planned = [], self._spent
+        for st in ready:
+            if planned + st.avg_cost > self.budget:
+                break
+            planned += st.avg_cost
+            picked.append(st.keyword)
+        if not picked and ready and self._spent == 0:
+            picked.append(ready[0].keyword)  # never starve a keyword costlier than a whole window
+        return picked
+
+    def record(self, yields, requests_used=None):
+        """
+        yields: {keyword: new qualifying tweets} for the keywords just polled.
+        requests_used: search requests the poll took in total (defaults to one
+        per keyword); it is charged to the budget and split across keywords.
+        """
+        if not yields:
+            return
+        now = time.time()
+        self._roll_window(now)
+        cost = requests_used if requests_used is not None else len(yields)
+        self._spent += cost
+        per_keyword = cost / len(yields)
+
+        for kw, new in yields.items():
+            st = self.states.get(kw)
+            if st is None:
+                continue
+            st.polls += 1
+            st.avg_yield = YIELD_SMOOTHING * new + (1 - YIELD_SMOOTHING) * st.avg_yield
+            st.avg_cost = YIELD_SMOOTHING * max(per_keyword, 1.0) + (1 - YIELD_SMOOTHING) * st.avg_cost
+            if new >= HOT_YIELD:
+                st.interval = max(self.min_interval, st.interval / 2)
+            elif new == 0:
+                st.interval = min(self.max_interval, st.interval * 2)
+            st.next_due = now + st.interval
+
+    def seconds_until_next(self):
+        """How long the bot can sleep before something is due (and affordable)."""
+        now = time.time()
+        self._roll_window(now)
+        if not self.states:
+            return self.base_interval
+        wait = min(st.next_due for st in self.states.values()) - now
+        cheapest = min(st.avg_cost for st in self.states.values())
+        if self._spent + cheapest > self.budget:
+            wait = max(wait, self._window_start + self.window - now)
+        return max(1, int(wait))
+
+    def snapshot(self):
+        now = time.time()
+        return {kw: st.snapshot(now) for kw, st in self.states.items()}
+
+    def log(self):
+        cprint(f" [POLL] Budget {self._spent:.0f}/{self.budget} requests this window", color=Colors.Text.CYAN)
+        for kw, snap in sorted(self.snapshot().items(), key=lambda kv: kv[1]["due_in"]):
+            cprint(
+                f"   {kw:<28} every {snap['interval']:>5}s  due in {snap['due_in']:>5}s  "
+                f"yield {snap['avg_yield']}",
+                color=Colors.Text.CYAN
+            )
+
+    # --- internals ---
+
+    def _roll_window(self, now):
+        if now - self._window_start >= self.window:
+            self._window_start = now
+            self._spent = 0
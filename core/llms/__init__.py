@@ -1,13 +1,37 @@
 # LLM calls
 
-from groq import Groq, RateLimitError
-from .chutes_llm import ChutesLLM, ChutesLLMError
+from .chutes_llm import ChutesLLM, AsyncChutesLLM, ChutesLLMError, chunk_text
+from .cache import response_cache, cache_key
+from .key_pool import KeyPool, NoKeyAvailable, request_token_cost
+from .router import LLMRouter
+from .tokens import token_stats
 from core.colored import cprint, Colors
+from core.configs import (
+    LLM_CONCURRENCY, LLM_PROVIDERS, CHUTES_MAX_TOKENS, LLM_CONTEXT_TOKENS, LLM_CONTEXT_TOKENS_BY_MODEL,
+)
 
 import os
+import asyncio
 from dotenv import load_dotenv
 load_dotenv()
 
+GROQ_KEY_ENV_VARS = [
+    "GROQ_API_KEY__1__BADHAT",
+    "GROQ_API_KEY__2__FSOCIETY",
+    "GROQ_API_KEY__3__ANITON",
+    "GROQ_API_KEY__4__MKNC_PNP",
+    "GROQ_API_KEY__5__SOUTH_OFFICE",
+    "GROQ_API_KEY__6__GAMH",
+    "GROQ_API_KEY__7__MADHAVAMPIRE",
+    "GROQ_API_KEY__8__FERB",
+    "GROQ_API_KEY__9__PHINEASE",
+    "GROQ_API_KEY__10__AKUMARK",
+]
+
+# one pool for every Groq caller in the process (sync and async)
+groq_keys = KeyPool((name, os.getenv(name)) for name in GROQ_KEY_ENV_VARS)
+MAX_ATTEMPTS = 4  # keys tried per call; waiting for a free key is bounded by GROQ_KEY_MAX_WAIT
+
 
 class GroqLLM:
     # model = "llama3-8b-8192"
@@ -18,45 +42,31 @@ class GroqLLM:
     # model = "deepseek-ai/DeepSeek-V3-0324"
     # model = "unsloth/gemma-2-9b-it"
     # model = "Qwen/Qwen3-1.7B"
+    sampling = {}  # provider defaults; part of the response cache key
 
-    def __init__(self):
-        self.api_key_turn = 0
-        self.api_keys = [
-            os.getenv("GROQ_API_KEY__1__BADHAT"), 
-            os.getenv("GROQ_API_KEY__2__FSOCIETY"), 
-            os.getenv("GROQ_API_KEY__3__ANITON"), 
-            os.getenv("GROQ_API_KEY__4__MKNC_PNP"), 
-            os.getenv("GROQ_API_KEY__5__SOUTH_OFFICE"), 
-            os.getenv("GROQ_API_KEY__6__GAMH"), 
-            os.getenv("GROQ_API_KEY__7__MADHAVAMPIRE"), 
-            os.getenv("GROQ_API_KEY__8__FERB"), 
-            os.getenv("GROQ_API_KEY__9__PHINEASE"), 
-            os.getenv("GROQ_API_KEY__10__AKUMARK"), 
-        ]
-        self.api_key = self.api_keys[self.api_key_turn]
-        self.client = Groq(api_key=self.api_key)
+    def __init__(self, pool=None):
+        self.pool = pool or groq_keys
 
     def get_llm_response(self, messages, model=model):
-        try:
-            response = self.client.chat.completions.create(
-                model = model or self.model,
-                messages = messages,
-            )
-            output = response.choices[0].message.content.strip()
-            return output
-        except RateLimitError as RLE:
-            self.api_key_turn = (self.api_key_turn + 1) % len(self.api_keys)
-            self.api_key = self.api_keys[self.api_key_turn]
-            self.client = Groq(api_key=self.api_key)
-            cprint(f"Rate limits error: {RLE}\n\nAPI key turn: {self.api_key_turn}", color=Colors.Text.RED)
-            return self.get_llm_response(messages=messages, model=model)
-        except Exception as E:
-            cprint(f"[error in groq.get_llm_response] {E}", color=Colors.Text.RED)
-            self.api_key_turn = (self.api_key_turn + 1) % len(self.api_keys)
-            self.api_key = self.api_keys[self.api_key_turn]
-            self.client = Groq(api_key=self.api_key)
-            cprint(f"Exception in groq.get_llm_response: {E}\n\nAPI key turn: {self.api_key_turn}", color=Colors.Text.YELLOW)
-            return self.get_llm_response(messages=messages, model=model)
+        tokens = request_token_cost(messages, model or self.model)
+        for _ in range(MAX_ATTEMPTS):
+            key = self.pool.acquire(tokens)
+            try:
+                raw = key.client.chat.completions.with_raw_response.create(
+                    model = model or self.model,
+                    messages = messages,
+                    **self.sampling,
+                )
+            except Exception as E:
+                cprint(f"[error in groq.get_llm_response] {key.name}: {E}", color=Colors.Text.RED)
+                if not self.pool.report_error(key, tokens, E):
+                    return ""
+                continue
+            self.pool.release(key, tokens, headers=raw.headers)
+            parsed = raw.parse()
+            token_stats.record_usage(model or self.model, messages, parsed.usage)
+            return parsed.choices[0].message.content.strip()
+        return ""
 
 
 class ChutesAI:
@@ -71,19 +81,77 @@ class ChutesAI:
     # model = "Qwen/Qwen3-1.7B"
     # model = "chutesai/Llama-3.1-405B-FP8"
     # model = "openai/gpt-oss-20b"
+    # without max_tokens the client caps answers at 150 tokens
+    sampling = {"temperature": 0.7, "max_tokens": CHUTES_MAX_TOKENS}
 
     def __init__(self):
         self.client = ChutesLLM(api_key=os.getenv("CHUTES_API_KEY"))
 
-    def get_llm_response(self, messages, model=model):
+    def get_llm_response(self, messages, model=model, stream=False):
+        """stream=True reads the answer as server-sent events (no single long read) and joins it."""
+        if stream:
+            return self._joined(self.stream_llm_response(messages, model))
         response = self.client.chat.completions.create(
             messages = messages,
             model = model or self.model,
-            temperature = 0.7,
-            # max_tokens = 1500,
+            **self.sampling,
             # json_mode = True
         )
+        self._record_usage(model, messages, response)
+        return self._content_output(response)
+
+    # NEW (reasoning)
+    def get_reasoning_response(self, messages, model="openai/gpt-oss-20b", stream=False):
+        if stream:
+            return self._joined(self.stream_reasoning_response(messages, model))
+        response = self.client.reasoning.create(
+            messages=messages,
+            model=model or "openai/gpt-oss-20b",
+            temperature=0.7,
+            max_tokens=CHUTES_MAX_TOKENS,
+        )
+        return self._reasoning_output(response)
+
+    def stream_llm_response(self, messages, model=model):
+        """Yields the answer's text as it is generated."""
+        chunks = self.client.chat.completions.create(
+            messages = messages,
+            model = model or self.model,
+            stream = True,
+            **self.sampling,
+        )
+        for chunk in chunks:
+            text = chunk_text(chunk)
+            if text:
+                yield text
 
+    def stream_reasoning_response(self, messages, model="openai/gpt-oss-20b"):
+        chunks = self.client.reasoning.create(
+            messages=messages,
+            model=model or "openai/gpt-oss-20b",
+            temperature=0.7,
+            max_tokens=CHUTES_MAX_TOKENS,
+            stream=True,
+        )
+        for chunk in chunks:
+            text = chunk_text(chunk, reasoning=True)
+            if text:
+                yield text
+
+    @staticmethod
+    def _joined(texts):
+        try:
+            return "".join(texts).strip()
+        except Exception as e:
+            cprint(f"[ERROR in streamed completion]: {e}", color=Colors.Text.RED)
+            return ""
+
+    def _record_usage(self, model, messages, response):
+        if isinstance(response, dict):
+            token_stats.record_usage(model or self.model, messages, response.get("usage"))
+
+    @staticmethod
+    def _content_output(response):
         try:
             output = response['choices'][0]['message']['content'].strip()
             # cprint(json.dumps(json.loads(output), indent=4), color=CYAN)
@@ -104,14 +172,8 @@ class ChutesAI:
 
         return output
 
-    # NEW (reasoning)
-    def get_reasoning_response(self, messages, model="openai/gpt-oss-20b"):
-        response = self.client.reasoning.create(
-            messages=messages,
-            model=model or "openai/gpt-oss-20b",
-            temperature=0.7,
-        )
-
+    @staticmethod
+    def _reasoning_output(response):
         try:
             choice = (response.get("choices") or [{}])[0]
             message = choice.get("message") or {}
@@ -147,13 +209,175 @@ class ChutesAI:
         return output
 
 
+# --- async variants: same behaviour, awaitable, no event-loop blocking ---
+
+class AsyncGroqLLM(GroqLLM):
+    async def get_llm_response(self, messages, model=GroqLLM.model):
+        tokens = request_token_cost(messages, model or self.model)
+        for _ in range(MAX_ATTEMPTS):
+            key = await self.pool.aacquire(tokens)
+            try:
+                raw = await key.aclient.chat.completions.with_raw_response.create(
+                    model = model or self.model,
+                    messages = messages,
+                    **self.sampling,
+                )
+            except Exception as E:
+                cprint(f"[error in async groq.get_llm_response] {key.name}: {E}", color=Colors.Text.RED)
+                if not self.pool.report_error(key, tokens, E):
+                    return ""
+                continue
+            self.pool.release(key, tokens, headers=raw.headers)
+            parsed = raw.parse()
+            token_stats.record_usage(model or self.model, messages, parsed.usage)
+            return parsed.choices[0].message.content.strip()
+        return ""
+
+
+class AsyncChutesAI(ChutesAI):
+    def __init__(self):
+        self.client = AsyncChutesLLM(api_key=os.getenv("CHUTES_API_KEY"))
+
+    async def get_llm_response(self, messages, model=ChutesAI.model, stream=False):
+        if stream:
+            return await self._ajoined(self.stream_llm_response(messages, model))
+        response = await self.client.chat.completions.create(
+            messages = messages,
+            model = model or self.model,
+            **self.sampling,
+        )
+        self._record_usage(model, messages, response)
+        return self._content_output(response)
+
+    async def get_reasoning_response(self, messages, model="openai/gpt-oss-20b", stream=False):
+        if stream:
+            return await self._ajoined(self.stream_reasoning_response(messages, model))
+        response = await self.client.reasoning.create(
+            messages=messages,
+            model=model or "openai/gpt-oss-20b",
+            temperature=0.7,
+            max_tokens=CHUTES_MAX_TOKENS,
+        )
+        return self._reasoning_output(response)
+
+    async def stream_llm_response(self, messages, model=ChutesAI.model):
+        chunks = await self.client.chat.completions.create(
+            messages = messages,
+            model = model or self.model,
+            stream = True,
+            **self.sampling,
+        )
+        async for chunk in chunks:
+            text = chunk_text(chunk)
+            if text:
+                yield text
+
+    async def stream_reasoning_response(self, messages, model="openai/gpt-oss-20b"):
+        chunks = await self.client.reasoning.create(
+            messages=messages,
+            model=model or "openai/gpt-oss-20b",
+            temperature=0.7,
+            max_tokens=CHUTES_MAX_TOKENS,
+            stream=True,
+        )
+        async for chunk in chunks:
+            text = chunk_text(chunk, reasoning=True)
+            if text:
+                yield text
+
+    @staticmethod
+    async def _ajoined(texts):
+        try:
+            return "".join([text async for text in texts]).strip()
+        except Exception as e:
+            cprint(f"[ERROR in streamed completion]: {e}", color=Colors.Text.RED)
+            return ""
+
+
 # llm
 llm = GroqLLM()
 # llm = ChutesAI()
 
-def get_llm_response(messages, model=None):
+# async llm
+async_llm = AsyncGroqLLM()
+# async_llm = AsyncChutesAI()
+
+# Providers in LLM_PROVIDERS that have credentials; calls are routed between
+# them by latency (core.llms.router).
+_PROVIDERS = {
+    "groq": (lambda: len(groq_keys) > 0, lambda: llm, lambda: async_llm),
+    "chutes": (lambda: bool(os.getenv("CHUTES_API_KEY")), ChutesAI, AsyncChutesAI),
+}
+_enabled = [name for name in LLM_PROVIDERS if name in _PROVIDERS and _PROVIDERS[name][0]()] or ["groq"]
+router = LLMRouter(
+    backends={name: _PROVIDERS[name][1]() for name in _enabled},
+    abackends={name: _PROVIDERS[name][2]() for name in _enabled},
+)
+
+
+def context_tokens(model):
+    """Prompt + answer tokens one request to model may use."""
+    return LLM_CONTEXT_TOKENS_BY_MODEL.get(model, LLM_CONTEXT_TOKENS)
+
+
+def serving_routes():
+    """[(name, async backend)] that may answer the next routed call: the preferred one, and the next when hedging."""
+    routes = router.routes(router.abackends)
+    return routes[:2] if router.hedge else routes[:1]
+
+
+def _cache_key(backend, messages, model):
+    # sync and async clients of one provider share entries
+    name = type(backend).__name__.replace("Async", "", 1)
+    return cache_key(name, model or backend.model, messages, backend.sampling)
+
+
+def _cached(backends, messages, model, validate=None):
+    """A cached answer from any routable provider, else None."""
+    for _, backend in router.routes(backends, model):
+        cached = response_cache.get(_cache_key(backend, messages, model))
+        if cached is not None and (validate is None or validate(cached)):
+            return cached
+    return None
+
+
+def get_llm_response(messages, model=None, bypass_cache=False, validate=None):
+    """
+    bypass_cache=True forces a fresh response (which then replaces the cached
+    one). validate(response) -> bool rejects answers that do not parse: they
+    count as a failed call of their route and are not cached.
+    """
+    if not bypass_cache:
+        cached = _cached(router.backends, messages, model, validate)
+        if cached is not None:
+            return cached
     try:
-        return llm.get_llm_response(messages, model)
+        name, response = router.get_llm_response(messages, model, validate)
     except Exception as e:
         cprint(f"[ERROR in get_llm_response]: {e}", color=Colors.Text.RED)
         return ""
+    if name:
+        backend = router.backends[name]
+        response_cache.put(_cache_key(backend, messages, model), response, model=model or backend.model)
+    return response
+
+
+# caps concurrent LLM calls across every caller in the process
+_llm_slots = asyncio.Semaphore(LLM_CONCURRENCY)
+
+
+async def aget_llm_response(messages, model=None, bypass_cache=False, validate=None):
+    if not bypass_cache:
+        cached = _cached(router.abackends, messages, model, validate)
+        if cached is not None:
+            return cached
+    async with _llm_slots:
+        try:
+            name, response = await router.aget_llm_response(messages, model, validate)
+        except Exception as e:
+            cprint(f"[ERROR in aget_llm_response]: {e}", color=Colors.Text.RED)
+            return ""
+    if name:
+        backend = router.abackends[name]
+        response_cache.put(_cache_key(backend, messages, model), response, model=model or backend.model)
+    return response
@@ -0,0 +1,163 @@
+# llm response cache
+
+"""
+Content-addressed, on-disk cache of LLM responses.
+
+Retries, restarts and clusters that come back cycle after cycle send the same
+prompt again. Responses are stored in SQLite under a sha256 of
+(backend, model, messages, sampling parameters), so any change to the prompt
+or the sampling settings is a different key. Entries expire after
+LLM_CACHE_TTL_HOURS. Once the cache grows past LLM_CACHE_MAX_MB, the least
+recently used entries are evicted. Empty responses (failed calls) are never
+stored.
+"""
+
+import os
+import time
+import hashlib
+import sqlite3
+import threading
+
+from core.configs import LLM_CACHE_PATH, LLM_CACHE_TTL_HOURS, LLM_CACHE_MAX_MB, LLM_CACHE_ENABLED
+from core.colored import cprint, Colors
+from core import serde
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_cache (
+    key        TEXT PRIMARY KEY,
+    model      TEXT,
+    response   TEXT NOT NULL,
+    size       INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    used_at    REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_llm_cache_used_at ON llm_cache (used_at);
+"""
+PURGE_EVERY = 3600  # seconds between expiry sweeps
+
+
+def cache_key(backend, model, messages, params=None):
+    payload = {"backend": backend, "model": model, "messages": messages, "params": params or {}}
+    return hashlib.sha256(serde.dumps(payload)).hexdigest()
+
+
+class ResponseCache:
+    def __init__(self, db_path=LLM_CACHE_PATH, ttl_hours=LLM_CACHE_TTL_HOURS,
+                 max_mb=LLM_CACHE_MAX_MB, enabled=LLM_CACHE_ENABLED):
+        self.db_path = db_path
+        self.ttl = ttl_hours * 3600
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self._size = 0
+        self._conn = None
+        self._purged_at = 0.0
+        self._lock = threading.RLock()
+
+    def _connect(self):
+        if self._conn is not None:
+            return self._conn
+        with self._lock:
+            if self._conn is None:
+                os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+                conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                conn.executescript(SCHEMA)
+                conn.commit()
+                self._size = conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()[0]
+                self._conn = conn
+        return self._conn
+
+    def get(self, key):
+        """Cached response for key, or None. A hit refreshes the entry's LRU position."""
+        if not self.enabled:
+            return None
+        conn = self._connect()
+        self._maybe_purge()
+        now = time.time()
+        with self._lock:
+            row = conn.execute(
+                "SELECT response FROM llm_cache WHERE key = ? AND created_at >= ?",
+                (key, now - self.ttl),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            conn.execute("UPDATE llm_cache SET used_at = ? WHERE key = ?", (now, key))
+            conn.commit()
+            self.hits += 1
+        return row[0]
+
+    def put(self, key, response, model=None):
+        if not self.enabled or not response:
+            return
+        conn = self._connect()
+        size = len(response.encode("utf-8"))
+        now = time.time()
+        with self._lock:
+            old = conn.execute("SELECT size FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, model, response, size, created_at, used_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, response, size, now, now),
+            )
+            self._size += size - (old[0] if old else 0)
+            self.writes += 1
+            self._evict()
+            conn.commit()
+
+    def _evict(self):
+        """Drops least recently used entries until the cache fits in max_bytes."""
+        while self._size > self.max_bytes:
+            rows = self._conn.execute(
+                "SELECT key, size FROM llm_cache ORDER BY used_at LIMIT 64"
+            ).fetchall()
+            if not rows:
+                self._size = 0
+                return
+            for key, size in rows:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._size -= size
+                self.evictions += 1
+                if self._size <= self.max_bytes:
+                    return
+
+    def _maybe_purge(self):
+        now = time.time()
+        if now - self._purged_at < PURGE_EVERY:
+            return
+        self._purged_at = now
+        self.purge()
+
+    def purge(self):
+        """Deletes expired entries. Returns how many were removed."""
+        conn = self._connect()
+        with self._lock:
+            cur = conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (time.time() - self.ttl,))
+            conn.commit()
+            self._size = conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()[0]
+        return cur.rowcount
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "writes": self.writes,
+            "evictions": self.evictions,
+            "size_mb": round(self._size / (1024 * 1024), 2),
+        }
+
+    def log(self):
+        s = self.stats()
+        cprint(f" [LLM-CACHE] {s['hits']} hits / {s['misses']} misses (hit rate {s['hit_rate']:.0%}), "
+               f"{s['writes']} writes, {s['evictions']} evicted, {s['size_mb']} MB", color=Colors.Text.CYAN)
+
+
+response_cache = ResponseCache()
@@ -18,15 +18,28 @@ curl -X POST \
 """
 
 
+import asyncio
+import httpx
 import requests
-import json
-from typing import Optional, Dict, Any
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from core import serde
+from core.configs import CHUTES_TIMEOUT, CHUTES_CONNECT_TIMEOUT, CHUTES_RETRIES, CHUTES_POOL_SIZE
+from typing import Optional, Dict, Any, Iterator, AsyncIterator
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+DONE = object()  # the stream's [DONE] marker
 
 
 class ChutesLLMConfig:
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, timeout: float = CHUTES_TIMEOUT, connect_timeout: float = CHUTES_CONNECT_TIMEOUT,
+                 retries: int = CHUTES_RETRIES, pool_size: int = CHUTES_POOL_SIZE):
         self.api_key = api_key
         self.chat_completion_url = "https://llm.chutes.ai/v1/chat/completions"
+        self.timeout = timeout                  # read timeout; for streams, the longest gap between chunks
+        self.connect_timeout = connect_timeout
+        self.retries = retries                  # on connection errors and 429/5xx, with backoff
+        self.pool_size = pool_size              # kept-alive connections
 
 
 class ChutesLLMError(Exception):
@@ -36,68 +49,222 @@ class ChutesLLMError(Exception):
         self.response = response
 
 
+def _prepare_request(config: ChutesLLMConfig, kwargs: Dict[str, Any]):
+    headers = {
+        "Authorization": f"Bearer {config.api_key}",
+        "Content-Type": "application/json"
+    }
+
+    model = kwargs.get("model", '') or "chutesai/Llama-4-Maverick-17B-128E-Instruct-FP8"
+    messages = kwargs.get("messages", [])
+    temperature = kwargs.get("temperature", 0.7)
+    max_tokens = kwargs.get("max_tokens", 150)
+    stream = kwargs.get("stream", False)
+
+    # Prepare the request payload
+    payload = {
+        "model": model,
+        "messages": messages,
+        "stream": stream,
+        "max_tokens": max_tokens,
+        "temperature": temperature
+    }
+
+    if kwargs.get('debug', False):
+        print(f"Making request to: {config.chat_completion_url}")
+        print(f"Headers: {serde.pretty(headers)}")
+        print(f"Payload: {serde.pretty(payload)}")
+    return headers, payload
+
+
+def _handle_response(status_code: int, headers, content: bytes, debug=False) -> Dict[str, Any]:
+    if debug:
+        print(f"Response status code: {status_code}")
+        print(f"Response headers: {serde.pretty(dict(headers))}")
+
+    try:
+        response_json = serde.loads(content)
+        if debug:
+            print(f"Response body: {serde.pretty(response_json)}")
+    except serde.JSONDecodeError:
+        if debug:
+            print(f"Raw response text: {content[:2000]!r}")
+        raise ChutesLLMError("Failed to decode API response")
+
+    if status_code >= 400:
+        error_detail = response_json.get('detail', 'Unknown error')
+        raise ChutesLLMError(
+            f"API request failed: {error_detail}",
+            status_code=status_code,
+            response=response_json
+        )
+
+    return response_json
+
+
+def _sse_event(line):
+    """
+    One server-sent-event line -> chunk dict. None for keep-alives, comments
+    and other non-data lines; DONE at the [DONE] marker.
+    """
+    if isinstance(line, bytes):
+        line = line.decode("utf-8")
+    line = line.strip()
+    if not line.startswith("data:"):
+        return None
+    data = line[5:].strip()
+    if data == "[DONE]":
+        return DONE
+    try:
+        chunk = serde.loads(data)
+    except serde.JSONDecodeError:
+        raise ChutesLLMError(f"Failed to decode stream chunk: {data[:200]!r}")
+    if isinstance(chunk, dict) and chunk.get("error"):
+        raise ChutesLLMError(f"Stream error: {chunk['error']}", response=chunk)
+    return chunk
+
+
+def chunk_text(chunk: Dict[str, Any], reasoning: bool = False) -> str:
+    """Text delta of one stream chunk (reasoning_content too when asked)."""
+    choice = (chunk.get("choices") or [{}])[0]
+    delta = choice.get("delta") or {}
+    text = delta.get("content") or ""
+    if reasoning and not text:
+        text = delta.get("reasoning_content") or ""
+    return text
+
+
 class Completions:
+    """Completions over one pooled requests.Session (keep-alive, retries)."""
+
     def __init__(self, config: ChutesLLMConfig):
         self.config = config
+        self._session = None
+
+    @property
+    def session(self) -> requests.Session:
+        if self._session is None:
+            retry = Retry(
+                total=self.config.retries,
+                backoff_factor=0.5,
+                status_forcelist=RETRY_STATUSES,
+                allowed_methods=None,  # POST too: a completion has no side effects
+                respect_retry_after_header=True,
+                raise_on_status=False,
+            )
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.config.pool_size, max_retries=retry)
+            session = requests.Session()
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            self._session = session
+        return self._session
 
-    def create(self, **kwargs) -> Dict[str, Any]:
+    def create(self, **kwargs):
         """
-        Create a chat completion request similar to OpenAI's interface
+        Create a chat completion request similar to OpenAI's interface.
+        With stream=True, returns an iterator of chunk dicts as they arrive.
         """
-        headers = {
-            "Authorization": f"Bearer {self.config.api_key}",
-            "Content-Type": "application/json"
-        }
-
-        model = kwargs.get("model", '') or "chutesai/Llama-4-Maverick-17B-128E-Instruct-FP8"
-        messages = kwargs.get("messages", [])
-        temperature = kwargs.get("temperature", 0.7)
-        max_tokens = kwargs.get("max_tokens", 150)
-        stream = kwargs.get("stream", False)
-
-        # try:
-        # Prepare the request payload
-        payload = {
-            "model": model,
-            "messages": messages,
-            "stream": stream,
-            "max_tokens": max_tokens,
-            "temperature": temperature
-        }
-
-        if kwargs.get('debug', False):
-            print(f"Making request to: {self.config.chat_completion_url}")
-            print(f"Headers: {json.dumps(headers, indent=2)}")
-            print(f"Payload: {json.dumps(payload, indent=2)}")
-
-        response = requests.post(
+        headers, payload = _prepare_request(self.config, kwargs)
+        response = self.session.post(
             f"{self.config.chat_completion_url}",
             headers=headers,
-            json=payload
+            data=serde.dumps(payload),
+            timeout=(self.config.connect_timeout, self.config.timeout),
+            stream=payload["stream"],
         )
+        if payload["stream"]:
+            return self._iter_stream(response, debug=kwargs.get('debug', False))
+        return _handle_response(response.status_code, response.headers, response.content,
+                                debug=kwargs.get('debug', False))
+
+    def _iter_stream(self, response, debug=False) -> Iterator[Dict[str, Any]]:
+        with response:
+            if response.status_code >= 400:
+                _handle_response(response.status_code, response.headers, response.content, debug=debug)
+            done = False
+            for line in response.iter_lines():
+                if done:
+                    continue  # read to the end so the connection goes back to the pool
+                chunk = _sse_event(line)
+                if chunk is DONE:
+                    done = True
+                elif chunk is not None:
+                    yield chunk
+
+    def close(self):
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
 
-        if kwargs.get('debug', False):
-            print(f"Response status code: {response.status_code}")
-            print(f"Response headers: {json.dumps(dict(response.headers), indent=2)}")
-
-        try:
-            response_json = response.json()
-            if kwargs.get('debug', False):
-                print(f"Response body: {json.dumps(response_json, indent=2)}")
-        except json.JSONDecodeError:
-            if kwargs.get('debug', False):
-                print(f"Raw response text: {response.text}")
-            raise ChutesLLMError("Failed to decode API response")
-
-        if response.status_code >= 400:
-            error_detail = response_json.get('detail', 'Unknown error')
-            raise ChutesLLMError(
-                f"API request failed: {error_detail}",
-                status_code=response.status_code,
-                response=response_json
+class AsyncCompletions:
+    """Completions over one shared httpx.AsyncClient (connection reuse, retries)."""
+
+    def __init__(self, config: ChutesLLMConfig):
+        self.config = config
+        self._http = None
+
+    @property
+    def http(self) -> httpx.AsyncClient:
+        if self._http is None:
+            self._http = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.config.timeout, connect=self.config.connect_timeout),
+                limits=httpx.Limits(max_connections=self.config.pool_size,
+                                    max_keepalive_connections=self.config.pool_size),
+                transport=httpx.AsyncHTTPTransport(retries=self.config.retries),  # connect errors
             )
+        return self._http
+
+    async def create(self, **kwargs):
+        """Awaitable create(); with stream=True returns an async iterator of chunk dicts."""
+        headers, payload = _prepare_request(self.config, kwargs)
+        if payload["stream"]:
+            return self._iter_stream(headers, payload, debug=kwargs.get('debug', False))
+        for attempt in range(self.config.retries + 1):
+            response = await self.http.post(
+                self.config.chat_completion_url,
+                headers=headers,
+                content=serde.dumps(payload)
+            )
+            if response.status_code not in RETRY_STATUSES or attempt == self.config.retries:
+                break
+            await asyncio.sleep(_retry_delay(response.headers, attempt))
+        return _handle_response(response.status_code, response.headers, response.content,
+                                debug=kwargs.get('debug', False))
+
+    async def _iter_stream(self, headers, payload, debug=False) -> AsyncIterator[Dict[str, Any]]:
+        for attempt in range(self.config.retries + 1):
+            async with self.http.stream("POST", self.config.chat_completion_url,
+                                        headers=headers, content=serde.dumps(payload)) as response:
+                if response.status_code in RETRY_STATUSES and attempt < self.config.retries:
+                    await response.aread()
+                    delay = _retry_delay(response.headers, attempt)
+                else:
+                    if response.status_code >= 400:
+                        _handle_response(response.status_code, response.headers, await response.aread(), debug=debug)
+                    done = False
+                    async for line in response.aiter_lines():
+                        if done:
+                            continue  # read to the end so the connection goes back to the pool
+                        chunk = _sse_event(line)
+                        if chunk is DONE:
+                            done = True
+                        elif chunk is not None:
+                            yield chunk
+                    return
+            await asyncio.sleep(delay)
 
-        return response_json
+    async def aclose(self):
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+
+def _retry_delay(headers, attempt: int) -> float:
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return 0.5 * (2 ** attempt)
 
 
 class Chat:
@@ -113,11 +280,10 @@ class Reasoning:
     """
     DEFAULT_MODEL = "openai/gpt-oss-20b"
 
-    def __init__(self, config: ChutesLLMConfig):
-        self._config = config
-        self._completions = Completions(config)
+    def __init__(self, completions: Completions):
+        self._completions = completions
 
-    def create(self, **kwargs) -> Dict[str, Any]:
+    def create(self, **kwargs):
         """
         Same signature as Completions.create, but:
         - defaults model to GPT-OSS 20B
@@ -133,4 +299,36 @@ class ChutesLLM:
     def __init__(self, api_key: str):
         self.config = ChutesLLMConfig(api_key=api_key)
         self.chat = Chat(self.config)
-        self.reasoning = Reasoning(self.config)
+        self.reasoning = Reasoning(self.chat.completions)
+
+    def close(self):
+        self.chat.completions.close()
+
+
+# ---- Async client ----
+class AsyncChat:
+    def __init__(self, config: ChutesLLMConfig):
+        self.completions = AsyncCompletions(config)
+
+
+class AsyncReasoning:
+    DEFAULT_MODEL = Reasoning.DEFAULT_MODEL
+
+    def __init__(self, completions: AsyncCompletions):
+        self._completions = completions
+
+    async def create(self, **kwargs):
+        if not kwargs.get("model"):
+            kwargs["model"] = self.DEFAULT_MODEL
+        kwargs.setdefault("stream", False)
+        return await self._completions.create(**kwargs)
+
+
+class AsyncChutesLLM:
+    def __init__(self, api_key: str):
+        self.config = ChutesLLMConfig(api_key=api_key)
+        self.chat = AsyncChat(self.config)
+        self.reasoning = AsyncReasoning(self.chat.completions)
+
+    async def aclose(self):
+        await self.chat.completions.aclose()
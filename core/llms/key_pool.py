@@ -0,0 +1,262 @@
+# groq key pool
+
+"""
+Pool of Groq API keys, each with its own rate-limit state.
+
+Every response carries x-ratelimit-* headers (requests and tokens left, and
+when each resets); they are read through with_raw_response and folded into
+the key they came from. A call goes to the key with the most headroom, and
+the estimated tokens of the call are reserved on it until the response
+headers replace the estimate. A key that gets a 429 sits out until its
+retry-after / reset, a key with bad credentials sits out for
+GROQ_KEY_AUTH_COOLDOWN. When no key can take a call, callers wait (sync: on a
+condition, async: asleep) until the earliest key frees up, for at most
+GROQ_KEY_MAX_WAIT. Each key keeps one sync and one async client.
+"""
+
+import re
+import time
+import asyncio
+import threading
+
+from groq import (
+    Groq, AsyncGroq, RateLimitError, AuthenticationError, PermissionDeniedError,
+    APIConnectionError, InternalServerError,
+)
+
+from core.configs import GROQ_KEY_MAX_WAIT, GROQ_KEY_ERROR_COOLDOWN, GROQ_KEY_AUTH_COOLDOWN
+from core.colored import cprint, Colors
+from .tokens import estimate_messages_tokens, token_stats
+
+
+DEFAULT_BACKOFF = 10          # seconds a throttled key sits out when the 429 carries no hint
+EST_COMPLETION_TOKENS = 1000  # reserved for the answer on top of the prompt estimate
+
+_DURATION = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_UNITS = {"h": 3600, "m": 60, "s": 1, "ms": 0.001}
+
+
+class NoKeyAvailable(Exception):
+    pass
+
+
+def parse_duration(value):
+    """'2m59.56s' / '7.66s' / '120ms' / '30' -> seconds, or None."""
+    if value is None:
+        return None
+    value = str(value).strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION.findall(value)
+    if not parts:
+        return None
+    return sum(float(n) * _UNITS[unit] for n, unit in parts)
+
+
+def request_token_cost(messages, model=None):
+    """Tokens a call is expected to count against a key: the prompt (calibrated for model) plus the answer."""
+    return token_stats.calibrated(estimate_messages_tokens(messages), model) + EST_COMPLETION_TOKENS
+
+
+class GroqKey:
+    def __init__(self, name, api_key):
+        self.name = name
+        self.api_key = api_key
+        self.limit_requests = None
+        self.limit_tokens = None
+        self.remaining_requests = None
+        self.remaining_tokens = None
+        self.requests_reset_at = 0.0
+        self.tokens_reset_at = 0.0
+        self.cooldown_until = 0.0
+        self.reserved = 0  # estimated tokens of calls in flight
+        self.inflight = 0
+        self.calls = 0
+        self.throttled = 0
+        self._client = None
+        self._aclient = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = Groq(api_key=self.api_key, max_retries=0)
+        return self._client
+
+    @property
+    def aclient(self):
+        if self._aclient is None:
+            self._aclient = AsyncGroq(api_key=self.api_key, max_retries=0)
+        return self._aclient
+
+    def _refill(self, now):
+        if self.remaining_requests is not None and now >= self.requests_reset_at:
+            self.remaining_requests = self.limit_requests
+        if self.remaining_tokens is not None and now >= self.tokens_reset_at:
+            self.remaining_tokens = self.limit_tokens
+
+    def available_at(self, tokens, now):
+        """Earliest time this key can take a call of ~tokens (now if it can right away)."""
+        self._refill(now)
+        at = max(now, self.cooldown_until)
+        if self.remaining_requests is not None and self.remaining_requests <= 0:
+            at = max(at, self.requests_reset_at)
+        if self.remaining_tokens is not None and self.remaining_tokens - self.reserved < tokens:
+            at = max(at, self.tokens_reset_at)
+        return at
+
+    def headroom(self, now):
+        """0..1, the tighter of the request and token fractions left (1 when unknown)."""
+        self._refill(now)
+        fractions = [1.0]
+        if self.remaining_requests is not None and self.limit_requests:
+            fractions.append(self.remaining_requests / self.limit_requests)
+        if self.remaining_tokens is not None and self.limit_tokens:
+            fractions.append((self.remaining_tokens - self.reserved) / self.limit_tokens)
+        return min(fractions)
+
+    def update(self, headers, now):
+        def num(name):
+            try:
+                return int(float(headers.get(name)))
+            except (TypeError, ValueError):
+                return None
+
+        limit_requests = num("x-ratelimit-limit-requests")
+        limit_tokens = num("x-ratelimit-limit-tokens")
+        remaining_requests = num("x-ratelimit-remaining-requests")
+        remaining_tokens = num("x-ratelimit-remaining-tokens")
+        if limit_requests is not None:
+            self.limit_requests = limit_requests
+        if limit_tokens is not None:
+            self.limit_tokens = limit_tokens
+        if remaining_requests is not None:
+            self.remaining_requests = remaining_requests
+            self.requests_reset_at = now + (parse_duration(headers.get("x-ratelimit-reset-requests")) or 0)
+        if remaining_tokens is not None:
+            self.remaining_tokens = remaining_tokens
+            self.tokens_reset_at = now + (parse_duration(headers.get("x-ratelimit-reset-tokens")) or 0)
+
+    def snapshot(self, now=None):
+        now = now or time.time()
+        return {
+            "key": self.name,
+            "headroom": round(self.headroom(now), 3),
+            "remaining_requests": self.remaining_requests,
+            "remaining_tokens": self.remaining_tokens,
+            "cooldown": max(0.0, round(self.cooldown_until - now, 1)),
+            "inflight": self.inflight,
+            "calls": self.calls,
+            "throttled": self.throttled,
+        }
+
+
+class KeyPool:
+    def __init__(self, keys, max_wait=GROQ_KEY_MAX_WAIT):
+        """keys: [(name, api_key)]; entries without an api key are skipped."""
+        self.keys = [GroqKey(name, api_key) for name, api_key in keys if api_key]
+        self.max_wait = max_wait
+        self._cond = threading.Condition()
+
+    def __len__(self):
+        return len(self.keys)
+
+    # --- picking a key ---
+
+    def _try_acquire(self, tokens):
+        """(key, None) if one can take the call now, else (None, seconds until one can)."""
+        now = time.time()
+        ready = [k for k in self.keys if k.available_at(tokens, now) <= now]
+        if ready:
+            key = max(ready, key=lambda k: (k.headroom(now), -k.inflight))
+            key.reserved += tokens
+            key.inflight += 1
+            key.calls += 1
+            return key, None
+        if not self.keys:
+            return None, None
+        return None, min(k.available_at(tokens, now) for k in self.keys) - now
+
+    def acquire(self, tokens):
+        """Blocks until a key can take a call of ~tokens."""
+        deadline = time.monotonic() + self.max_wait
+        with self._cond:
+            while True:
+                key, wait = self._try_acquire(tokens)
+                if key:
+                    return key
+                self._check_wait(wait, deadline)
+                self._cond.wait(timeout=min(wait, deadline - time.monotonic()))
+
+    async def aacquire(self, tokens):
+        deadline = time.monotonic() + self.max_wait
+        while True:
+            with self._cond:
+                key, wait = self._try_acquire(tokens)
+            if key:
+                return key
+            self._check_wait(wait, deadline)
+            # woken by the clock only; a release that frees capacity is picked
+            # up at the latest one second later
+            await asyncio.sleep(min(wait, deadline - time.monotonic(), 1.0))
+
+    def _check_wait(self, wait, deadline):
+        if wait is None:
+            raise NoKeyAvailable("no Groq API keys configured")
+        if time.monotonic() + wait > deadline:
+            raise NoKeyAvailable(f"all {len(self.keys)} Groq keys busy for another {wait:.0f}s")
+
+    # --- reporting back ---
+
+    def release(self, key, tokens, headers=None):
+        """After a completed call: headers replace the reservation with the real numbers."""
+        with self._cond:
+            key.reserved = max(0, key.reserved - tokens)
+            key.inflight = max(0, key.inflight - 1)
+            if headers is not None:
+                key.update(headers, time.time())
+            self._cond.notify_all()
+
+    def throttle(self, key, tokens, headers=None):
+        """429: the key sits out until retry-after / its reset."""
+        now = time.time()
+        with self._cond:
+            if headers is not None:
+                key.update(headers, now)
+            wait = parse_duration((headers or {}).get("retry-after"))
+            if wait is None:
+                resets = [at - now for at in (key.requests_reset_at, key.tokens_reset_at) if at > now]
+                wait = max(resets) if resets else DEFAULT_BACKOFF
+            key.cooldown_until = now + wait
+            key.throttled += 1
+            self.release(key, tokens)
+        cprint(f" [GROQ-KEYS] {key.name} throttled, cooling down {wait:.0f}s", color=Colors.Text.YELLOW)
+
+    def fail(self, key, tokens, error, auth=False):
+        """Errors other than 429: short cooldown, long one for bad credentials."""
+        wait = GROQ_KEY_AUTH_COOLDOWN if auth else GROQ_KEY_ERROR_COOLDOWN
+        with self._cond:
+            key.cooldown_until = time.time() + wait
+            self.release(key, tokens)
+        cprint(f" [GROQ-KEYS] {key.name} failed ({error}), cooling down {wait:.0f}s", color=Colors.Text.RED)
+
+    def report_error(self, key, tokens, error):
+        """Routes a failed call's error to the key. True if the call is worth retrying on another key."""
+        if isinstance(error, RateLimitError):
+            self.throttle(key, tokens, headers=error.response.headers)
+            return True
+        if isinstance(error, (AuthenticationError, PermissionDeniedError)):
+            self.fail(key, tokens, error, auth=True)
+            return True
+        if isinstance(error, (APIConnectionError, InternalServerError)):
+            self.fail(key, tokens, error)
+            return True
+        # bad request and the like: another key would not do better
+        self.release(key, tokens)
+        return False
+
+    def snapshot(self):
+        now = time.time()
+        with self._cond:
+            return [k.snapshot(now) for k in self.keys]
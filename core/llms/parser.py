@@ -1,5 +1,5 @@
 import re
-import json
+from core import serde
 from core.colored import cprint, Colors
 
 
@@ -44,8 +44,8 @@ class Parser:
 
         # Parse and return JSON as a dict
         try:
-            return json.loads(json_str)
-        except json.JSONDecodeError:
+            return serde.loads(json_str)
+        except serde.JSONDecodeError:
             raise ValueError("Invalid JSON format: Failed to parse JSON.")
 
     def __is_valid_data(self, response: dict, expected_keys: set) -> bool:
@@ -106,4 +106,72 @@ class Parser:
             }
 
         return response_json
+
+    def is_news_json(self, raw_input: str) -> bool:
+        """True if raw_input holds a complete news object. Quiet: used to score LLM routes."""
+        try:
+            response_json = self.__extract_json_from_text(raw_input or "")
+        except Exception:
+            return False
+        return (self.__is_valid_data(response=response_json, expected_keys={'headline_str', 'content_str', 'tags_list'})
+                and bool(response_json['headline_str']))
+
+    def get_news_json_batch(self, raw_input: str, count: int, verbose=True):
+        """
+        Parses a batched answer: a JSON array of news objects keyed by "index".
+
+        Partial success is kept: objects that parse and validate are returned,
+        anything missing or malformed is reported as failed. If the array as a
+        whole does not parse (e.g. a truncated answer), each complete object in
+        it is tried on its own.
+
+        Returns:
+            (dict, list): {index: news_json}, sorted indices that failed.
+        """
+        expected_keys = {
+            'index',
+            'headline_str',
+            'content_str',
+            'tags_list'
+        }
+
+        results = {}
+        for obj in self.__extract_json_objects(raw_input or ""):
+            if not self.__is_valid_data(response=obj, expected_keys=expected_keys):
+                continue
+            index = obj.pop('index')
+            if not isinstance(index, int) or not 0 <= index < count or index in results:
+                continue
+            if not obj['headline_str'] or not obj['content_str']:
+                continue
+            results[index] = obj
+
+        failed = [i for i in range(count) if i not in results]
+        if failed and verbose:
+            cprint(f"[PARSER] Batch: {len(results)}/{count} items parsed, failed {failed}", color=Colors.Text.YELLOW)
+        return results, failed
+
+    def __extract_json_objects(self, text: str) -> list:
+        text = text.strip()
+        fenced_match = re.search(r"```(?:json)?\s*(.*?)\s*```", text, re.DOTALL | re.IGNORECASE)
+        if fenced_match:
+            text = fenced_match.group(1)
+
+        start, end = text.find("["), text.rfind("]")
+        if start != -1 and end > start:
+            try:
+                parsed = serde.loads(text[start:end + 1])
+                if isinstance(parsed, list):
+                    return parsed
+            except serde.JSONDecodeError:
+                pass
+
+        # salvage: every flat {...} that parses on its own
+        objects = []
+        for match in re.finditer(r"\{[^{}]*\}", text):
+            try:
+                objects.append(serde.loads(match.group(0)))
+            except serde.JSONDecodeError:
+                continue
+        return objects
     
\ No newline at end of file
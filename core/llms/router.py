@@ -0,0 +1,261 @@
+# llm router
+
+"""
+Latency-aware routing over the LLM backends (Groq, Chutes).
+
+Every call's latency and outcome is recorded per provider and model in a
+rolling window (LLM_ROUTER_WINDOW seconds). p50/p95 come from the successful
+calls in the window. A route counts as unhealthy while its error rate is
+above LLM_MAX_ERROR_RATE; old outcomes age out, so it is tried again later.
+Each call goes to the healthy route with the lowest p50. Routes without
+enough samples yet go first, so every backend gets measured.
+
+With hedging on (LLM_HEDGE), if the first route has not answered within its
+p95 (at least LLM_HEDGE_MIN_DELAY), the same request goes to the next route
+and whichever answers first wins. A failed or empty answer falls through to
+the next route as well, and so does one the caller's validate(response)
+rejects (e.g. JSON that does not parse); it counts as an error of its route.
+A hedge loser that is cancelled is recorded only once it has run past its
+route's p95, as a lower bound; a shorter cut-off time says nothing.
+
+An explicit model name is provider-specific, so such calls are not routed:
+they go to the first backend.
+"""
+
+import time
+import asyncio
+import threading
+from collections import deque
+from concurrent import futures
+
+from core.configs import (
+    LLM_HEDGE,
+    LLM_HEDGE_MIN_DELAY,
+    LLM_ROUTER_WINDOW,
+    LLM_MAX_ERROR_RATE,
+    LLM_CONCURRENCY,
+)
+from core.colored import cprint, Colors
+
+MIN_SAMPLES = 3             # successes before a route's latency is trusted
+UNKNOWN_HEDGE_DELAY = 15.0  # hedge delay while the first route has no p95 yet
+
+
+class RouteStats:
+    def __init__(self, name, window=LLM_ROUTER_WINDOW):
+        self.name = name
+        self.window = window
+        self._outcomes = deque()  # (finished_at, latency, ok)
+        self._lock = threading.Lock()
+
+    def record(self, latency, ok):
+        with self._lock:
+            self._outcomes.append((time.time(), latency, ok))
+            self._prune()
+
+    def _prune(self):
+        cutoff = time.time() - self.window
+        while self._outcomes and self._outcomes[0][0] < cutoff:
+            self._outcomes.popleft()
+
+    def _latencies(self):
+        with self._lock:
+            self._prune()
+            return sorted(lat for _, lat, ok in self._outcomes if ok)
+
+    def percentile(self, p):
+        latencies = self._latencies()
+        if len(latencies) < MIN_SAMPLES:
+            return None
+        return latencies[min(len(latencies) - 1, int(p * len(latencies)))]
+
+    @property
+    def p50(self):
+        return self.percentile(0.5)
+
+    @property
+    def p95(self):
+        return self.percentile(0.95)
+
+    @property
+    def error_rate(self):
+        with self._lock:
+            self._prune()
+            if not self._outcomes:
+                return 0.0
+            return sum(1 for _, _, ok in self._outcomes if not ok) / len(self._outcomes)
+
+    @property
+    def healthy(self):
+        return self.error_rate <= LLM_MAX_ERROR_RATE
+
+    def snapshot(self):
+        p50, p95 = self.p50, self.p95
+        with self._lock:
+            calls = len(self._outcomes)
+        return {
+            "route": self.name,
+            "calls": calls,
+            "p50": round(p50, 2) if p50 is not None else None,
+            "p95": round(p95, 2) if p95 is not None else None,
+            "error_rate": round(self.error_rate, 3),
+            "healthy": self.healthy,
+        }
+
+
+class LLMRouter:
+    def __init__(self, backends, abackends=None, hedge=LLM_HEDGE, hedge_min_delay=LLM_HEDGE_MIN_DELAY):
+        """
+        backends / abackends: {name: sync client} / {name: async client}, in
+        order of preference; each has .model and get_llm_response(messages, model).
+        """
+        self.backends = dict(backends)
+        self.abackends = dict(abackends or {})
+        self.hedge = hedge
+        self.hedge_min_delay = hedge_min_delay
+        self.stats = {}   # "provider:model" -> RouteStats
+        self.hedged = 0   # calls that sent a duplicate request
+        self._executor = None
+
+    # --- routing ---
+
+    def _route_stats(self, name, backend, model):
+        key = f"{name}:{model or backend.model}"
+        if key not in self.stats:
+            self.stats[key] = RouteStats(key)
+        return self.stats[key]
+
+    def routes(self, backends, model=None):
+        """[(name, backend)] fastest healthy first; unmeasured routes lead so they get measured."""
+        items = list(backends.items())
+        if model:
+            return items[:1]
+
+        def rank(item):
+            stats = self._route_stats(item[0], item[1], None)
+            p50 = stats.p50
+            return (not stats.healthy, stats.error_rate if not stats.healthy else 0.0,
+                    p50 is not None, p50 or 0.0)
+
+        return sorted(items, key=rank)  # stable: configured order breaks ties
+
+    def _hedge_delay(self, name, backend, model):
+        p95 = self._route_stats(name, backend, model).p95
+        return max(self.hedge_min_delay, p95 if p95 is not None else UNKNOWN_HEDGE_DELAY)
+
+    @staticmethod
+    def _outcome(stats, elapsed, response, validate):
+        ok = bool(response) and (validate is None or validate(response))
+        stats.record(elapsed, ok)
+        if response and not ok:
+            cprint(f" [ROUTER] {stats.name} answer rejected (does not parse)", color=Colors.Text.YELLOW)
+        return response if ok else ""
+
+    def _timed(self, name, backend, messages, model, validate=None):
+        stats = self._route_stats(name, backend, model)
+        t0 = time.monotonic()
+        try:
+            response = backend.get_llm_response(messages, model)
+        except Exception as e:
+            stats.record(time.monotonic() - t0, False)
+            cprint(f" [ROUTER] {stats.name} failed: {e}", color=Colors.Text.RED)
+            return ""
+        return self._outcome(stats, time.monotonic() - t0, response, validate)
+
+    async def _atimed(self, name, backend, messages, model, validate=None):
+        stats = self._route_stats(name, backend, model)
+        t0 = time.monotonic()
+        try:
+            response = await backend.get_llm_response(messages, model)
+        except asyncio.CancelledError:
+            # lost a hedge race; past its p95 the cut-off time still shows the route slowing down
+            elapsed, p95 = time.monotonic() - t0, stats.p95
+            if p95 is not None and elapsed > p95:
+                stats.record(elapsed, True)
+            raise
+        except Exception as e:
+            stats.record(time.monotonic() - t0, False)
+            cprint(f" [ROUTER] {stats.name} failed: {e}", color=Colors.Text.RED)
+            return ""
+        return self._outcome(stats, time.monotonic() - t0, response, validate)
+
+    # --- calls ---
+
+    def get_llm_response(self, messages, model=None, validate=None):
+        """Returns (backend name, response); the response is "" if every route failed."""
+        routes = self.routes(self.backends, model)
+        if not self.hedge or len(routes) < 2:
+            for name, backend in routes:
+                response = self._timed(name, backend, messages, model, validate)
+                if response:
+                    return name, response
+            return None, ""
+
+        if self._executor is None:
+            self._executor = futures.ThreadPoolExecutor(max_workers=2 * LLM_CONCURRENCY,
+                                                        thread_name_prefix="llm-hedge")
+        running = {}
+        waiting = list(routes)
+        while waiting or running:
+            if waiting and not running:
+                primary = waiting.pop(0)
+                running[self._executor.submit(self._timed, *primary, messages, model, validate)] = primary[0]
+            delay = self._hedge_delay(*primary, model) if waiting else None
+            done, _ = futures.wait(running, timeout=delay, return_when=futures.FIRST_COMPLETED)
+            if not done:
+                # first route is slower than its p95: race a duplicate
+                name, backend = waiting.pop(0)
+                running[self._executor.submit(self._timed, name, backend, messages, model, validate)] = name
+                self.hedged += 1
+                continue
+            for fut in done:
+                name = running.pop(fut)
+                if fut.result():
+                    return name, fut.result()  # the loser finishes in its thread and is ignored
+        return None, ""
+
+    async def aget_llm_response(self, messages, model=None, validate=None):
+        routes = self.routes(self.abackends, model)
+        if not self.hedge or len(routes) < 2:
+            for name, backend in routes:
+                response = await self._atimed(name, backend, messages, model, validate)
+                if response:
+                    return name, response
+            return None, ""
+
+        running = {}
+        waiting = list(routes)
+        try:
+            while waiting or running:
+                if waiting and not running:
+                    primary = waiting.pop(0)
+                    running[asyncio.create_task(self._atimed(*primary, messages, model, validate))] = primary[0]
+                delay = self._hedge_delay(*primary, model) if waiting else None
+                done, _ = await asyncio.wait(running, timeout=delay, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    name, backend = waiting.pop(0)
+                    running[asyncio.create_task(self._atimed(name, backend, messages, model, validate))] = name
+                    self.hedged += 1
+                    continue
+                for task in done:
+                    name = running.pop(task)
+                    if task.result():
+                        return name, task.result()
+            return None, ""
+        finally:
+            for task in running:
+                task.cancel()
+
+    # --- observability ---
+
+    def snapshot(self):
+        return {"hedged": self.hedged, "routes": [s.snapshot() for s in self.stats.values()]}
+
+    def log(self):
+        for s in self.snapshot()["routes"]:
+            p50 = f"{s['p50']}s" if s['p50'] is not None else "-"
+            p95 = f"{s['p95']}s" if s['p95'] is not None else "-"
+            cprint(f" [ROUTER] {s['route']}: {s['calls']} calls, p50 {p50}, p95 {p95}, "
+                   f"errors {s['error_rate']:.0%}{'' if s['healthy'] else ' (unhealthy)'}", color=Colors.Text.CYAN)
+        if self.hedged:
+            cprint(f" [ROUTER] {self.hedged} hedged requests", color=Colors.Text.CYAN)
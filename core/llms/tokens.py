@@ -0,0 +1,86 @@
+# token estimates
+
+"""
+Token estimates without a tokenizer dependency, checked against reality.
+
+estimate_tokens() is a character heuristic: about 4 ASCII characters per
+token, and fewer characters per token for non-Latin scripts (Kannada,
+Devanagari, emoji), which tokenizers split much finer. Every completion that
+reports usage records (estimated, actual) prompt tokens per model in
+token_stats. The running actual/estimated ratio is logged and is used to
+correct later estimates, so prompt budgets converge on real token counts.
+"""
+
+import math
+import threading
+
+from core.colored import cprint, Colors
+
+ASCII_CHARS_PER_TOKEN = 4.0
+OTHER_CHARS_PER_TOKEN = 1.5
+MESSAGE_OVERHEAD = 4   # role and separators per chat message
+MIN_CALLS = 3          # before a model's ratio is trusted
+
+
+def estimate_tokens(text: str) -> int:
+    if not text:
+        return 0
+    other = sum(1 for ch in text if ord(ch) > 127)
+    ascii_chars = len(text) - other
+    return math.ceil(ascii_chars / ASCII_CHARS_PER_TOKEN + other / OTHER_CHARS_PER_TOKEN)
+
+
+def estimate_messages_tokens(messages) -> int:
+    return sum(estimate_tokens(str(m.get("content", ""))) + MESSAGE_OVERHEAD for m in messages)
+
+
+class TokenStats:
+    def __init__(self):
+        self._models = {}  # model -> [calls, estimated, actual]
+        self._lock = threading.Lock()
+
+    def record(self, model, estimated, actual):
+        if not actual:
+            return
+        with self._lock:
+            row = self._models.setdefault(model, [0, 0, 0])
+            row[0] += 1
+            row[1] += estimated
+            row[2] += actual
+
+    def record_usage(self, model, messages, usage):
+        """usage: the provider's usage object or dict (prompt_tokens), may be None."""
+        if usage is None:
+            return
+        actual = usage.get("prompt_tokens") if isinstance(usage, dict) else getattr(usage, "prompt_tokens", None)
+        self.record(model, estimate_messages_tokens(messages), actual)
+
+    def ratio(self, model=None):
+        """actual / estimated for model (all models when None); 1.0 until there is data."""
+        with self._lock:
+            rows = [self._models[model]] if model in self._models else (
+                list(self._models.values()) if model is None else [])
+            calls = sum(r[0] for r in rows)
+            estimated = sum(r[1] for r in rows)
+            actual = sum(r[2] for r in rows)
+        if calls < MIN_CALLS or not estimated:
+            return 1.0
+        return min(3.0, max(0.5, actual / estimated))
+
+    def calibrated(self, tokens, model=None):
+        return math.ceil(tokens * self.ratio(model))
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                model: {"calls": c, "estimated": e, "actual": a, "ratio": round(a / e, 3) if e else None}
+                for model, (c, e, a) in self._models.items()
+            }
+
+    def log(self):
+        for model, s in self.snapshot().items():
+            cprint(f" [TOKENS] {model}: {s['calls']} calls, prompt tokens estimated {s['estimated']} "
+                   f"vs actual {s['actual']} (x{s['ratio']})", color=Colors.Text.CYAN)
+
+
+token_stats = TokenStats()
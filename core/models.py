@@ -1,35 +1,48 @@
 import os
-import json
 from datetime import datetime
-from uuid import uuid4
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Dict, Optional
 
-from core.configs import NEWS_DATA_STORE_DIR
+from core import serde
+from core.store import news_store
+from core.utils import derive_display_fields, new_item_id
+from core.shards import item_dir
 
 
 class NewsItemModel(BaseModel):
-    id: Optional[str] = f"{str(datetime.now().strftime("%I_%M_%p_%d_%m_%Y"))}_{str(uuid4())}"
+    id: Optional[str] = Field(default_factory=new_item_id)
     headline_str: Optional[str]
     content_str: str
     tags_list: Optional[List[str]] = []
     source_list: Optional[List[str]] = []
     timestamp_str: str
+
+    # Derived at save time so readers never recompute them
+    timestamp_epoch: Optional[float] = None
+    fmt_time_str: Optional[str] = None
+    display_tags_list: Optional[List[str]] = []
+    x_intent_url: Optional[str] = None
     
+    @property
+    def dir_path(self) -> str:
+        return item_dir(self.id, self.timestamp_epoch)
+
     def create_dir(self):
-        if not os.path.exists(NEWS_DATA_STORE_DIR):
-            os.makedirs(NEWS_DATA_STORE_DIR)
-        os.makedirs(os.path.join(NEWS_DATA_STORE_DIR, self.id), exist_ok=True)
+        os.makedirs(self.dir_path, exist_ok=True)
 
     @classmethod
     def from_dict(cls, data: Dict[str, str]) -> 'NewsItemModel':
         return cls(
-            id=data.get('id', f"{str(datetime.now().strftime("%I_%M_%p_%d_%m_%Y"))}_{str(uuid4())}"),
+            id=data.get('id') or new_item_id(),
             headline_str=data.get('headline_str'),
             content_str=data.get('content_str'),
             tags_list=data.get('tags_list', []),
             source_list=data.get('source_list', []),
-            timestamp_str=data.get('timestamp_str', datetime.now().isoformat())
+            timestamp_str=data.get('timestamp_str', datetime.now().isoformat()),
+            timestamp_epoch=data.get('timestamp_epoch'),
+            fmt_time_str=data.get('fmt_time_str'),
+            display_tags_list=data.get('display_tags_list', []),
+            x_intent_url=data.get('x_intent_url')
         )
 
     def to_json(self) -> Dict[str, str]:
@@ -39,13 +52,24 @@ class NewsItemModel(BaseModel):
             "content_str": self.content_str,
             "tags_list": self.tags_list,
             "source_list": self.source_list,
-            "timestamp_str": self.timestamp_str
+            "timestamp_str": self.timestamp_str,
+            "timestamp_epoch": self.timestamp_epoch,
+            "fmt_time_str": self.fmt_time_str,
+            "display_tags_list": self.display_tags_list,
+            "x_intent_url": self.x_intent_url
         }
 
+    def fill_derived(self):
+        for key, value in derive_display_fields(self.to_json()).items():
+            setattr(self, key, value)
+
     def save_json(self):
-        filepath = os.path.join(NEWS_DATA_STORE_DIR, self.id, "data.json")
-        with open(filepath, 'w', encoding='utf-8') as file:
-            json.dump(self.to_json(), file, ensure_ascii=False, indent=4)
+        self.fill_derived()
+        dirpath = self.dir_path
+        filepath = os.path.join(dirpath, "data.json")
+        data = self.to_json()
+        serde.write_json(filepath, data)
+        news_store.upsert(data, path=dirpath)
 
 
 
@@ -0,0 +1,183 @@
+# batched news generation
+
+"""
+Packs several raw stories into one LLM request.
+
+Pipeline workers call NewsBatcher.generate(raw) exactly like the one-story
+generate step. Behind it, stories submitted within GENERATE_BATCH_LINGER of
+each other are sent together: one system prompt, a JSON array of raw items
+tagged with their index, and a JSON array of news objects back. The batch
+is sized for the routes that may serve it (the router's preferred one, and
+the next when hedging): stories are added while the prompt plus the expected
+answers fit the smallest context of those models (LLM_CONTEXT_TOKENS_BY_MODEL,
+default LLM_CONTEXT_TOKENS) and the answers fit their max_tokens, up to
+GENERATE_BATCH_SIZE.
+
+Answers are parsed with Parser.get_news_json_batch, which keeps partial
+success. Only the stories that failed are re-queued, into a later batch. A
+story that failed GENERATE_BATCH_RETRIES times, or ends up alone, goes
+through the single-story path. An empty answer there fails the story
+(generate raises), so the pipeline counts it as an error and saves nothing.
+"""
+
+import asyncio
+
+from core.configs import GENERATE_BATCH_SIZE, GENERATE_BATCH_LINGER
+from core.colored import cprint, Colors
+from core import serde
+from core.llms import aget_llm_response, context_tokens, serving_routes
+from core.llms.parser import Parser
+from core.llms.tokens import estimate_tokens, token_stats
+from core.llms.prompts import NEWS_BATCH_GENERATE_SYSTEM_PROMPT, NEWS_BATCH_GENERATE_PROMPT
+
+GENERATE_BATCH_RETRIES = 1     # batched attempts per story before going single
+ANSWER_TOKENS_PER_ITEM = 350   # ~ one headline + 2-5 sentences + tags as JSON
+
+_SYSTEM_TOKENS = estimate_tokens(NEWS_BATCH_GENERATE_SYSTEM_PROMPT) + estimate_tokens(NEWS_BATCH_GENERATE_PROMPT)
+
+
+def prompt_fields(raw_news: dict):
+    """What the LLM sees of a raw story (sources and bookkeeping stay out)."""
+    return {k: v for k, v in raw_news.items() if k not in ("sources", "tweet_ids", "keywords")}
+
+
+def batch_messages(raws):
+    items = [{"index": i, **prompt_fields(raw)} for i, raw in enumerate(raws)]
+    return [
+        {"role": "system", "content": NEWS_BATCH_GENERATE_SYSTEM_PROMPT},
+        {"role": "user", "content": NEWS_BATCH_GENERATE_PROMPT.format(
+            count=len(items), raw_news_items=serde.dumps_str(items))}
+    ]
+
+
+def item_tokens(raw_news: dict, model=None):
+    return token_stats.calibrated(estimate_tokens(serde.dumps_str(prompt_fields(raw_news))), model) + ANSWER_TOKENS_PER_ITEM
+
+
+class _Job:
+    __slots__ = ("raw", "future", "attempts")
+
+    def __init__(self, raw, future):
+        self.raw = raw
+        self.future = future
+        self.attempts = 0
+
+
+class NewsBatcher:
+    def __init__(self, single, max_batch=GENERATE_BATCH_SIZE, context_tokens=None,
+                 linger=GENERATE_BATCH_LINGER, llm=aget_llm_response, verbose=True):
+        """
+        single(raw, verbose) -> news_json is the one-story coroutine used for
+        stories that cannot be batched. context_tokens overrides the per-model
+        context. Create one batcher per event loop (e.g. per pipeline run).
+        """
+        self.single = single
+        self.max_batch = max(1, max_batch)
+        self.context_tokens = context_tokens
+        self.linger = linger
+        self.llm = llm
+        self.verbose = verbose
+        self.requests = 0
+        self.batched = 0   # stories answered by a batched request
+        self.requeued = 0
+        self._pending = []
+        self._flush_task = None
+        self._tasks = set()  # keeps fire-and-forget tasks referenced
+
+    async def generate(self, raw_news: dict, verbose=True):
+        job = _Job(raw_news, asyncio.get_running_loop().create_future())
+        self._enqueue(job)
+        return await job.future
+
+    def stats(self):
+        return {"requests": self.requests, "batched": self.batched, "requeued": self.requeued}
+
+    # --- internals ---
+
+    def _enqueue(self, job):
+        self._pending.append(job)
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_soon())
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _flush_soon(self):
+        # wait briefly so stories submitted together share a request
+        await asyncio.sleep(self.linger)
+        while self._pending:
+            batch = self._take()
+            self._spawn(self._dispatch(batch))
+
+    def _limits(self):
+        """(model, context tokens, max stories) for the routes that may serve the next request."""
+        backends = [backend for _, backend in serving_routes()]
+        context = self.context_tokens or min(context_tokens(b.model) for b in backends)
+        answer = min(b.sampling.get("max_tokens") or context for b in backends)
+        return backends[0].model, context, max(1, min(self.max_batch, answer // ANSWER_TOKENS_PER_ITEM))
+
+    def _take(self):
+        """Oldest pending stories that fit in one request's context and answer budget."""
+        model, context, max_items = self._limits()
+        batch, used = [], token_stats.calibrated(_SYSTEM_TOKENS, model)
+        while self._pending and len(batch) < max_items:
+            tokens = item_tokens(self._pending[0].raw, model)
+            if batch and used + tokens > context:
+                break
+            batch.append(self._pending.pop(0))
+            used += tokens
+        return batch
+
+    async def _dispatch(self, batch):
+        singles = [job for job in batch if job.attempts >= GENERATE_BATCH_RETRIES]
+        batch = [job for job in batch if job.attempts < GENERATE_BATCH_RETRIES]
+        if len(batch) == 1:
+            singles += batch
+            batch = []
+        for job in singles:
+            self._spawn(self._run_single(job))
+        if not batch:
+            return
+
+        try:
+            self.requests += 1
+            response = await self.llm(batch_messages([job.raw for job in batch]), validate=self._parses(len(batch)))
+            results, failed = Parser().get_news_json_batch(response, len(batch))
+        except Exception as e:
+            cprint(f" [BATCH] Request failed: {e}", color=Colors.Text.RED)
+            results, failed = {}, list(range(len(batch)))
+
+        for i, news_json in results.items():
+            if not batch[i].future.done():
+                batch[i].future.set_result(news_json)
+        self.batched += len(results)
+
+        for i in failed:
+            batch[i].attempts += 1
+            self.requeued += 1
+            self._enqueue(batch[i])
+
+        if self.verbose:
+            cprint(f" [BATCH] {len(batch)} stories in one request: {len(results)} ok, {len(failed)} re-queued",
+                   color=Colors.Text.MAGENTA)
+
+    @staticmethod
+    def _parses(count):
+        """An answer with no usable story counts against the route that gave it."""
+        return lambda response: bool(Parser().get_news_json_batch(response, count, verbose=False)[0])
+
+    async def _run_single(self, job):
+        try:
+            self.requests += 1
+            news_json = await self.single(job.raw, self.verbose)
+            if not news_json or not news_json.get('headline_str'):
+                # the parser's empty fallback: fail the story so it is neither saved nor marked seen
+                raise ValueError("empty LLM answer")
+        except Exception as e:
+            if not job.future.done():
+                job.future.set_exception(e)
+            return
+        if not job.future.done():
+            job.future.set_result(news_json)
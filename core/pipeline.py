@@ -0,0 +1,311 @@
+# trends pipeline (streaming)
+
+"""
+One bot cycle as a chain of asyncio stages connected by bounded queues:
+
+    fetch/filter -> cluster -> generate -> save
+
+- fetch:    one task per keyword streams search pages (SearchScheduler.stream)
+            with tweet_record() (age, engagement, text) as the stream's
+            accept filter, so paging stops as soon as the keyword has enough
+            qualifying tweets; no page is requested past that.
+- cluster:  once a keyword is fully fetched, its tweets are clustered into
+            stories (build_raw_items) together with any other keyword that
+            finishes within PIPELINE_CLUSTER_LINGER of the first one, and the
+            stories move on right away instead of waiting for the slowest
+            keyword.
+- generate: PIPELINE_GENERATE_WORKERS workers run dedupe + the LLM call
+            (async client, so workers are tasks, not threads).
+- save:     a single writer puts items on disk and in the store.
+
+A story can therefore land in the feed while other keywords are still being
+searched. Queues are bounded, so a slow LLM holds back fetching rather than
+piling tweets up in memory. Queue depths and per-stage counters are logged
+every PIPELINE_LOG_SECONDS and summarised at the end of the cycle.
+"""
+
+import time
+import asyncio
+from datetime import datetime, timedelta, timezone
+from collections import Counter, defaultdict
+
+from core.configs import (
+    PIPELINE_QUEUE_SIZE,
+    PIPELINE_GENERATE_WORKERS,
+    PIPELINE_CLUSTER_LINGER,
+    PIPELINE_LOG_SECONDS,
+    X_SEARCH_MAX_PAGES,
+    X_SEARCH_TIME_BUDGET,
+)
+from core.colored import cprint, Colors
+from core.seen_tweets import seen_tweets
+from core.x_search import get_scheduler, build_query
+from core.trends_pipeline import tweet_record, build_raw_items
+
+DONE = object()  # end of one keyword's tweets
+STOP = object()  # end of a queue
+
+
+class StageStats:
+    def __init__(self, name):
+        self.name = name
+        self.items_in = 0
+        self.items_out = 0
+        self.errors = 0
+        self.busy = 0.0  # seconds spent working, not waiting on queues
+
+    def snapshot(self, elapsed):
+        return {
+            "in": self.items_in,
+            "out": self.items_out,
+            "errors": self.errors,
+            "busy_s": round(self.busy, 2),
+            "out_per_s": round(self.items_out / elapsed, 2) if elapsed else 0.0,
+        }
+
+
+class TrendsPipeline:
+    def __init__(self, client, keywords, generate, save, dedupe=None, per_keyword=10, min_like=20, min_rt=5,
+                 max_age_days=2, exclude_replies=True, max_pages=X_SEARCH_MAX_PAGES,
+                 time_budget=X_SEARCH_TIME_BUDGET, workers=PIPELINE_GENERATE_WORKERS,
+                 queue_size=PIPELINE_QUEUE_SIZE, linger=PIPELINE_CLUSTER_LINGER, verbose=True):
+        """
+        generate(raw) -> news_json may be a coroutine function (awaited on the
+        loop) or a blocking call; save(raw, news_json) is blocking. Blocking
+        calls run in worker threads. dedupe(raw) -> bool, when given,
+        is asked first and short-circuits stories that are already published.
+        """
+        self.scheduler = get_scheduler(client)
+        self.keywords = list(dict.fromkeys(keywords))
+        self.generate = generate
+        self.save = save
+        self.dedupe = dedupe
+        self.per_keyword = per_keyword
+        self.min_like = min_like
+        self.min_rt = min_rt
+        self.cutoff = datetime.now(timezone.utc) - timedelta(days=max_age_days)
+        self.exclude_replies = exclude_replies
+        self.max_pages = max_pages
+        self.time_budget = time_budget
+        self.workers = workers
+        self.linger = linger
+        self.verbose = verbose
+
+        self.queues = {
+            "cluster": asyncio.Queue(queue_size),
+            "generate": asyncio.Queue(queue_size),
+            "save": asyncio.Queue(queue_size),
+        }
+        self.stats = {name: StageStats(name) for name in ("fetch", "filter", "cluster", "generate", "save")}
+        self.accepted = Counter()  # keyword -> qualifying tweets so far
+        self.rejected = Counter()  # reason -> tweets dropped by filter
+        self.yields = {kw: 0 for kw in self.keywords}
+        self.saved = []
+        self.first_saved_after = None
+        self._started = None
+
+    # --- public ---
+
+    async def run(self):
+        """Runs one cycle. Returns {keyword: new (unseen) qualifying tweets}."""
+        self._started = time.monotonic()
+        monitor = asyncio.create_task(self._monitor())
+        stages = [asyncio.create_task(stage) for stage in (
+            self._fetch_all(),
+            self._cluster(),
+            self._generate_all(),
+            self._save(),
+        )]
+        try:
+            await asyncio.gather(*stages)
+        finally:
+            # a failed stage would leave the others blocked on their queues
+            for task in stages:
+                task.cancel()
+            monitor.cancel()
+        self._log_summary()
+        return self.yields
+
+    def snapshot(self):
+        elapsed = time.monotonic() - self._started if self._started else 0.0
+        return {
+            "elapsed_s": round(elapsed, 2),
+            "queues": {name: q.qsize() for name, q in self.queues.items()},
+            "stages": {name: st.snapshot(elapsed) for name, st in self.stats.items()},
+        }
+
+    # --- stages ---
+
+    async def _fetch_all(self):
+        await asyncio.gather(*(self._fetch(kw) for kw in self.keywords))
+
+    async def _fetch(self, keyword):
+        stats, filter_stats = self.stats["fetch"], self.stats["filter"]
+        out = self.queues["cluster"]
+        query = build_query(keyword, min_likes=self.min_like, min_retweets=self.min_rt,
+                            since=self.cutoff, exclude_replies=self.exclude_replies)
+
+        def accept(tw):
+            # runs as each page arrives, so the stream knows when to stop paging
+            stats.items_out += 1
+            filter_stats.items_in += 1
+            t0 = time.monotonic()
+            record = tweet_record(tw, self.cutoff, self.min_like, self.min_rt, self.rejected, self.verbose)
+            filter_stats.busy += time.monotonic() - t0
+            return record
+
+        stream = self.scheduler.stream(query, "Top", count=max(self.per_keyword, 20),
+                                       accept=accept, target=self.per_keyword,
+                                       max_pages=self.max_pages, time_budget=self.time_budget)
+        try:
+            async for record in stream:
+                self.accepted[keyword] += 1
+                filter_stats.items_out += 1
+                await out.put((keyword, record))
+        except Exception as e:
+            stats.errors += 1
+            cprint(f" [ERROR] Search failed for '{keyword}': {e}", color=Colors.Text.RED)
+        finally:
+            await stream.aclose()
+            await out.put((keyword, DONE))
+
+    async def _cluster(self):
+        stats, inbox = self.stats["cluster"], self.queues["cluster"]
+        pending = defaultdict(list)  # keyword -> records not clustered yet
+        finished = []                # fully fetched keywords waiting for a flush
+        deadline = None              # flush time, set when the first of them finished
+        remaining = len(self.keywords)
+        while remaining:
+            if deadline is not None and time.monotonic() >= deadline:
+                deadline = None
+                await self._flush(pending, finished)
+            try:
+                # Linger briefly after a keyword finishes so keywords finishing
+                # together are clustered (and merged) together. The deadline is
+                # fixed: records of other keywords arriving meanwhile do not
+                # push it back.
+                timeout = max(0.0, deadline - time.monotonic()) if deadline is not None else None
+                keyword, record = await asyncio.wait_for(inbox.get(), timeout)
+            except asyncio.TimeoutError:
+                deadline = None
+                await self._flush(pending, finished)
+                continue
+            if record is DONE:
+                remaining -= 1
+                finished.append(keyword)
+                if deadline is None:
+                    deadline = time.monotonic() + self.linger
+            else:
+                stats.items_in += 1
+                pending[keyword].append(record)
+        await self._flush(pending, finished)
+        for _ in range(self.workers):
+            await self.queues["generate"].put(STOP)
+
+    async def _flush(self, pending, finished):
+        if not finished:
+            return
+        stats = self.stats["cluster"]
+        batch = {kw: pending.pop(kw, []) for kw in finished}
+        finished.clear()
+        t0 = time.monotonic()
+        try:
+            raw_items = await asyncio.to_thread(build_raw_items, batch, 10, self.verbose)
+        except Exception as e:
+            stats.errors += 1
+            cprint(f" [PIPELINE] Clustering failed for {list(batch)}: {e}", color=Colors.Text.RED)
+            return
+        finally:
+            stats.busy += time.monotonic() - t0
+        for raw in raw_items:
+            new = len(seen_tweets.unseen(raw.get("tweet_ids", [])))
+            for kw in raw.get("keywords") or [raw["keyword"]]:
+                self.yields[kw] = self.yields.get(kw, 0) + new
+            stats.items_out += 1
+            await self.queues["generate"].put(raw)
+
+    async def _generate_all(self):
+        await asyncio.gather(*(self._generate() for _ in range(self.workers)))
+        await self.queues["save"].put(STOP)
+
+    async def _generate(self):
+        stats, out = self.stats["generate"], self.queues["save"]
+        while True:
+            raw = await self.queues["generate"].get()
+            if raw is STOP:
+                return
+            stats.items_in += 1
+            t0 = time.monotonic()
+            try:
+                if self.dedupe and await asyncio.to_thread(self.dedupe, raw, self.verbose):
+                    continue
+                if self.verbose:
+                    cprint(f"[MAAL] From Trends kw='{raw['keyword']}'", color=Colors.Text.GREEN)
+                if asyncio.iscoroutinefunction(self.generate):
+                    news_json = await self.generate(raw, self.verbose)
+                else:
+                    news_json = await asyncio.to_thread(self.generate, raw, self.verbose)
+                if not news_json or not news_json.get('headline_str'):
+                    # failed or unparseable answer: not saved, tweets stay unseen for a retry
+                    raise ValueError("empty LLM answer")
+            except Exception as e:
+                stats.errors += 1
+                cprint(f" [PIPELINE] Generation failed for '{raw.get('keyword')}': {e}", color=Colors.Text.RED)
+                continue
+            finally:
+                stats.busy += time.monotonic() - t0
+            stats.items_out += 1
+            await out.put((raw, news_json))
+
+    async def _save(self):
+        stats = self.stats["save"]
+        while True:
+            job = await self.queues["save"].get()
+            if job is STOP:
+                return
+            raw, news_json = job
+            stats.items_in += 1
+            t0 = time.monotonic()
+            try:
+                # a concurrent worker may have published the same story meanwhile
+                if self.dedupe and await asyncio.to_thread(self.dedupe, raw, self.verbose):
+                    continue
+                item = await asyncio.to_thread(self.save, raw, news_json, self.verbose)
+            except Exception as e:
+                stats.errors += 1
+                cprint(f" [PIPELINE] Save failed for '{raw.get('keyword')}': {e}", color=Colors.Text.RED)
+                continue
+            finally:
+                stats.busy += time.monotonic() - t0
+            stats.items_out += 1
+            self.saved.append(item)
+            if self.first_saved_after is None:
+                self.first_saved_after = time.monotonic() - self._started
+
+    # --- observability ---
+
+    async def _monitor(self):
+        while True:
+            await asyncio.sleep(PIPELINE_LOG_SECONDS)
+            snap = self.snapshot()
+            cprint(
+                f" [PIPELINE] {snap['elapsed_s']}s queues={snap['queues']} "
+                + " ".join(f"{name}={st['out']}" for name, st in snap["stages"].items()),
+                color=Colors.Text.CYAN
+            )
+
+    def _log_summary(self):
+        snap = self.snapshot()
+        cprint(
+            f" [PIPELINE] Cycle done in {snap['elapsed_s']}s: {len(self.saved)} items saved"
+            + (f", first after {self.first_saved_after:.2f}s" if self.first_saved_after is not None else ""),
+            color=Colors.Text.GREEN
+        )
+        for name, st in snap["stages"].items():
+            cprint(
+                f"   {name:<9} in {st['in']:>4}  out {st['out']:>4}  errors {st['errors']:>3}  "
+                f"busy {st['busy_s']:>7.2f}s  {st['out_per_s']:>6.2f}/s",
+                color=Colors.Text.CYAN
+            )
+        if self.rejected:
+            cprint(f"   filter rejected {dict(self.rejected)}", color=Colors.Text.CYAN)
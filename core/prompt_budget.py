@@ -0,0 +1,94 @@
+# prompt budget
+
+"""
+Builds the tweet text of a raw story within a token budget.
+
+Tweets are cleaned (URLs stripped, whitespace collapsed) and deduplicated
+(retweets and copy-paste posts with the same wording count once). They are
+then packed whole, best-scoring first, while their estimated tokens fit the
+budget. A tweet that does not fit is skipped, and smaller, lower-scoring ones
+may still fill the gap. Only when no tweet fits whole is the best one cut, at
+a word boundary. Estimates come from core.llms.tokens and are scaled by the
+measured actual/estimated ratio of the model.
+
+Budgets are per model: RAW_NEWS_TOKEN_BUDGETS ("model=tokens,...") with
+RAW_NEWS_TOKEN_BUDGET as the default. Callers pass the model the story will
+be generated with (build_raw_items: the LLM router's preferred route).
+"""
+
+import re
+
+from core.configs import RAW_NEWS_TOKEN_BUDGET, RAW_NEWS_TOKEN_BUDGETS
+from core.clustering import URL_RE, MENTION_RE
+from core.llms.tokens import estimate_tokens, token_stats
+
+SEPARATOR = "\n"
+_RT_PREFIX_RE = re.compile(r"^RT @\w+:\s*")
+_SPACE_RE = re.compile(r"\s+")
+_NON_WORD_RE = re.compile(r"[^\w]+")
+
+
+def tweet_score(t):
+    """Simple virality: retweets count most, replies least."""
+    return t["likes"] * 0.7 + t["retweets"] * 1.3 + t["replies"] * 0.3
+
+
+def clean_text(text):
+    text = _RT_PREFIX_RE.sub("", text or "")
+    return _SPACE_RE.sub(" ", URL_RE.sub(" ", text)).strip()
+
+
+def _dedupe_key(text):
+    return _NON_WORD_RE.sub(" ", MENTION_RE.sub(" ", text).lower()).strip()
+
+
+def raw_news_budget(model=None):
+    return RAW_NEWS_TOKEN_BUDGETS.get(model, RAW_NEWS_TOKEN_BUDGET)
+
+
+def _cut(text, budget, model):
+    """Longest word-boundary prefix of text within budget tokens."""
+    words = text.split(" ")
+    lo, hi = 0, len(words)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if token_stats.calibrated(estimate_tokens(" ".join(words[:mid])), model) <= budget:
+            lo = mid
+        else:
+            hi = mid - 1
+    return " ".join(words[:lo])
+
+
+def pack_tweets(tweets, budget=None, max_tweets=None, model=None):
+    """
+    Returns (packed tweets, full_text, estimated tokens). Packed tweets keep
+    their score order; full_text joins their cleaned text, one tweet per line.
+    """
+    budget = budget or raw_news_budget(model)
+    sep_tokens = estimate_tokens(SEPARATOR)
+    packed, texts, seen, used = [], [], set(), 0
+
+    ranked = sorted(tweets, key=tweet_score, reverse=True)
+    for t in ranked:
+        if max_tweets and len(packed) >= max_tweets:
+            break
+        text = clean_text(t.get("text"))
+        key = _dedupe_key(text)
+        if not key or key in seen:
+            continue
+        cost = token_stats.calibrated(estimate_tokens(text), model) + (sep_tokens if texts else 0)
+        if used + cost > budget:
+            continue  # a smaller tweet further down may still fit
+        seen.add(key)
+        packed.append(t)
+        texts.append(text)
+        used += cost
+
+    if not packed:
+        # not one tweet fits whole: cut the best one
+        for t in ranked:
+            text = _cut(clean_text(t.get("text")), budget, model)
+            if text:
+                return [t], text, token_stats.calibrated(estimate_tokens(text), model)
+
+    return packed, SEPARATOR.join(texts), used
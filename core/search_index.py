@@ -0,0 +1,372 @@
+# search index
+
+"""
+In-memory inverted index over headline_str, content_str and tags_list.
+
+The index is built once from the news store on first use and then kept up to
+date through the store's listener hooks, so every save (write_and_save_full_news
+-> NewsItemModel.save_json -> news_store.upsert) and every delete is applied
+incrementally. Queries are ranked with a BM25-style score; a last query term
+with no exact match is expanded as a prefix so search-as-you-type works.
+
+Queries do not score every hit. Each queried term keeps, next to its
+postings, a bitmap of its items, its postings in impact order (best weight
+first) and one bitmap per weight tier (TIER_WIDTH wide); all are built on its
+first query and then maintained on every change. Hits are counted by AND-ing
+the bitmaps (a prefix term ORs its expansions). A one-term query reads its
+top-k straight off the impact order (merged across a prefix's expansions).
+Otherwise tier combinations are visited best upper bound first, each one's
+items found by AND-ing bitmaps, until the k-th best score reaches the next
+combination's bound: no item left can enter the top-k.
+benchmarks/search_bench.py checks the < 10 ms target at 100k items.
+"""
+
+import re
+import math
+import time
+import heapq
+import bisect
+import operator
+import threading
+import unicodedata
+from functools import reduce
+from collections import defaultdict, Counter
+
+from core.colored import cprint, Colors
+from core.store import news_store
+from core.utils import clean_tags
+
+
+# \w alone splits Indic words at every vowel sign / virama (category Mn/Mc),
+# so the Indic blocks (Devanagari .. Sinhala, incl. Kannada), Vedic extensions
+# and generic combining marks are part of a token as well. ZWJ/ZWNJ only
+# change rendering, so they are dropped before matching.
+TOKEN_RE = re.compile("[\\w\u0300-\u036f\u0900-\u0dff\u1cd0-\u1cff\ua8e0-\ua8ff]+")
+JOINERS = {0x200c: None, 0x200d: None, ord("_"): " "}
+
+FIELD_WEIGHTS = {
+    "headline_str": 3.0,
+    "tags_list": 2.0,
+    "content_str": 1.0,
+}
+BM25_K1 = 1.2
+BM25_B = 0.75
+MAX_PREFIX_EXPANSIONS = 50
+SCORE_ALL_MAX = 2000     # hits up to this many are simply all scored
+TIER_WIDTH = 0.05        # weight range of one tier bitmap (term weights are < BM25_K1 + 1)
+MAX_TIER_COMBOS = 2000   # tier combinations visited before falling back to scoring every hit
+
+
+def tokenize(text):
+    if not text:
+        return []
+    text = unicodedata.normalize("NFC", text).casefold().translate(JOINERS)
+    # drop single ASCII letters/digits; single Indic letters are real syllables
+    return [tok for tok in TOKEN_RE.findall(text) if len(tok) > 1 or not tok.isascii()]
+
+
+def _bitmap(docs):
+    bits = bytearray((max(docs, default=0) >> 3) + 1)
+    for doc in docs:
+        bits[doc >> 3] |= 1 << (doc & 7)
+    return int.from_bytes(bits, "little")
+
+
+def _bit_positions(bits):
+    digits = bin(bits)[:1:-1]  # lowest bit first
+    i = digits.find("1")
+    while i != -1:
+        yield i
+        i = digits.find("1", i + 1)
+
+
+class _Ranked:
+    """
+    One term's postings as an impact list (docs by weight descending, with
+    their -weight ascending), as a bitmap, and as bitmaps per weight tier.
+    """
+    __slots__ = ("neg", "docs", "bits", "tiers")
+
+    def __init__(self, postings):
+        ranked = sorted((-w, doc) for doc, w in postings.items())
+        self.neg = [n for n, _ in ranked]
+        self.docs = [doc for _, doc in ranked]
+        self.bits = _bitmap(self.docs)
+        by_tier = defaultdict(list)
+        for doc, w in postings.items():
+            by_tier[int(w / TIER_WIDTH)].append(doc)
+        self.tiers = {tier: _bitmap(docs) for tier, docs in by_tier.items()}
+
+    def add(self, doc, weight):
+        i = bisect.bisect_right(self.neg, -weight)
+        self.neg.insert(i, -weight)
+        self.docs.insert(i, doc)
+        self.bits |= 1 << doc
+        tier = int(weight / TIER_WIDTH)
+        self.tiers[tier] = self.tiers.get(tier, 0) | 1 << doc
+
+    def remove(self, doc, weight):
+        lo, hi = bisect.bisect_left(self.neg, -weight), bisect.bisect_right(self.neg, -weight)
+        i = self.docs.index(doc, lo, hi)
+        del self.neg[i], self.docs[i]
+        self.bits ^= 1 << doc
+        tier = int(weight / TIER_WIDTH)
+        self.tiers[tier] ^= 1 << doc
+        if not self.tiers[tier]:
+            del self.tiers[tier]
+
+
+class SearchIndex:
+    def __init__(self, store=news_store):
+        self.store = store
+        self._postings = defaultdict(dict)  # term -> {doc: weight}
+        self._ranked = {}                   # term -> _Ranked, for terms that were queried
+        self._vocab = []                    # sorted terms, for prefix lookups
+        self._doc_of = {}                   # item_id -> doc
+        self._item_of = {}                  # doc -> item_id
+        self._doc_terms = {}                # doc -> terms (for removal)
+        self._doc_len = {}                  # doc -> token count
+        self._next_doc = 0
+        self._total_len = 0
+        self._loaded = False
+        self._lock = threading.RLock()
+        store.add_listener(self)
+
+    # --- store listener ---
+
+    def on_upsert(self, data, ts):
+        if self._loaded:
+            with self._lock:
+                self._add(data)
+
+    def on_delete(self, item_id):
+        if self._loaded:
+            with self._lock:
+                self._remove(item_id)
+
+    # --- public ---
+
+    def ensure_loaded(self):
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            t0 = time.perf_counter()
+            for ts, data in self.store.iter_items():
+                self._add(data)
+            self._loaded = True
+            cprint(
+                f" [SEARCH] Indexed {len(self._doc_of)} items in {time.perf_counter() - t0:.2f}s",
+                color=Colors.Text.CYAN
+            )
+
+    def search(self, query, limit=20, offset=0, allowed=None):
+        """
+        Ranked item ids for a multi-term query.
+        allowed: optional set of item ids to restrict results to (e.g. a tag filter).
+        Returns (ids, total_hits).
+        """
+        self.ensure_loaded()
+        terms = tokenize(query)
+        if not terms:
+            return [], 0
+
+        k = offset + limit
+        with self._lock:
+            unique = list(dict.fromkeys(terms))
+            matched = []  # per query term: the index terms it matches
+            for term in unique:
+                # the last term is still being typed: fall back to a prefix match
+                expansions = self._expand(term, prefix=term == unique[-1])
+                if not expansions:
+                    return [], 0
+                matched.append(expansions)
+
+            if len(matched) == 1 and len(matched[0]) == 1 and allowed is None:
+                # one exact term: its impact order is the ranking
+                ranked = self._ranked_of(matched[0][0])
+                return [self._item_of[doc] for doc in ranked.docs[offset:k]], len(ranked.docs)
+
+            # All terms must match (AND); a prefix term matches any of its expansions (OR).
+            groups = [[self._ranked_of(t) for t in ts] for ts in matched]
+            term_bits = [reduce(operator.or_, (r.bits for r in group)) for group in groups]
+            hits = reduce(operator.and_, term_bits)
+            allowed_docs = None
+            if allowed is not None:
+                doc_of = self._doc_of
+                allowed_docs = {doc_of[i] for i in allowed if i in doc_of}
+                hits &= _bitmap(allowed_docs)
+            total = hits.bit_count()
+            if not total:
+                return [], 0
+
+            n_docs = max(len(self._doc_of), 1)
+            idfs = [math.log(1 + (n_docs - df + 0.5) / (df + 0.5)) for df in (b.bit_count() for b in term_bits)]
+            weights = [[self._postings[t] for t in ts] for ts in matched]
+            # every hit is in each exact term's postings; a prefix term scores its best expansion
+            exact = [(idf, ps[0]) for idf, ps in zip(idfs, weights) if len(ps) == 1]
+            prefixed = [(idf, ps) for idf, ps in zip(idfs, weights) if len(ps) > 1]
+
+            def score(doc):
+                s = 0.0
+                for idf, p in exact:
+                    s += idf * p[doc]
+                for idf, ps in prefixed:
+                    s += idf * max(p.get(doc, 0.0) for p in ps)
+                return s
+
+            if total <= SCORE_ALL_MAX:
+                top = heapq.nlargest(k, ((score(doc), doc) for doc in _bit_positions(hits)))
+            elif len(groups) == 1:
+                top = self._top_k_one(groups[0], idfs[0], allowed_docs, k)
+            else:
+                top = self._top_k(groups, idfs, hits, score, k)
+            return [self._item_of[doc] for _, doc in top[offset:]], total
+
+    # --- internals ---
+
+    def _expand(self, term, prefix=False):
+        """Index terms a query term matches: itself, else (prefix) up to MAX_PREFIX_EXPANSIONS longer ones."""
+        if term in self._postings or not prefix:
+            return [term] if term in self._postings else []
+        expansions = []
+        i = bisect.bisect_left(self._vocab, term)
+        while i < len(self._vocab) and self._vocab[i].startswith(term) and len(expansions) < MAX_PREFIX_EXPANSIONS:
+            expansions.append(self._vocab[i])
+            i += 1
+        return expansions
+
+    def _ranked_of(self, term):
+        ranked = self._ranked.get(term)
+        if ranked is None:
+            ranked = self._ranked[term] = _Ranked(self._postings[term])
+        return ranked
+
+    @staticmethod
+    def _top_k_one(group, idf, allowed_docs, k):
+        """One term (a prefix, or under a filter): its merged impact lists, best first."""
+        top, seen = [], set()
+        # merged best-first, a doc first shows up with its best expansion's weight
+        for neg, doc in heapq.merge(*(zip(r.neg, r.docs) for r in group)):
+            if doc in seen or (allowed_docs is not None and doc not in allowed_docs):
+                continue
+            seen.add(doc)
+            top.append((-neg * idf, doc))
+            if len(top) >= k:
+                break
+        return top
+
+    @staticmethod
+    def _top_k(groups, idfs, hits, score, k):
+        """
+        Tier combinations (one weight tier per term) best upper bound first.
+        Each combination's hits are scored; once the k-th best score reaches
+        the next bound, nothing unscored can enter the top-k.
+        """
+        tiers = []  # per term: [(upper weight, bitmap)] best tier first
+        for group in groups:
+            merged = {}
+            for ranked in group:
+                # a prefix term: a doc may sit in several tiers, its best one bounds it
+                for tier, bits in ranked.tiers.items():
+                    merged[tier] = merged.get(tier, 0) | bits
+            tiers.append([((tier + 1) * TIER_WIDTH, merged[tier]) for tier in sorted(merged, reverse=True)])
+
+        def bound(combo):
+            return sum(idf * t[i][0] for idf, t, i in zip(idfs, tiers, combo))
+
+        start = (0,) * len(tiers)
+        frontier, queued = [(-bound(start), start)], {start}
+        top, seen = [], set()
+        while frontier:
+            neg_bound, combo = heapq.heappop(frontier)
+            if len(top) >= k and top[0][0] >= -neg_bound:
+                break
+            if len(queued) > MAX_TIER_COMBOS:
+                # scores spread over too many tiers: score the remaining hits instead
+                rest = (doc for doc in _bit_positions(hits) if doc not in seen)
+                return heapq.nlargest(k, list(top) + [(score(doc), doc) for doc in rest])
+            bits = hits
+            for t, i in zip(tiers, combo):
+                bits &= t[i][1]
+                if not bits:
+                    break
+            while bits:
+                low = bits & -bits
+                bits ^= low
+                doc = low.bit_length() - 1
+                if doc in seen:
+                    continue
+                seen.add(doc)
+                if len(top) < k:
+                    heapq.heappush(top, (score(doc), doc))
+                else:
+                    heapq.heappushpop(top, (score(doc), doc))
+            for n in range(len(combo)):
+                if combo[n] + 1 < len(tiers[n]):
+                    nxt = combo[:n] + (combo[n] + 1,) + combo[n + 1:]
+                    if nxt not in queued:
+                        queued.add(nxt)
+                        heapq.heappush(frontier, (-bound(nxt), nxt))
+        return sorted(top, reverse=True)
+
+    def _add(self, data):
+        item_id = data.get("id")
+        if not item_id:
+            return
+        self._remove(item_id)
+
+        tf = defaultdict(float)
+        doc_len = 0
+        for field, weight in FIELD_WEIGHTS.items():
+            value = data.get(field)
+            if field == "tags_list":
+                value = " ".join(clean_tags(value))
+            tokens = tokenize(value)
+            doc_len += len(tokens)
+            for tok, n in Counter(tokens).items():
+                tf[tok] += weight * n
+        if not tf:
+            return
+
+        doc = self._next_doc
+        self._next_doc += 1
+        self._doc_of[item_id] = doc
+        self._item_of[doc] = item_id
+        self._doc_terms[doc] = list(tf)
+        self._doc_len[doc] = doc_len
+        self._total_len += doc_len
+
+        # BM25 term saturation with length normalisation against the running average
+        avg_len = self._total_len / len(self._doc_of)
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * doc_len / max(avg_len, 1.0))
+        for term, f in tf.items():
+            if term not in self._postings:
+                bisect.insort(self._vocab, term)
+            w = self._postings[term][doc] = f * (BM25_K1 + 1) / (f + norm)
+            if term in self._ranked:
+                self._ranked[term].add(doc, w)
+
+    def _remove(self, item_id):
+        doc = self._doc_of.pop(item_id, None)
+        if doc is None:
+            return
+        del self._item_of[doc]
+        self._total_len -= self._doc_len.pop(doc, 0)
+        for term in self._doc_terms.pop(doc, []):
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            w = postings.pop(doc, None)
+            if w is not None and term in self._ranked:
+                self._ranked[term].remove(doc, w)
+            if not postings:
+                del self._postings[term]
+                self._ranked.pop(term, None)
+                i = bisect.bisect_left(self._vocab, term)
+                if i < len(self._vocab) and self._vocab[i] == term:
+                    del self._vocab[i]
+
+
+search_index = SearchIndex()
@@ -0,0 +1,101 @@
+# seen tweets
+
+"""
+Persistent record of tweet ids that already went into a saved news item.
+
+"Top" searches return largely the same tweets cycle after cycle. Clusters are
+checked against this store before they reach the LLM: a cluster made only of
+seen tweets is skipped. Ids are marked once the item built from them is
+saved, and expire after SEEN_TWEETS_TTL_HOURS (well past the age at which
+search_trending_news_on_x drops tweets anyway).
+"""
+
+import os
+import time
+import sqlite3
+import threading
+
+from core.configs import SEEN_TWEETS_DB_PATH, SEEN_TWEETS_TTL_HOURS
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS seen_tweets (
+    id      TEXT PRIMARY KEY,
+    seen_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_seen_tweets_seen_at ON seen_tweets (seen_at);
+"""
+PURGE_EVERY = 3600  # seconds between expiry sweeps
+
+
+class SeenTweets:
+    def __init__(self, db_path=SEEN_TWEETS_DB_PATH, ttl_hours=SEEN_TWEETS_TTL_HOURS):
+        self.db_path = db_path
+        self.ttl = ttl_hours * 3600
+        self._conn = None
+        self._purged_at = 0.0
+        self._lock = threading.RLock()
+
+    def _connect(self):
+        if self._conn is not None:
+            return self._conn
+        with self._lock:
+            if self._conn is None:
+                os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+                conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                conn.executescript(SCHEMA)
+                conn.commit()
+                self._conn = conn
+        return self._conn
+
+    def unseen(self, tweet_ids):
+        """The subset of tweet_ids not seen within the TTL."""
+        ids = {str(i) for i in tweet_ids if i}
+        if not ids:
+            return set()
+        conn = self._connect()
+        self._maybe_purge()
+        cutoff = time.time() - self.ttl
+        seen = set()
+        ids_list = list(ids)
+        with self._lock:
+            for i in range(0, len(ids_list), 500):  # stay under SQLite's variable limit
+                chunk = ids_list[i:i + 500]
+                marks = ",".join("?" * len(chunk))
+                seen.update(row[0] for row in conn.execute(
+                    f"SELECT id FROM seen_tweets WHERE seen_at >= ? AND id IN ({marks})",
+                    (cutoff, *chunk)
+                ))
+        return ids - seen
+
+    def mark(self, tweet_ids):
+        now = time.time()
+        rows = [(str(i), now) for i in tweet_ids if i]
+        if not rows:
+            return
+        conn = self._connect()
+        with self._lock:
+            conn.executemany(
+                "INSERT INTO seen_tweets (id, seen_at) VALUES (?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET seen_at = excluded.seen_at",
+                rows
+            )
+            conn.commit()
+
+    def purge(self):
+        """Drops expired ids. Returns how many were removed."""
+        conn = self._connect()
+        with self._lock:
+            cur = conn.execute("DELETE FROM seen_tweets WHERE seen_at < ?", (time.time() - self.ttl,))
+            conn.commit()
+            self._purged_at = time.time()
+            return cur.rowcount
+
+    def _maybe_purge(self):
+        if time.time() - self._purged_at > PURGE_EVERY:
+            self.purge()
+
+
+seen_tweets = SeenTweets()
@@ -0,0 +1,44 @@
+# serialization
+
+"""
+Single JSON path for the store, the parser, API responses and logs.
+
+Everything goes through orjson: compact UTF-8 output (no ASCII escaping) and
+bytes-level reads, so files are read with one open(..., "rb") and parsed
+without an intermediate str.
+"""
+
+import orjson
+
+JSONDecodeError = orjson.JSONDecodeError  # subclass of json.JSONDecodeError / ValueError
+
+
+def dumps(obj, pretty=False) -> bytes:
+    option = orjson.OPT_NON_STR_KEYS
+    if pretty:
+        option |= orjson.OPT_INDENT_2
+    return orjson.dumps(obj, option=option, default=str)
+
+
+def dumps_str(obj, pretty=False) -> str:
+    return dumps(obj, pretty=pretty).decode("utf-8")
+
+
+def loads(data):
+    """Accepts bytes, bytearray, memoryview or str."""
+    return orjson.loads(data)
+
+
+def read_json(path):
+    with open(path, "rb") as f:
+        return orjson.loads(f.read())
+
+
+def write_json(path, obj):
+    with open(path, "wb") as f:
+        f.write(dumps(obj))
+
+
+def pretty(obj) -> str:
+    """Indented dump for verbose logs."""
+    return dumps_str(obj, pretty=True)
@@ -0,0 +1,136 @@
+# store layout
+
+"""
+Date-sharded folder layout for news items:
+
+    NEWS_DATA_STORE_DIR/YYYY/MM/DD/<ULID id>/data.json
+
+The shard is the (UTC) date encoded in the item's ULID id, and ULIDs sort by
+creation time, so walking the shards and their entries in reverse name order
+yields items newest first without opening any data.json. "Latest N" and
+time-range scans stop as soon as they have enough / leave the range.
+"""
+
+import os
+import shutil
+from datetime import datetime, timezone
+
+from core.configs import NEWS_DATA_STORE_DIR
+from core.colored import cprint, Colors
+from core import serde
+from core.utils import ulid_timestamp, safe_parse_timestamp, new_item_id
+
+
+def shard_for(item_id, ts=None):
+    """'YYYY/MM/DD' for an item: its ULID time, else the given epoch ts, else now."""
+    ts = ulid_timestamp(item_id) or ts
+    dt = datetime.fromtimestamp(ts, timezone.utc) if ts is not None else datetime.now(timezone.utc)
+    return dt.strftime("%Y/%m/%d")
+
+
+def item_dir(item_id, ts=None, root=NEWS_DATA_STORE_DIR):
+    return os.path.join(root, shard_for(item_id, ts), item_id)
+
+
+def _sorted_subdirs(path, digits, reverse):
+    try:
+        names = [e.name for e in os.scandir(path) if e.is_dir() and len(e.name) == digits and e.name.isdigit()]
+    except OSError:
+        return []
+    return sorted(names, reverse=reverse)
+
+
+def iter_item_dirs(root=NEWS_DATA_STORE_DIR, newest_first=True, since=None, until=None):
+    """
+    Yields (relative path, absolute path) of item folders in the sharded layout,
+    ordered by id. since/until (epoch seconds) prune whole day shards and, for
+    ULID ids, single items, without touching any data.json.
+    """
+    if not root or not os.path.isdir(root):
+        return
+    since_day = datetime.fromtimestamp(since, timezone.utc).date() if since is not None else None
+    until_day = datetime.fromtimestamp(until, timezone.utc).date() if until is not None else None
+
+    for year in _sorted_subdirs(root, 4, newest_first):
+        for month in _sorted_subdirs(os.path.join(root, year), 2, newest_first):
+            for day in _sorted_subdirs(os.path.join(root, year, month), 2, newest_first):
+                try:
+                    date = datetime(int(year), int(month), int(day)).date()
+                except ValueError:
+                    continue
+                if since_day and date < since_day:
+                    if newest_first:
+                        return
+                    continue
+                if until_day and date > until_day:
+                    if newest_first:
+                        continue
+                    return
+
+                day_path = os.path.join(root, year, month, day)
+                try:
+                    entries = sorted((e for e in os.scandir(day_path) if e.is_dir()),
+                                     key=lambda e: e.name, reverse=newest_first)
+                except OSError:
+                    continue
+                for entry in entries:
+                    ts = ulid_timestamp(entry.name)
+                    if ts is not None and ((since is not None and ts < since) or (until is not None and ts > until)):
+                        continue
+                    yield f"{year}/{month}/{day}/{entry.name}", entry.path
+
+
+def iter_legacy_dirs(root=NEWS_DATA_STORE_DIR):
+    """Yields (relative path, absolute path) of pre-sharding <root>/<id> folders."""
+    if not root or not os.path.isdir(root):
+        return
+    for entry in os.scandir(root):
+        if entry.is_dir() and os.path.exists(os.path.join(entry.path, "data.json")):
+            yield entry.name, entry.path
+
+
+def iter_all_item_dirs(root=NEWS_DATA_STORE_DIR):
+    yield from iter_item_dirs(root)
+    yield from iter_legacy_dirs(root)
+
+
+def latest_item_dirs(n, root=NEWS_DATA_STORE_DIR):
+    """Absolute paths of the n newest item folders; stops after n entries."""
+    out = []
+    for _, path in iter_item_dirs(root):
+        if os.path.exists(os.path.join(path, "data.json")):
+            out.append(path)
+            if len(out) >= n:
+                break
+    return out
+
+
+def migrate_layout(store, root=NEWS_DATA_STORE_DIR, verbose=True):
+    """
+    Moves legacy <root>/<id> folders into the sharded layout. Each item is
+    re-keyed with a ULID minted from its own timestamp, so it sorts (and
+    shards) by when the story happened; the old id is kept as legacy_id.
+    """
+    moved = 0
+    for name, path in list(iter_legacy_dirs(root)):
+        try:
+            data = serde.read_json(os.path.join(path, "data.json"))
+            old_id = data.get("id") or name
+            ts = data.get("timestamp_epoch") or safe_parse_timestamp(data.get("timestamp_str")).timestamp()
+            data["id"] = new_item_id(ts)
+            data["legacy_id"] = old_id
+
+            target = item_dir(data["id"], root=root)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.move(path, target)
+            serde.write_json(os.path.join(target, "data.json"), data)
+
+            store.delete(old_id)
+            store.upsert(data, path=target)
+            moved += 1
+        except Exception as e:
+            cprint(f" [LAYOUT] Skipped {name}: {e}", color=Colors.Text.YELLOW)
+
+    if verbose:
+        cprint(f" [LAYOUT] Moved {moved} legacy item folders into date shards.", color=Colors.Text.GREEN)
+    return moved
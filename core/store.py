@@ -0,0 +1,383 @@
+# news store
+
+"""
+SQLite index over the news item folders.
+
+Every item still lives in its own folder under NEWS_DATA_STORE_DIR (data.json),
+but readers never have to walk those folders: each save is mirrored into a
+single SQLite file, which serves time-ordered, tag-filtered and id lookups.
+
+One-shot import of existing folders:
+    python -m core.store migrate
+
+Move pre-sharding <root>/<id> folders into the YYYY/MM/DD layout (core.shards):
+    python -m core.store migrate-layout
+"""
+
+import os
+import sys
+import base64
+import sqlite3
+import threading
+
+from core.configs import NEWS_DATA_STORE_DIR, NEWS_DB_PATH
+from core.colored import cprint, Colors
+from core import serde
+from core.utils import safe_parse_timestamp, clean_tags, normalize_tag, is_item_id
+from core.shards import shard_for, iter_all_item_dirs, migrate_layout
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    id       TEXT PRIMARY KEY,
+    ts       REAL NOT NULL,
+    path     TEXT,
+    data     TEXT NOT NULL,
+    mtime_ns INTEGER,
+    size     INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_items_ts ON items (ts DESC, id DESC);
+
+CREATE TABLE IF NOT EXISTS item_tags (
+    tag     TEXT NOT NULL,
+    item_id TEXT NOT NULL REFERENCES items (id) ON DELETE CASCADE,
+    PRIMARY KEY (tag, item_id)
+);
+CREATE INDEX IF NOT EXISTS idx_item_tags_item ON item_tags (item_id);
+
+-- tag aggregates, maintained on every upsert/delete (tag = normalize_tag key)
+CREATE TABLE IF NOT EXISTS tags (
+    tag     TEXT PRIMARY KEY,
+    display TEXT NOT NULL,
+    count   INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_tags_count ON tags (count DESC, tag);
+"""
+SCHEMA_VERSION = 3
+
+# Upgrades for databases created by older versions: {version: [statements]}
+MIGRATIONS = {
+    2: [
+        "ALTER TABLE items ADD COLUMN mtime_ns INTEGER",
+        "ALTER TABLE items ADD COLUMN size INTEGER",
+    ],
+}
+
+
+def encode_cursor(ts: float, item_id: str) -> str:
+    """Opaque, URL-safe cursor for the (timestamp, id) feed position."""
+    return base64.urlsafe_b64encode(f"{ts!r}:{item_id}".encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str):
+    """Inverse of encode_cursor. Raises ValueError on a malformed cursor."""
+    try:
+        ts, item_id = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8").split(":", 1)
+        return float(ts), item_id
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+
+
+class NewsStore:
+    def __init__(self, db_path=NEWS_DB_PATH, root=NEWS_DATA_STORE_DIR):
+        self.db_path = db_path
+        self.root = root
+        self._conn = None
+        self._lock = threading.RLock()
+        self._listeners = []
+
+    # --- connection ---
+
+    def _connect(self):
+        if self._conn is not None:
+            return self._conn
+        with self._lock:
+            if self._conn is not None:
+                return self._conn
+            db_dir = os.path.dirname(os.path.abspath(self.db_path))
+            os.makedirs(db_dir, exist_ok=True)
+
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            is_new = version == 0
+            if not is_new:
+                for v in range(version + 1, SCHEMA_VERSION + 1):
+                    for stmt in MIGRATIONS.get(v, []):
+                        conn.execute(stmt)
+            conn.executescript(SCHEMA)
+            if not is_new and version < 3:
+                self._rebuild_tags(conn)
+            conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+            conn.commit()
+            self._conn = conn
+
+            # A fresh index picks up whatever folders already exist.
+            if is_new:
+                self.migrate_from_dirs()
+        return self._conn
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def add_listener(self, listener):
+        """
+        Registers an in-process index that mirrors the store. The listener gets
+        on_upsert(data, ts) after every upsert and on_delete(item_id) after every delete.
+        """
+        self._listeners.append(listener)
+
+    def _notify(self, event, *args):
+        for listener in self._listeners:
+            try:
+                getattr(listener, event)(*args)
+            except Exception as e:
+                cprint(f" [STORE] Listener {type(listener).__name__}.{event} failed: {e}", color=Colors.Text.RED)
+
+    # --- writes ---
+
+    def upsert(self, data: dict, path=None):
+        """
+        Insert or replace one item record (the same dict that goes to data.json).
+        When the item folder is given, the data.json mtime/size are remembered so
+        the feed cache can tell later whether the file changed on disk.
+        Returns the item's epoch timestamp.
+        """
+        conn = self._connect()
+        item_id = data["id"]
+        ts = data.get("timestamp_epoch")
+        if ts is None:
+            ts = safe_parse_timestamp(data.get("timestamp_str")).timestamp()
+        mtime_ns = size = None
+        if path:
+            try:
+                st = os.stat(os.path.join(path, "data.json"))
+                mtime_ns, size = st.st_mtime_ns, st.st_size
+            except OSError:
+                pass
+            if self.root:
+                path = os.path.relpath(path, self.root)
+        tags = self._tag_keys(data.get("tags_list"))
+
+        with self._lock, conn:
+            old_tags = self._item_tag_keys(conn, item_id)
+            conn.execute(
+                "INSERT OR REPLACE INTO items (id, ts, path, data, mtime_ns, size) VALUES (?, ?, ?, ?, ?, ?)",
+                (item_id, ts, path, serde.dumps_str(data), mtime_ns, size)
+            )
+            conn.execute("DELETE FROM item_tags WHERE item_id = ?", (item_id,))
+            conn.executemany(
+                "INSERT OR IGNORE INTO item_tags (tag, item_id) VALUES (?, ?)",
+                [(t, item_id) for t in tags]
+            )
+            self._bump_tags(conn, {t: tags[t] for t in tags.keys() - old_tags}, +1)
+            self._bump_tags(conn, old_tags - tags.keys(), -1)
+        self._notify("on_upsert", data, ts)
+        return ts
+
+    def delete(self, item_id: str):
+        """Remove an item from the index. Returns its folder path (or None)."""
+        conn = self._connect()
+        with self._lock, conn:
+            row = conn.execute("SELECT path FROM items WHERE id = ?", (item_id,)).fetchone()
+            if row is None:
+                return None
+            self._bump_tags(conn, self._item_tag_keys(conn, item_id), -1)
+            conn.execute("DELETE FROM item_tags WHERE item_id = ?", (item_id,))
+            conn.execute("DELETE FROM items WHERE id = ?", (item_id,))
+        self._notify("on_delete", item_id)
+        return self.item_path(item_id, row["path"])
+
+    # --- tag aggregates ---
+
+    @staticmethod
+    def _tag_keys(raw_tags):
+        """{normalized tag: display form}; the first spelling seen wins."""
+        keys = {}
+        for t in clean_tags(raw_tags):
+            keys.setdefault(normalize_tag(t), t)
+        return keys
+
+    @staticmethod
+    def _item_tag_keys(conn, item_id):
+        return {r[0] for r in conn.execute("SELECT tag FROM item_tags WHERE item_id = ?", (item_id,))}
+
+    @staticmethod
+    def _bump_tags(conn, tags, delta):
+        """Adds delta to each tag's count; tags is a {key: display} dict or a set of keys."""
+        if delta > 0:
+            conn.executemany(
+                "INSERT INTO tags (tag, display, count) VALUES (?, ?, ?) "
+                "ON CONFLICT (tag) DO UPDATE SET count = count + excluded.count",
+                [(key, display, delta) for key, display in tags.items()]
+            )
+        else:
+            conn.executemany("UPDATE tags SET count = count + ? WHERE tag = ?", [(delta, key) for key in tags])
+            conn.executemany("DELETE FROM tags WHERE tag = ? AND count <= 0", [(key,) for key in tags])
+
+    def _rebuild_tags(self, conn):
+        """Re-derives item_tags and the tag aggregates from the stored items."""
+        conn.execute("DELETE FROM item_tags")
+        conn.execute("DELETE FROM tags")
+        for row in conn.execute("SELECT id, data FROM items").fetchall():
+            tags = self._tag_keys(serde.loads(row["data"]).get("tags_list"))
+            conn.executemany(
+                "INSERT OR IGNORE INTO item_tags (tag, item_id) VALUES (?, ?)",
+                [(t, row["id"]) for t in tags]
+            )
+            self._bump_tags(conn, tags, +1)
+
+    # --- reads ---
+
+    def item_path(self, item_id: str, rel_path=None):
+        if rel_path is None:
+            row = self._connect().execute("SELECT path FROM items WHERE id = ?", (item_id,)).fetchone()
+            rel_path = row["path"] if row and row["path"] else os.path.join(shard_for(item_id), item_id)
+        return os.path.join(self.root or "", rel_path)
+
+    def item_folder(self, item_id: str):
+        """
+        An item's folder for removal: its indexed path, else the legacy
+        <root>/<id>. ValueError for anything that is not an item id or
+        resolves outside root.
+        """
+        if not is_item_id(item_id):
+            raise ValueError(f"not an item id: {item_id!r}")
+        path = self.item_path(item_id)
+        if not os.path.exists(path):
+            path = os.path.join(self.root or "", item_id)  # legacy layout
+        root = os.path.realpath(self.root or "")
+        real = os.path.realpath(path)
+        if real == root or os.path.commonpath([root, real]) != root:
+            raise ValueError(f"item folder outside the data dir: {path}")
+        return path
+
+    def get(self, item_id: str):
+        row = self._connect().execute("SELECT data FROM items WHERE id = ?", (item_id,)).fetchone()
+        return serde.loads(row["data"]) if row else None
+
+    def get_with_ts(self, item_id: str):
+        """(ts, data) for one item, or None."""
+        row = self._connect().execute("SELECT ts, data FROM items WHERE id = ?", (item_id,)).fetchone()
+        return (row["ts"], serde.loads(row["data"])) if row else None
+
+    def latest(self, limit=None, tag=None):
+        """Items newest first, optionally restricted to one tag."""
+        sql = "SELECT i.data FROM items i"
+        params = []
+        if tag:
+            sql += " JOIN item_tags t ON t.item_id = i.id WHERE t.tag = ?"
+            params.append(normalize_tag(tag))
+        sql += " ORDER BY i.ts DESC, i.id DESC"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        rows = self._connect().execute(sql, params).fetchall()
+        return [serde.loads(r["data"]) for r in rows]
+
+    def page(self, limit, cursor=None, tag=None):
+        """
+        One page of item ids, newest first, keyed on (ts, id).
+        Returns (ids, next_cursor); next_cursor is None on the last page.
+        """
+        sql = "SELECT i.id, i.ts FROM items i"
+        where, params = [], []
+        if tag:
+            sql += " JOIN item_tags t ON t.item_id = i.id"
+            where.append("t.tag = ?")
+            params.append(normalize_tag(tag))
+        if cursor:
+            ts, item_id = decode_cursor(cursor)
+            where.append("(i.ts < ? OR (i.ts = ? AND i.id < ?))")
+            params += [ts, ts, item_id]
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY i.ts DESC, i.id DESC LIMIT ?"
+        params.append(int(limit) + 1)
+
+        rows = self._connect().execute(sql, params).fetchall()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1]["ts"], rows[-1]["id"])
+        return [r["id"] for r in rows], next_cursor
+
+    def tag_counts(self, limit=20):
+        """[(display tag, count, normalized tag)] most used first, read off the maintained aggregates."""
+        rows = self._connect().execute(
+            "SELECT tag, display, count FROM tags ORDER BY count DESC, tag LIMIT ?",
+            (int(limit),)
+        )
+        return [(r["display"], r["count"], r["tag"]) for r in rows]
+
+    def unique_tag_count(self):
+        return self._connect().execute("SELECT COUNT(*) FROM tags").fetchone()[0]
+
+    def iter_items(self):
+        """Yields (ts, data) for every item, newest first."""
+        for row in self._connect().execute("SELECT ts, data FROM items ORDER BY ts DESC, id DESC"):
+            yield row["ts"], serde.loads(row["data"])
+
+    def ids_for_tag(self, tag: str):
+        rows = self._connect().execute("SELECT item_id FROM item_tags WHERE tag = ?", (normalize_tag(tag),))
+        return {r[0] for r in rows}
+
+    def file_states(self):
+        """{relative folder path: (item id, mtime_ns, size)} as last indexed."""
+        rows = self._connect().execute("SELECT id, path, mtime_ns, size FROM items")
+        return {(r["path"] or r["id"]): (r["id"], r["mtime_ns"], r["size"]) for r in rows}
+
+    def count(self, tag=None):
+        conn = self._connect()
+        if tag:
+            row = conn.execute("SELECT count FROM tags WHERE tag = ?", (normalize_tag(tag),)).fetchone()
+            return row[0] if row else 0
+        return conn.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+
+    # --- migration ---
+
+    def migrate_from_dirs(self, root=None, verbose=True):
+        """Index every item folder under root (sharded or legacy) that is not in the store yet."""
+        root = root or self.root
+        if not root or not os.path.isdir(root):
+            return 0
+
+        conn = self._connect()
+        known = {r[0] for r in conn.execute("SELECT id FROM items")}
+        migrated = 0
+        for rel_path, path in iter_all_item_dirs(root):
+            json_path = os.path.join(path, "data.json")
+            if not os.path.exists(json_path):
+                continue
+            try:
+                data = serde.read_json(json_path)
+                data.setdefault("id", os.path.basename(path))
+                if data["id"] in known:
+                    continue
+                self.upsert(data, path=path)
+                migrated += 1
+            except Exception as e:
+                cprint(f" [STORE] Skipped {rel_path}: {e}", color=Colors.Text.YELLOW)
+
+        if verbose and migrated:
+            cprint(f" [STORE] Migrated {migrated} item folders into {self.db_path}", color=Colors.Text.GREEN)
+        return migrated
+
+
+news_store = NewsStore()
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["migrate"]:
+        news_store.migrate_from_dirs()
+        cprint(f" [STORE] {news_store.count()} items indexed.", color=Colors.Text.GREEN)
+    elif sys.argv[1:] == ["migrate-layout"]:
+        migrate_layout(news_store)
+    else:
+        print("usage: python -m core.store migrate | migrate-layout")
@@ -0,0 +1,189 @@
+# story dedupe
+
+"""
+Similarity index over recently published items, used to catch a story that
+comes back in a later cycle before the LLM is asked to write it again.
+
+Each item from the last STORY_DEDUPE_HOURS is kept as a sparse term vector
+(headline, content and tags, same terms as core.clustering) with an inverted
+index for candidate lookup. Like core.search_index it is built from the news
+store on first use and then follows every upsert/delete through the store's
+listener hooks, so an item saved earlier in the same cycle is already known.
+
+A raw story matches an item when the TF-IDF cosine of the two texts reaches
+STORY_DUP_SIMILARITY, or when it shares a source tweet with the item and is
+at least loosely similar. Matches are not regenerated; their new sources are
+merged into the existing item instead (merge_sources).
+"""
+
+import os
+import math
+import time
+import threading
+from collections import Counter, defaultdict
+
+from core.configs import STORY_DEDUPE_HOURS, STORY_DUP_SIMILARITY
+from core.colored import cprint, Colors
+from core import serde
+from core.store import news_store
+from core.clustering import content_terms
+from core.utils import clean_tags
+
+SHARED_SOURCE_SIMILARITY = 0.15  # enough when a source tweet is shared
+MAX_QUERY_TERMS = 24             # rarest query terms used to look up candidates
+PRUNE_EVERY = 600                # seconds between sweeps of expired items
+
+
+def story_text(data):
+    """Text that identifies a raw story or a stored item."""
+    parts = [data.get("headline_str"), data.get("full_text"), data.get("content_str")]
+    parts.extend(clean_tags(data.get("tags_list")))
+    return " ".join(p for p in parts if p)
+
+
+def story_sources(data):
+    return data.get("sources") or data.get("source_list") or []
+
+
+def _weights(text):
+    """Sublinear term frequencies."""
+    return {term: 1 + math.log(n) for term, n in Counter(content_terms(text)).items()}
+
+
+class StoryIndex:
+    def __init__(self, store=news_store, window_hours=STORY_DEDUPE_HOURS):
+        self.store = store
+        self.window = window_hours * 3600
+        self._postings = defaultdict(set)  # term -> item ids
+        self._docs = {}                    # item_id -> (ts, {term: weight}, sources)
+        self._by_source = {}               # source url -> item_id
+        self._loaded = False
+        self._pruned_at = 0.0
+        self._lock = threading.RLock()
+        store.add_listener(self)
+
+    # --- store listener ---
+
+    def on_upsert(self, data, ts):
+        if self._loaded:
+            with self._lock:
+                self._add(data, ts)
+
+    def on_delete(self, item_id):
+        if self._loaded:
+            with self._lock:
+                self._remove(item_id)
+
+    # --- public ---
+
+    def ensure_loaded(self):
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            cutoff = time.time() - self.window
+            for ts, data in self.store.iter_items():
+                if ts >= cutoff:
+                    self._add(data, ts)
+            self._loaded = True
+            self._pruned_at = time.time()
+
+    def match(self, raw, threshold=STORY_DUP_SIMILARITY):
+        """(item_id, similarity) of the published item raw duplicates, or None."""
+        self.ensure_loaded()
+        query = _weights(story_text(raw))
+        if not query:
+            return None
+
+        with self._lock:
+            self._maybe_prune()
+            n_docs = len(self._docs) + 1
+            idf = lambda term: math.log(n_docs / (len(self._postings.get(term, ())) + 1)) + 1
+
+            shared = {self._by_source[s] for s in story_sources(raw) if s in self._by_source}
+            terms = sorted(query, key=lambda t: len(self._postings.get(t, ())))[:MAX_QUERY_TERMS]
+            candidates = set(shared)
+            for term in terms:
+                candidates.update(self._postings.get(term, ()))
+
+            q_vec = {t: w * idf(t) for t, w in query.items()}
+            q_norm = math.sqrt(sum(v * v for v in q_vec.values()))
+            best = None
+            for item_id in candidates:
+                doc = self._docs.get(item_id)
+                if doc is None:
+                    continue
+                d_vec = {t: w * idf(t) for t, w in doc[1].items()}
+                d_norm = math.sqrt(sum(v * v for v in d_vec.values()))
+                dot = sum(v * d_vec[t] for t, v in q_vec.items() if t in d_vec)
+                score = dot / (q_norm * d_norm) if q_norm and d_norm else 0.0
+                needed = SHARED_SOURCE_SIMILARITY if item_id in shared else threshold
+                if score >= needed and (best is None or score > best[1]):
+                    best = (item_id, score)
+            return best
+
+    # --- internals ---
+
+    def _add(self, data, ts):
+        item_id = data.get("id")
+        if not item_id:
+            return
+        self._remove(item_id)
+        if ts < time.time() - self.window:
+            return
+        weights = _weights(story_text(data))
+        if not weights:
+            return
+        sources = list(story_sources(data))
+        self._docs[item_id] = (ts, weights, sources)
+        for term in weights:
+            self._postings[term].add(item_id)
+        for source in sources:
+            self._by_source[source] = item_id
+
+    def _remove(self, item_id):
+        doc = self._docs.pop(item_id, None)
+        if doc is None:
+            return
+        for term in doc[1]:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.discard(item_id)
+                if not postings:
+                    del self._postings[term]
+        for source in doc[2]:
+            if self._by_source.get(source) == item_id:
+                del self._by_source[source]
+
+    def _maybe_prune(self):
+        now = time.time()
+        if now - self._pruned_at < PRUNE_EVERY:
+            return
+        self._pruned_at = now
+        cutoff = now - self.window
+        for item_id in [i for i, doc in self._docs.items() if doc[0] < cutoff]:
+            self._remove(item_id)
+
+
+def merge_sources(item_id, sources, store=news_store):
+    """Adds new source urls to a published item. Returns how many were added."""
+    data = store.get(item_id)
+    if data is None:
+        return 0
+    existing = data.get("source_list") or []
+    new = [s for s in dict.fromkeys(sources) if s not in existing]
+    if not new:
+        return 0
+    data["source_list"] = existing + new
+    path = store.item_path(item_id)
+    try:
+        serde.write_json(os.path.join(path, "data.json"), data)
+    except OSError as e:
+        cprint(f" [DEDUPE] Could not update {item_id}: {e}", color=Colors.Text.RED)
+        return 0
+    store.upsert(data, path=path)
+    return len(new)
+
+
+story_index = StoryIndex()
@@ -1,16 +1,22 @@
 # trends_pipeline.py
 from dateutil import parser as dateparser
 import re
+import time
 import asyncio
-import json
 from datetime import datetime, timedelta, timezone
-from collections import defaultdict
+from collections import defaultdict, Counter
 
 from twikit import Client, Tweet
 from pytrends.request import TrendReq
 from pytrends.exceptions import ResponseError
 
+from core.configs import X_SEARCH_MAX_PAGES, X_SEARCH_TIME_BUDGET
 from core.colored import cprint, Colors
+from core.x_search import get_scheduler, build_query
+from core.seen_tweets import seen_tweets
+from core.clustering import group_stories
+from core.prompt_budget import pack_tweets
+from core.llms import serving_routes
 
 
 def get_trend_keywords(top_n=40, dedupe=True):
@@ -77,10 +83,11 @@ def get_trend_keywords(top_n=40, dedupe=True):
 
 async def search_twitter_for_keywords(client: Client, keywords, per_keyword=6, min_like=20, min_rt=5):
     out = defaultdict(list)
-    for kw in keywords:
-        try:
-            tweets = await client.search_tweet(kw, "Top", count=per_keyword)
-        except Exception:
+    queries = {kw: build_query(kw, min_likes=min_like, min_retweets=min_rt) for kw in keywords}
+    results = await get_scheduler(client).search_many(queries.values(), "Top", count=per_keyword)
+    for kw, query in queries.items():
+        tweets = results[query]
+        if isinstance(tweets, Exception):
             continue
         for tw in tweets:
             if not isinstance(tw, Tweet):
@@ -113,15 +120,10 @@ async def search_twitter_for_keywords(client: Client, keywords, per_keyword=6, m
 # --- 3) Build raw_news items per keyword (aggregate top tweets) ---
 
 
-def make_raw_news_from_cluster(keyword: str, tweets: list, top_k=5):
-    # sort by simple virality
-    scored = sorted(
-        tweets,
-        key=lambda t: (t["likes"]*0.7 + t["retweets"]*1.3 + t["replies"]*0.3),
-        reverse=True
-    )[:top_k]
-
-    full_text = " ".join(t["text"] for t in scored)[:2000]
+def make_raw_news_from_cluster(keyword: str, tweets: list, top_k=5, token_budget=None, model=None):
+    # best tweets by simple virality, whole, cleaned and deduped, within model's token budget
+    scored, full_text, _ = pack_tweets(tweets, budget=token_budget, max_tweets=top_k, model=model)
+    scored = scored or tweets[:1]
     headline_str = keyword[:120]
 
     media_urls = []
@@ -145,10 +147,50 @@ def make_raw_news_from_cluster(keyword: str, tweets: list, top_k=5):
         # "media_urls": media_urls,
         # "category_guess": guess_category(keyword, full_text),
         "sources": [t["url"] for t in scored if t.get("url")],
-        "keyword": keyword
+        "keyword": keyword,
+        # every tweet in the cluster, marked seen once the item is saved
+        "tweet_ids": [t["id"] for t in tweets],
     }
 
 
+def drop_seen_stories(stories, verbose=True):
+    """Removes stories whose tweets all went into an earlier item (core.seen_tweets)."""
+    fresh = []
+    for story in stories:
+        tws = story["tweets"]
+        if tws and not seen_tweets.unseen(t["id"] for t in tws):
+            if verbose:
+                cprint(
+                    f" [SEEN] Story '{story['keyword']}' -> all {len(tws)} tweets already seen, skipped.", color=Colors.Text.YELLOW)
+            continue
+        fresh.append(story)
+    return fresh
+
+
+def build_raw_items(clusters, top_k=10, verbose=True, model=None):
+    """
+    {keyword: [tweet dict]} -> raw news items, one per story.
+    Tweets are regrouped by content (core.clustering), so one story found under
+    several keywords becomes a single item and unrelated stories under one
+    keyword are split apart, before any LLM work. Tweet text is packed for
+    model, by default the model of the LLM router's preferred route.
+    """
+    model = model or serving_routes()[0][1].model
+    stories = drop_seen_stories(group_stories(clusters), verbose=verbose)
+    raw_items = []
+    for story in stories:
+        tws = story["tweets"]
+        raw = make_raw_news_from_cluster(story["keyword"], tws, top_k=min(top_k, len(tws)), model=model)
+        raw["keywords"] = story["keywords"]
+        raw_items.append(raw)
+        if verbose:
+            cprint(
+                f" [CLUSTER] Story '{story['keyword']}' ({', '.join(story['keywords'])}) -> {len(tws)} tweets -> 1 raw news item.",
+                color=Colors.Text.CYAN
+            )
+    return raw_items
+
+
 def guess_category(keyword: str, text: str):
     k = f"{keyword} {text}".lower()
     if any(w in k for w in ["election", "minister", "assembly", "bjp", "congress", "rahul", "modi", "siddaramaiah", "bommai"]):
@@ -176,16 +218,7 @@ async def build_trends_news_items(client: Client, top_n_keywords=30, per_keyword
         total_tweets = sum(len(tws) for tws in clusters.values())
         cprint(
             f" [TWITTER] Retrieved a total of {total_tweets} tweets across {len(clusters)} keywords.", color=Colors.Text.CYAN)
-    raw_items = []
-    for kw, tws in clusters.items():
-        if not tws:
-            continue
-        raw_items.append(make_raw_news_from_cluster(
-            kw, tws, top_k=min(5, len(tws))))
-        if verbose:
-            cprint(
-                f" [CLUSTER] Keyword '{kw}' -> {len(tws)} tweets -> 1 raw news item.", color=Colors.Text.BLUE)
-    return raw_items
+    return build_raw_items(clusters, top_k=5, verbose=verbose)
 
 # --- Function to search for trending news using Twikit ---
 
@@ -214,101 +247,148 @@ def normalize_created_at(created):
     return None
 
 
+def decode_unicode(text):
+    """Decode unicode escape sequences and emojis."""
+    try:
+        return bytes(text, "utf-8").decode("unicode_escape")
+    except Exception:
+        return text
+
+
+def tweet_record(tw, cutoff, min_like, min_rt, rejected=None, verbose=True):
+    """
+    Cluster entry for a qualifying tweet, None for one that is skipped.
+    cutoff: oldest accepted created_at; rejected: optional Counter of skip reasons.
+    """
+    rejected = rejected if rejected is not None else Counter()
+    try:
+        text = getattr(tw, "full_text", None) or getattr(
+            tw, "text", None)
+
+        if not text:
+            rejected["no_text"] += 1
+            if verbose:
+                cprint(
+                    f"   [SKIP] No text in tweet {tw.id}", color=Colors.Text.YELLOW)
+            return None
+
+        # --- Normalize timestamp ---
+        created = normalize_created_at(getattr(tw, "created_at", None))
+
+        # Skip tweets older than max_age_days
+        if created and created < cutoff:
+            rejected["too_old"] += 1
+            if verbose:
+                cprint(
+                    f"   [SKIP] Too old tweet {tw.id} ({created})", color=Colors.Text.YELLOW)
+            return None
+
+        # Decode escapes / emojis
+        text = decode_unicode(text)
+
+        likes = getattr(tw, "favorite_count", 0) or 0
+        rts = getattr(tw, "retweet_count", 0) or 0
+
+        if likes < min_like and rts < min_rt:
+            rejected["low_engagement"] += 1
+            if verbose:
+                cprint(
+                    f"   [SKIP] Low engagement {tw.id} (likes={likes}, rts={rts})",
+                    color=Colors.Text.YELLOW
+                )
+            return None
+
+        if verbose:
+            cprint(
+                f"   [OK] Adding tweet {tw.id}", color=Colors.Text.GREEN)
+
+        return {
+            "id": str(tw.id),
+            "text": text.replace("\n", " ").strip(),
+            "author": tw.user.screen_name,
+            "likes": likes,
+            "retweets": rts,
+            "replies": int(getattr(tw, "reply_count", 0) or 0),
+            "timestamp": created.isoformat() if created else None,
+            "url": f"https://x.com/{tw.user.screen_name}/status/{tw.id}"
+        }
+
+    except Exception as e:
+        rejected["error"] += 1
+        cprint(
+            f"   [ERR] Failed to process tweet: {e}", color=Colors.Text.RED)
+        return None
+
+
 async def search_trending_news_on_x(
     client: Client,
     per_keyword=5,
     keywords=[],
     min_like=20,
     min_rt=5,
+    max_pages=X_SEARCH_MAX_PAGES,
+    time_budget=X_SEARCH_TIME_BUDGET,
+    max_age_days=2,
+    exclude_replies=True,
     verbose=True
 ):
     """
     Searches trending hashtags on X/Twitter and returns raw news items.
+    Each keyword pages through results until it has per_keyword qualifying
+    tweets, max_pages pages were read or its time_budget is spent.
+
+    Engagement, age and reply filters are part of the search query; the
+    checks in to_record() only catch what the server-side filters let through.
     """
     # Default keywords if user doesn't override
     keywords = keywords or ["#BreakingNews", "#Karnataka", "#news"]
 
     clusters = defaultdict(list)
+    cutoff = datetime.now(timezone.utc) - timedelta(days=max_age_days)
+    fetched = Counter()   # keyword -> tweets that reached the client
+    rejected = Counter()  # reason -> tweets dropped client-side
+
+    def to_record(tw, keyword):
+        fetched[keyword] += 1
+        return tweet_record(tw, cutoff, min_like, min_rt, rejected, verbose)
+
+    async def collect(keyword):
+        found = []
+        query = build_query(keyword, min_likes=min_like, min_retweets=min_rt,
+                            since=cutoff, exclude_replies=exclude_replies)
+        async for record in scheduler.stream(
+            query, "Top", count=max(per_keyword, 20), accept=lambda tw: to_record(tw, keyword),
+            target=per_keyword, max_pages=max_pages, time_budget=time_budget
+        ):
+            found.append(record)
+        return found
+
+    # All keywords stream concurrently; the scheduler bounds concurrency
+    # and spaces page requests against the endpoint's remaining quota.
+    scheduler = get_scheduler(client)
+    keywords = list(dict.fromkeys(keywords))
+    t0 = time.perf_counter()
+    results = await asyncio.gather(*(collect(kw) for kw in keywords), return_exceptions=True)
+    if verbose:
+        cprint(
+            f" [TRENDING] Searched {len(keywords)} keywords in {time.perf_counter() - t0:.2f}s "
+            f"(limits: {scheduler.snapshot()})",
+            color=Colors.Text.BLUE
+        )
 
-    def decode_unicode(text):
-        """Decode unicode escape sequences and emojis."""
-        try:
-            return bytes(text, "utf-8").decode("unicode_escape")
-        except Exception:
-            return text
-
-    for keyword in keywords:
-        try:
-            tweets = await client.search_tweet(keyword, "Top", count=per_keyword)
-            if verbose:
-                cprint(
-                    f" [TRENDING] Searching '{keyword}' -> {len(tweets) if tweets else 0} tweets.",
-                    color=Colors.Text.BLUE
-                )
-        except Exception as e:
+    for keyword, records in zip(keywords, results):
+        if isinstance(records, Exception):
             if verbose:
                 cprint(
-                    f" [ERROR] Search failed for '{keyword}': {e}", color=Colors.Text.RED)
+                    f" [ERROR] Search failed for '{keyword}': {records}", color=Colors.Text.RED)
             continue
-
-        if not tweets:
-            continue
-
-        for tw in tweets:
-            try:
-                text = getattr(tw, "full_text", None) or getattr(
-                    tw, "text", None)
-
-                if not text:
-                    if verbose:
-                        cprint(
-                            f"   [SKIP] No text in tweet {tw.id}", color=Colors.Text.YELLOW)
-                    continue
-
-                # --- Normalize timestamp ---
-                created = normalize_created_at(getattr(tw, "created_at", None))
-
-                # Skip tweets older than 2 days
-                if created and created < datetime.now(timezone.utc) - timedelta(days=2):
-                    if verbose:
-                        cprint(
-                            f"   [SKIP] Too old tweet {tw.id} ({created})", color=Colors.Text.YELLOW)
-                    continue
-
-                # Decode escapes / emojis
-                text = decode_unicode(text)
-
-                likes = getattr(tw, "favorite_count", 0) or 0
-                rts = getattr(tw, "retweet_count", 0) or 0
-
-                if likes < min_like and rts < min_rt:
-                    if verbose:
-                        cprint(
-                            f"   [SKIP] Low engagement {tw.id} (likes={likes}, rts={rts})",
-                            color=Colors.Text.YELLOW
-                        )
-                    continue
-
-                if verbose:
-                    cprint(
-                        f"   [OK] Adding tweet {tw.id}", color=Colors.Text.GREEN)
-
-                # Add to cluster
-                clusters[keyword].append({
-                    "id": str(tw.id),
-                    "text": text.replace("\n", " ").strip(),
-                    "author": tw.user.screen_name,
-                    "likes": likes,
-                    "retweets": rts,
-                    "replies": int(getattr(tw, "reply_count", 0) or 0),
-                    "timestamp": created.isoformat() if created else None,
-                    "url": f"https://x.com/{tw.user.screen_name}/status/{tw.id}"
-                })
-
-            except Exception as e:
-                cprint(
-                    f"   [ERR] Failed to process tweet: {e}", color=Colors.Text.RED)
-                continue
+        if verbose:
+            cprint(
+                f" [TRENDING] Searching '{keyword}' -> {len(records)} qualifying tweets.",
+                color=Colors.Text.BLUE
+            )
+        if records:
+            clusters[keyword].extend(records)
 
     if verbose:
         total = sum(len(v) for v in clusters.values())
@@ -316,21 +396,16 @@ async def search_trending_news_on_x(
             f" [TWITTER] Retrieved a total of {total} tweets across {len(clusters)} keywords.",
             color=Colors.Text.CYAN
         )
-
-    # Build raw news items
-    raw_items = []
-    for kw, tws in clusters.items():
-        if not tws:
-            continue
-
-        raw_items.append(
-            make_raw_news_from_cluster(kw, tws, top_k=min(10, len(tws)))
+        # X does not report what its operators filtered out; what is visible is
+        # how much still had to be rejected here, which should stay near zero.
+        n_fetched = sum(fetched.values())
+        n_rejected = sum(rejected.values())
+        share = n_rejected / n_fetched if n_fetched else 0.0
+        cprint(
+            f" [FILTER] Server-side: {build_query('<kw>', min_like, min_rt, cutoff, exclude_replies=exclude_replies)!r} | "
+            f"client-side rejected {n_rejected}/{n_fetched} fetched ({share:.1%}) {dict(rejected)}",
+            color=Colors.Text.CYAN
         )
 
-        if verbose:
-            cprint(
-                f" [CLUSTER] Keyword '{kw}' -> {len(tws)} tweets -> 1 raw news item.",
-                color=Colors.Text.CYAN
-            )
-
-    return raw_items
+    # Build raw news items, one per story
+    return build_raw_items(clusters, top_k=10, verbose=verbose)
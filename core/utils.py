@@ -1,3 +1,143 @@
 from datetime import datetime
 import os
+import re
+import time
+import threading
+import unicodedata
+import urllib.parse
 
+
+def safe_parse_timestamp(ts_str):
+    if not ts_str:
+        return datetime.now()
+    try:
+        return datetime.fromisoformat(ts_str)
+    except Exception:
+        try:
+            clean_ts = ts_str.split('+')[0].split('.')[0].replace('Z', '')
+            return datetime.strptime(clean_ts, "%Y-%m-%dT%H:%M:%S")
+        except:
+            return datetime.now()
+
+
+def clean_tags(raw_tags):
+    if not raw_tags:
+        return []
+    if isinstance(raw_tags, str):
+        raw_tags = raw_tags.split()
+    tags = [str(t).replace("#", "").strip() for t in raw_tags if t]
+    return [t for t in tags if t]
+
+
+def normalize_tag(tag):
+    """Case-folded lookup key for a tag, so "#Karnataka" and "karnataka" count once."""
+    return unicodedata.normalize("NFC", str(tag)).replace("#", "").strip().casefold()
+
+
+def clean_sources(raw_sources):
+    if not raw_sources:
+        return []
+    if isinstance(raw_sources, str):
+        raw_sources = raw_sources.split()
+    return [str(s) for s in raw_sources if s]
+
+
+BOLD_TABLE = str.maketrans(
+    "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789",
+    "𝗔𝗕𝗖𝗗𝗘𝗙𝗚𝗛𝗜𝗝𝗞𝗟𝗠𝗡𝗢𝗣𝗤𝗥𝗦𝗧𝗨𝗩𝗪𝗫𝗬𝗭𝗮𝗯𝗰𝗱𝗲𝗳𝗴𝗵𝗶𝗷𝗸𝗹𝗺𝗻𝗼𝗽𝗾𝗿𝘀𝘁𝘂𝘃𝘄𝘅𝘆𝘇𝟬𝟭𝟮𝟯𝟰𝟱𝟲𝟕𝟴𝟵"
+)
+
+
+def to_bold_unicode(text):
+    if not text:
+        return ""
+    return text.translate(BOLD_TABLE)
+
+
+def build_x_intent(headline, content, tags):
+    tweet_body = f"{to_bold_unicode(headline)}\n\n{content}\n\n" + \
+        " ".join([f"#{t}" for t in tags])
+    return "https://x.com/intent/tweet?text=" + urllib.parse.quote(tweet_body)
+
+
+def derive_display_fields(data):
+    """
+    Display fields that never change after save: epoch timestamp, formatted
+    time, cleaned tags and the X intent link. Persisted by NewsItemModel at save
+    time; computed on the fly only for items written before these fields existed.
+    """
+    dt = safe_parse_timestamp(data.get("timestamp_str"))
+    tags = clean_tags(data.get("tags_list"))
+    return {
+        "timestamp_epoch": dt.timestamp(),
+        "fmt_time_str": dt.strftime('%b %d, %I:%M %p'),
+        "display_tags_list": tags,
+        "x_intent_url": build_x_intent(data.get("headline_str") or "Untitled", data.get("content_str") or "", tags),
+    }
+
+
+def with_display_fields(data):
+    if data.get("timestamp_epoch") is not None and data.get("x_intent_url"):
+        return data
+    return {**data, **derive_display_fields(data)}
+
+
+# --- ULID item ids ---
+# 48-bit millisecond timestamp + 80 random bits, Crockford base32 (26 chars).
+# Lexicographic order == creation order, so ids double as a time index.
+
+ULID_ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+ULID_RE = re.compile(r"^[0-9A-HJKMNP-TV-Z]{26}$")
+
+_ulid_lock = threading.Lock()
+_ulid_last = (-1, 0)  # (ms, randomness) of the last generated id
+
+
+def _encode_ulid(ms, rand):
+    value = (ms << 80) | rand
+    chars = []
+    for _ in range(26):
+        chars.append(ULID_ALPHABET[value & 31])
+        value >>= 5
+    return "".join(reversed(chars))
+
+
+def new_item_id(ts=None):
+    """
+    Monotonic ULID. Ids minted in the same millisecond increment the random
+    part, so they still sort in creation order. ts (epoch seconds) pins the
+    time part, e.g. when re-keying old items.
+    """
+    global _ulid_last
+    if ts is not None:
+        return _encode_ulid(int(ts * 1000), int.from_bytes(os.urandom(10), "big"))
+    with _ulid_lock:
+        ms = int(time.time() * 1000)
+        last_ms, last_rand = _ulid_last
+        if ms <= last_ms:
+            ms, rand = last_ms, last_rand + 1
+            if rand >> 80:
+                ms, rand = ms + 1, 0
+        else:
+            rand = int.from_bytes(os.urandom(10), "big")
+        _ulid_last = (ms, rand)
+        return _encode_ulid(ms, rand)
+
+
+# ids minted before ULIDs: "%I_%M_%p_%d_%m_%Y_<uuid4>"
+LEGACY_ID_RE = re.compile(r"\d{2}_\d{2}_[A-Za-z]+_\d{2}_\d{2}_\d{4}_[0-9a-f]{8}(?:-[0-9a-f]{4}){3}-[0-9a-f]{12}")
+
+
+def is_item_id(item_id):
+    """True for a ULID or legacy item id; anything else must not reach a file path."""
+    return isinstance(item_id, str) and bool(ULID_RE.fullmatch(item_id) or LEGACY_ID_RE.fullmatch(item_id))
+
+
+def ulid_timestamp(item_id):
+    """Epoch seconds encoded in a ULID id, or None for legacy ids."""
+    if not item_id or not ULID_RE.match(item_id):
+        return None
+    ms = 0
+    for ch in item_id[:10]:
+        ms = (ms << 5) | ULID_ALPHABET.index(ch)
+    return ms / 1000
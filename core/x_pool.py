@@ -0,0 +1,195 @@
+# X account pool
+
+"""
+Pool of logged-in twikit clients, one per cookie file in COOKIES_PATHS.
+
+Every account gets its own SearchScheduler (core.x_search), so each one has
+its own rate-limit tracking and concurrency slots. The pool sends each search
+to the healthy account with the most search quota left. An account that hits
+a 429 is benched until its window resets; one that turns out to be logged
+out, locked or suspended is benched for X_POOL_BENCH_SECONDS and checked
+again before it gets traffic. The pool has the same search / stream /
+search_many interface as a SearchScheduler, so it can be passed wherever a
+Client is expected by core.trends_pipeline.
+"""
+
+import os
+import time
+import asyncio
+
+from twikit import Client
+from twikit.errors import TooManyRequests, Unauthorized, Forbidden, AccountLocked, AccountSuspended
+
+from core.configs import COOKIES_PATHS, X_POOL_BENCH_SECONDS, X_SEARCH_MAX_WAIT
+from core.colored import cprint, Colors
+from core.x_search import SearchScheduler, RateLimited, SEARCH_ENDPOINT, DEFAULT_BACKOFF
+
+ASSUMED_QUOTA = 50  # search requests per window before an account's headers are known
+LOGGED_OUT = (Unauthorized, Forbidden, AccountLocked, AccountSuspended)
+
+
+class NoAccountAvailable(Exception):
+    """Every account is benched for longer than X_SEARCH_MAX_WAIT."""
+
+
+class Account:
+    def __init__(self, cookies_path, language="en-US"):
+        self.name = os.path.splitext(os.path.basename(cookies_path))[0]
+        self.cookies_path = cookies_path
+        self.client = Client(language)
+        self.scheduler = SearchScheduler(self.client)
+        self.cookies_mtime = None
+        self.healthy = False
+        self.benched_until = 0.0
+        self.inflight = 0
+
+    def quota(self):
+        state = self.scheduler.limits.get(SEARCH_ENDPOINT)
+        if state is None or state.remaining is None or time.time() >= state.reset:
+            remaining = ASSUMED_QUOTA
+        else:
+            remaining = state.remaining
+        return remaining - self.inflight
+
+    def snapshot(self):
+        return {
+            "healthy": self.healthy,
+            "benched_for": max(0, round(self.benched_until - time.time())),
+            "quota": self.quota(),
+            "requests": self.scheduler.requests,
+        }
+
+
+class ClientPool:
+    def __init__(self, cookie_paths=COOKIES_PATHS, language="en-US", bench_seconds=X_POOL_BENCH_SECONDS,
+                 max_wait=X_SEARCH_MAX_WAIT):
+        self.accounts = [Account(path, language) for path in cookie_paths if path]
+        self.bench_seconds = bench_seconds
+        self.max_wait = max_wait
+
+    # --- lifecycle ---
+
+    async def start(self):
+        """Loads every cookie file and health-checks the accounts concurrently."""
+        await asyncio.gather(*(self._check(account) for account in self.accounts))
+        healthy = sum(a.healthy for a in self.accounts)
+        cprint(
+            f" [POOL] {healthy}/{len(self.accounts)} X accounts ready.",
+            color=Colors.Text.GREEN if healthy else Colors.Text.RED
+        )
+        return healthy
+
+    async def refresh(self):
+        """Re-checks every account, reloading cookie files that changed on disk."""
+        await asyncio.gather(*(self._check(account) for account in self.accounts))
+        return sum(a.healthy for a in self.accounts)
+
+    async def _check(self, account):
+        try:
+            mtime = os.path.getmtime(account.cookies_path)  # FileNotFoundError if missing
+            if not account.healthy or mtime != account.cookies_mtime:
+                account.client.load_cookies(account.cookies_path)
+                account.cookies_mtime = mtime
+            refresh = getattr(account.client, "refresh_auth", None)
+            if refresh is not None:
+                await refresh()
+            else:
+                await account.client.v11.settings()  # cheapest authenticated call
+            account.healthy = True
+            account.benched_until = 0.0
+        except Exception as e:
+            account.healthy = False
+            account.benched_until = time.time() + self.bench_seconds
+            cprint(f" [POOL] Account '{account.name}' unavailable: {e}", color=Colors.Text.RED)
+        return account.healthy
+
+    # --- scheduler interface ---
+
+    @property
+    def requests(self):
+        return sum(a.scheduler.requests for a in self.accounts)
+
+    def snapshot(self):
+        return {a.name: a.snapshot() for a in self.accounts}
+
+    async def search(self, query, product="Top", count=20, **kwargs):
+        last_error = None
+        for _ in range(max(len(self.accounts), 1)):
+            account = await self._acquire()
+            try:
+                return await account.scheduler.search(query, product, count=count, **kwargs)
+            except Exception as e:
+                if not self._bench(account, e):
+                    raise
+                last_error = e
+            finally:
+                account.inflight -= 1
+        raise last_error
+
+    async def stream(self, query, product="Top", count=20, **kwargs):
+        """
+        SearchScheduler.stream on the best account. Pages after the first stay
+        on that account (a Result's next() is bound to its client); if the
+        account fails before anything was yielded, another one takes over.
+        """
+        for _ in range(max(len(self.accounts), 1)):
+            account = await self._acquire()
+            yielded = 0
+            try:
+                async for item in account.scheduler.stream(query, product, count=count, **kwargs):
+                    yielded += 1
+                    yield item
+                return
+            except Exception as e:
+                if not self._bench(account, e) or yielded:
+                    raise
+            finally:
+                account.inflight -= 1
+        raise NoAccountAvailable(f"no account could search {query!r}")
+
+    async def search_many(self, queries, product="Top", count=20, **kwargs):
+        queries = list(dict.fromkeys(queries))
+        results = await asyncio.gather(
+            *(self.search(q, product, count=count, **kwargs) for q in queries),
+            return_exceptions=True
+        )
+        return dict(zip(queries, results))
+
+    # --- internals ---
+
+    async def _acquire(self):
+        """The available account with the most quota left; waits briefly if all are benched."""
+        while True:
+            now = time.time()
+            for account in self.accounts:
+                if not account.healthy and account.benched_until <= now:
+                    await self._check(account)
+
+            ready = [a for a in self.accounts if a.healthy and a.benched_until <= now]
+            if ready:
+                account = max(ready, key=lambda a: a.quota())
+                account.inflight += 1
+                return account
+
+            if not self.accounts:
+                raise NoAccountAvailable("no X accounts configured")
+            wait = min(a.benched_until for a in self.accounts) - now
+            if wait > self.max_wait:
+                raise NoAccountAvailable(f"all X accounts benched, next one back in {wait:.0f}s")
+            await asyncio.sleep(max(wait, 0.1))
+
+    def _bench(self, account, error):
+        """Benches an account for errors that are about the account. Returns False otherwise."""
+        if isinstance(error, (TooManyRequests, RateLimited)):
+            state = account.scheduler.limits.get(SEARCH_ENDPOINT)
+            reset = state.reset if state is not None and state.reset > time.time() else time.time() + DEFAULT_BACKOFF
+            account.benched_until = reset
+            cprint(f" [POOL] Account '{account.name}' rate-limited for {reset - time.time():.0f}s",
+                   color=Colors.Text.YELLOW)
+            return True
+        if isinstance(error, LOGGED_OUT):
+            account.healthy = False
+            account.benched_until = time.time() + self.bench_seconds
+            cprint(f" [POOL] Account '{account.name}' logged out or blocked: {error}", color=Colors.Text.RED)
+            return True
+        return False
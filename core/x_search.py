@@ -0,0 +1,250 @@
+# X search scheduler
+
+"""
+Bounded-concurrency scheduler for twikit searches.
+
+The scheduler hooks the client's httpx session and reads X's rate-limit
+headers (x-rate-limit-limit / -remaining / -reset) from every response, keyed
+by endpoint (the last URL path segment, e.g. "SearchTimeline"). Searches run
+concurrently up to a semaphore; while an endpoint has plenty of quota left
+they go out immediately, and once it runs low the remaining requests are
+spread evenly over what is left of the window. A 429 parks the endpoint until
+its reset time and the request is retried once.
+
+stream() follows Result.next() cursors and yields accepted tweets as pages
+arrive, so a keyword can go past the first page without holding every page.
+
+build_query() pushes engagement / date / reply filters into the search
+itself, so X drops unqualified tweets before they use quota or bandwidth.
+"""
+
+import time
+import asyncio
+import weakref
+from datetime import datetime, timezone
+from urllib.parse import urlparse
+
+from twikit import Client
+from twikit.errors import TooManyRequests
+
+from core.configs import (
+    X_SEARCH_CONCURRENCY,
+    X_SEARCH_RESERVE,
+    X_SEARCH_BURST,
+    X_SEARCH_MAX_WAIT,
+    X_SEARCH_MAX_PAGES,
+    X_SEARCH_TIME_BUDGET,
+)
+from core.colored import cprint, Colors
+
+SEARCH_ENDPOINT = "SearchTimeline"
+DEFAULT_BACKOFF = 60  # seconds, for a 429 without a reset header
+
+
+def _query_date(value):
+    """'YYYY-MM-DD' (UTC) for a datetime or epoch seconds; strings pass through."""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (int, float)):
+        value = datetime.fromtimestamp(value, timezone.utc)
+    elif value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return value.strftime("%Y-%m-%d")
+
+
+def build_query(keyword, min_likes=0, min_retweets=0, since=None, until=None, exclude_replies=False):
+    """
+    X search query for a keyword with server-side filters.
+
+    Like the client-side check it mirrors, engagement is an OR: a tweet
+    qualifies with min_likes likes *or* min_retweets retweets. since/until
+    are day-granular on X's side, so exact age cutoffs still need a client check.
+    """
+    parts = [f"({keyword})" if " OR " in keyword else keyword]
+    engagement = []
+    if min_likes:
+        engagement.append(f"min_faves:{int(min_likes)}")
+    if min_retweets:
+        engagement.append(f"min_retweets:{int(min_retweets)}")
+    if len(engagement) == 2:
+        parts.append(f"({' OR '.join(engagement)})")
+    else:
+        parts.extend(engagement)
+    if since is not None:
+        parts.append(f"since:{_query_date(since)}")
+    if until is not None:
+        parts.append(f"until:{_query_date(until)}")
+    if exclude_replies:
+        parts.append("-filter:replies")
+    return " ".join(parts)
+
+
+class RateLimited(Exception):
+    """The endpoint's quota will not come back within max_wait."""
+
+
+class EndpointLimit:
+    def __init__(self):
+        self.limit = None
+        self.remaining = None  # None: unknown, no response seen in this window
+        self.reset = 0.0       # epoch seconds
+        self.next_slot = 0.0   # earliest time the next request may go out
+        self.lock = asyncio.Lock()
+
+    def update(self, limit, remaining, reset):
+        if reset != self.reset or self.remaining is None:
+            self.remaining = remaining
+        else:
+            # responses can land out of order; in-flight requests were already counted
+            self.remaining = min(self.remaining, remaining)
+        self.limit = limit
+        self.reset = reset
+
+    def snapshot(self):
+        return {
+            "limit": self.limit,
+            "remaining": self.remaining,
+            "reset_in": max(0, round(self.reset - time.time())),
+        }
+
+
+class SearchScheduler:
+    def __init__(self, client: Client, concurrency=X_SEARCH_CONCURRENCY, reserve=X_SEARCH_RESERVE,
+                 burst=X_SEARCH_BURST, max_wait=X_SEARCH_MAX_WAIT):
+        self.client = client
+        self.reserve = reserve
+        self.burst = burst
+        self.max_wait = max_wait
+        self.limits = {}  # endpoint -> EndpointLimit
+        self.requests = 0  # requests sent, for callers that budget their own usage
+        self._slots = asyncio.Semaphore(concurrency)
+        client.http.event_hooks["response"].append(self._on_response)
+
+    # --- public ---
+
+    async def search(self, query, product="Top", count=20, **kwargs):
+        return await self._request(
+            SEARCH_ENDPOINT, lambda: self.client.search_tweet(query, product, count=count, **kwargs))
+
+    async def stream(self, query, product="Top", count=20, accept=None, target=None,
+                     max_pages=X_SEARCH_MAX_PAGES, time_budget=X_SEARCH_TIME_BUDGET):
+        """
+        Async generator over search results, page by page.
+
+        accept(tweet) -> item or None filters and converts each tweet as its
+        page arrives; only accepted items are yielded. Paging stops once
+        `target` items were yielded, after `max_pages` pages, when the time
+        budget is spent or when X has no further cursor.
+        """
+        deadline = time.monotonic() + time_budget
+        page = await self.search(query, product, count=count)
+        pages, yielded, ids = 1, 0, set()
+        while True:
+            for tw in page:
+                tweet_id = getattr(tw, "id", None)
+                if tweet_id in ids:  # cursors can overlap
+                    continue
+                ids.add(tweet_id)
+                item = accept(tw) if accept else tw
+                if item is None:
+                    continue
+                yield item
+                yielded += 1
+                if target and yielded >= target:
+                    return
+            if not len(page) or not page.next_cursor or pages >= max_pages or time.monotonic() >= deadline:
+                return
+            page = await self._request(SEARCH_ENDPOINT, page.next)
+            pages += 1
+
+    async def search_many(self, queries, product="Top", count=20, **kwargs):
+        """{query: Result | Exception} for every query, searched concurrently."""
+        queries = list(dict.fromkeys(queries))
+        results = await asyncio.gather(
+            *(self.search(q, product, count=count, **kwargs) for q in queries),
+            return_exceptions=True
+        )
+        return dict(zip(queries, results))
+
+    def snapshot(self):
+        return {name: state.snapshot() for name, state in self.limits.items()}
+
+    # --- internals ---
+
+    async def _request(self, endpoint, fetch):
+        async with self._slots:
+            for attempt in range(2):
+                await self._wait_turn(endpoint)
+                self.requests += 1
+                try:
+                    return await fetch()
+                except TooManyRequests as e:
+                    self._park(endpoint, e.rate_limit_reset)
+                    if attempt:
+                        raise
+
+    def _state(self, endpoint):
+        state = self.limits.get(endpoint)
+        if state is None:
+            state = self.limits[endpoint] = EndpointLimit()
+        return state
+
+    async def _on_response(self, response):
+        headers = response.headers
+        if "x-rate-limit-remaining" not in headers:
+            return
+        try:
+            limit = int(headers.get("x-rate-limit-limit", 0)) or None
+            remaining = int(headers["x-rate-limit-remaining"])
+            reset = float(headers.get("x-rate-limit-reset", 0))
+        except ValueError:
+            return
+        endpoint = urlparse(str(response.request.url)).path.rsplit("/", 1)[-1]
+        self._state(endpoint).update(limit, remaining, reset)
+
+    def _park(self, endpoint, reset):
+        state = self._state(endpoint)
+        state.remaining = 0
+        state.reset = float(reset) if reset else time.time() + DEFAULT_BACKOFF
+        cprint(f" [X-SEARCH] 429 on {endpoint}, parked for {state.reset - time.time():.0f}s",
+               color=Colors.Text.YELLOW)
+
+    async def _wait_turn(self, endpoint):
+        state = self._state(endpoint)
+        # The lock is held while sleeping on purpose: it is what spaces requests out.
+        async with state.lock:
+            now = time.time()
+            if state.remaining is not None and now >= state.reset:
+                state.remaining = None  # window rolled over
+
+            if state.remaining is not None and state.remaining <= self.reserve:
+                wait = state.reset - now
+            else:
+                wait = state.next_slot - now
+            if wait > self.max_wait:
+                raise RateLimited(f"{endpoint} quota resets in {wait:.0f}s")
+            if wait > 0:
+                await asyncio.sleep(wait)
+                now = time.time()
+                if now >= state.reset:
+                    state.remaining = None
+
+            interval = 0.0
+            if state.remaining is not None and state.remaining <= self.burst and state.reset > now:
+                interval = (state.reset - now) / max(state.remaining - self.reserve, 1)
+            state.next_slot = now + interval
+            if state.remaining is not None:
+                state.remaining -= 1
+
+
+_schedulers = weakref.WeakKeyDictionary()
+
+
+def get_scheduler(client: Client) -> SearchScheduler:
+    """One scheduler per client, so quota tracking survives across cycles."""
+    if not isinstance(client, Client):
+        return client  # already schedules its own searches (core.x_pool.ClientPool)
+    scheduler = _schedulers.get(client)
+    if scheduler is None:
+        scheduler = _schedulers[client] = SearchScheduler(client)
+    return scheduler
@@ -0,0 +1,86 @@
+# shared X session
+
+"""
+Long-lived X session for the web front ends.
+
+Flask and Streamlit handlers are synchronous and run on arbitrary threads,
+while twikit is asyncio based. Instead of building a Client, logging in and
+tearing down an event loop per request, one ClientPool (core.x_pool) lives on
+a dedicated event loop thread. It is started lazily on first use; handlers
+submit coroutines to that loop with x_session.run(). A background task
+re-checks the accounts every X_SESSION_REFRESH_SECONDS so the login cost
+stays off the request path.
+"""
+
+import asyncio
+import threading
+
+from core.configs import X_SESSION_REFRESH_SECONDS
+from core.colored import cprint, Colors
+from core.x_pool import ClientPool
+
+
+class XSession:
+    def __init__(self, refresh_seconds=X_SESSION_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self.client = None  # ClientPool, bound to self._loop
+        self._loop = None
+        self._thread = None
+        self._refresher = None
+        self._lock = threading.Lock()
+
+    # --- public ---
+
+    def run(self, coro_fn, timeout=None):
+        """
+        Runs coro_fn(client) on the session loop and returns its result,
+        blocking the calling thread. Starts the session on first use.
+        """
+        self._ensure_started()
+        future = asyncio.run_coroutine_threadsafe(coro_fn(self.client), self._loop)
+        return future.result(timeout)
+
+    def close(self):
+        with self._lock:
+            if self._loop is not None:
+                self._refresher.cancel()
+                self._loop.call_soon_threadsafe(self._loop.stop)
+                self._thread.join(timeout=5)
+                self._loop = self._thread = self.client = None
+
+    # --- internals ---
+
+    def _ensure_started(self):
+        if self._loop is not None:
+            return
+        with self._lock:
+            if self._loop is not None:
+                return
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name="x-session", daemon=True)
+            thread.start()
+
+            async def start():
+                client = ClientPool()
+                await client.start()
+                return client
+
+            # asyncio primitives inside the pool bind to the loop they are used
+            # on, so the pool is built on the session loop itself.
+            self.client = asyncio.run_coroutine_threadsafe(start(), loop).result()
+            self._refresher = asyncio.run_coroutine_threadsafe(self._refresh_forever(), loop)
+            self._loop, self._thread = loop, thread
+            cprint(" [X-SESSION] Shared X session started.", color=Colors.Text.GREEN)
+
+    async def _refresh_forever(self):
+        while True:
+            await asyncio.sleep(self.refresh_seconds)
+            try:
+                healthy = await self.client.refresh()
+                cprint(f" [X-SESSION] Refreshed: {healthy}/{len(self.client.accounts)} accounts healthy.",
+                       color=Colors.Text.CYAN)
+            except Exception as e:
+                cprint(f" [X-SESSION] Refresh failed: {e}", color=Colors.Text.RED)
+
+
+x_session = XSession()
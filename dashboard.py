@@ -1,16 +1,17 @@
 import streamlit as st
 import os
-import json
 import pandas as pd
 from datetime import datetime, timezone
-import urllib.parse
-from collections import Counter
 import shutil
-import asyncio
 
 from core.bot import update_from_trends
 
 from core.configs import NEWS_DATA_STORE_DIR
+from core.store import news_store
+from core.feed_cache import FeedCache
+from core.search_index import search_index
+from core.x_session import x_session
+from core.utils import clean_sources, with_display_fields
 
 # Ensure directory exists
 if not os.path.exists(NEWS_DATA_STORE_DIR):
@@ -156,25 +157,6 @@ st.markdown("""<style>
 # --- HELPERS ---
 
 
-def safe_parse_timestamp(ts_str):
-    """
-    Parses timestamp string. 
-    Returns a datetime object.
-    """
-    if not ts_str:
-        return datetime.now()
-    try:
-        # Standard ISO parsing (handles +00:00)
-        return datetime.fromisoformat(ts_str)
-    except Exception:
-        try:
-            # Fallback for weird formats, try ignoring TZ
-            clean_ts = ts_str.split('+')[0].split('.')[0].replace('Z', '')
-            return datetime.strptime(clean_ts, "%Y-%m-%dT%H:%M:%S")
-        except:
-            return datetime.now()
-
-
 def get_relative_time(dt):
     """
     Calculates time ago, handling both Aware and Naive datetimes.
@@ -207,76 +189,36 @@ def get_relative_time(dt):
     return dt.strftime("%Y-%m-%d")
 
 
-def to_bold_unicode(text):
-    if not text:
-        return ""
-    normal = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789"
-    bold = "𝗔𝗕𝗖𝗗𝗘𝗙𝗚𝗛𝗜𝗝𝗞𝗟𝗠𝗡𝗢𝗣𝗤𝗥𝗦𝗧𝗨𝗩𝗪𝗫𝗬𝗭" \
-           "𝗮𝗯𝗰𝗱𝗲𝗳𝗴𝗵𝗶𝗷𝗸𝗹𝗺𝗻𝗼𝗽𝗾𝗿𝘀𝘁𝘂𝘃𝘄𝘅𝘆𝘇" \
-           "𝟬𝟭𝟮𝟯𝟰𝟱𝟲𝟕𝟴𝟵"
-    return text.translate(str.maketrans(normal, bold))
+def build_record(data):
+    data = with_display_fields(data)
+    return {
+        "id": data.get("id"),
+        "headline": data.get("headline_str") or "Untitled",
+        "content": data.get("content_str") or "",
+        "tags": data["display_tags_list"],
+        "sources": clean_sources(data.get("source_list", [])),
+        "datetime": datetime.fromtimestamp(data["timestamp_epoch"]),
+        "fmt_time": data["fmt_time_str"],
+        "x_link": data["x_intent_url"]
+    }
 
 
-@st.cache_data(ttl=2)
-def load_data():
-    items = []
-
-    if not os.path.exists(NEWS_DATA_STORE_DIR):
-        return pd.DataFrame()
-
-    folders = os.listdir(NEWS_DATA_STORE_DIR)
-
-    for folder in folders:
-        folder_path = os.path.join(NEWS_DATA_STORE_DIR, folder)
-        json_path = os.path.join(folder_path, "data.json")
-
-        if not os.path.exists(json_path):
-            continue
-
-        try:
-            with open(json_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-
-            # --- PARSING ---
-            item_id = data.get("id", folder)
-            dt = safe_parse_timestamp(data.get("timestamp_str"))
-            headline = data.get("headline_str") or "Untitled"
-            content = data.get("content_str") or ""
-
-            # Tags
-            raw_tags = data.get("tags_list", [])
-            if raw_tags is None:
-                raw_tags = []
-            if isinstance(raw_tags, str):
-                raw_tags = raw_tags.split()
-            tags = [str(t).replace("#", "").strip() for t in raw_tags if t]
-
-            # Sources
-            raw_sources = data.get("source_list", [])
-            if raw_sources is None:
-                raw_sources = []
-            if isinstance(raw_sources, str):
-                raw_sources = raw_sources.split()
-            sources = [str(s) for s in raw_sources if s]
-
-            items.append({
-                "id": item_id,
-                "headline": headline,
-                "content": content,
-                "tags": tags,
-                "sources": sources,
-                "datetime": dt,
-                "display_time": get_relative_time(dt)
-            })
-        except Exception as e:
-            print(f"Skipped {folder}: {e}")
-            continue
-
-    df = pd.DataFrame(items)
-    if not df.empty:
-        df = df.sort_values(by="datetime", ascending=False)
+@st.cache_resource
+def get_feed_cache():
+    # One cache per server process, shared by every session and rerun
+    return FeedCache(build_record)
+
+
+@st.cache_data(max_entries=1)
+def build_frame(version):
+    # Rebuilt only when the feed cache reports a change
+    return pd.DataFrame(get_feed_cache().items())
 
-    return df
+
+def load_data():
+    feed_cache = get_feed_cache()
+    feed_cache.refresh()
+    return build_frame(feed_cache.version)
 
 
 # --- APP LAYOUT ---
@@ -336,10 +278,10 @@ with st.sidebar:
         if st.button("Run Update", type="primary", use_container_width=True):
             if st.session_state["trending_keywords"]:
                 with st.spinner("Updating from trends..."):
-                    asyncio.run(update_from_trends(
-                        keywords=st.session_state["trending_keywords"]))
+                    keywords = list(st.session_state["trending_keywords"])
+                    x_session.run(lambda client: update_from_trends(client=client, keywords=keywords))
                 st.success("Maal Updated!")
-                st.cache_data.clear()
+                get_feed_cache().invalidate()
                 st.rerun()
             else:
                 st.warning("Please add at least one keyword.")
@@ -348,19 +290,18 @@ with st.sidebar:
     # ---------------------------
 
     if not df.empty:
-        all_tags = [t for tags in df["tags"] for t in tags]
-        # Count tags
-        if all_tags:
-            tag_counts = Counter(all_tags).most_common(20)
+        # Maintained tag aggregates from the store, no per-rerun recount
+        tag_counts = news_store.tag_counts(20)
+        if tag_counts:
             c1, c2 = st.columns(2)
             c1.metric("News", len(df))
-            c2.metric("Topics", len(set(all_tags)))
+            c2.metric("Topics", news_store.unique_tag_count())
 
             st.markdown("---")
             st.markdown("**Topics**")
             selected_tag = st.radio(
                 "Filter",
-                ["All"] + [f"#{t} ({c})" for t, c in tag_counts],
+                ["All"] + [f"#{t} ({c})" for t, c, _ in tag_counts],
                 label_visibility="collapsed"
             )
         else:
@@ -380,7 +321,7 @@ with c_search:
         "Search", placeholder="Search headlines...", label_visibility="collapsed")
 with c_btn:
     if st.button("Refresh", use_container_width=True):
-        st.cache_data.clear()
+        get_feed_cache().invalidate()
         st.rerun()
 
 st.write("")
@@ -390,16 +331,17 @@ filtered_df = df.copy()
 
 if not filtered_df.empty:
     if search_query:
-        filtered_df = filtered_df[
-            filtered_df["headline"].str.contains(search_query, case=False, na=False) |
-            filtered_df["content"].str.contains(
-                search_query, case=False, na=False)
-        ]
+        # Ranked lookup in the inverted index instead of scanning every row
+        hit_ids, _ = search_index.search(search_query, limit=len(filtered_df))
+        rank = {item_id: i for i, item_id in enumerate(hit_ids)}
+        filtered_df = filtered_df[filtered_df["id"].isin(rank)]
+        filtered_df = filtered_df.sort_values(
+            by="id", key=lambda ids: ids.map(rank))
 
     if selected_tag != "All":
-        target_tag = selected_tag.split(" (")[0].replace("#", "")
-        filtered_df = filtered_df[filtered_df["tags"].apply(
-            lambda x: target_tag in x)]
+        target_tag = selected_tag.rsplit(" (", 1)[0]
+        filtered_df = filtered_df[filtered_df["id"].isin(
+            news_store.ids_for_tag(target_tag))]
 
 # RENDER
 if filtered_df.empty:
@@ -416,14 +358,13 @@ else:
     for _, row in filtered_df.iterrows():
         with st.container(border=True):
 
-            # META (Time)
-            # We format datetime carefully
-            dt_str = row['datetime'].strftime('%b %d, %I:%M %p')
+            # META (Time) - only the relative label is computed per rerun
+            dt_str = row['fmt_time']
 
             st.markdown(f"""
                 <div class='meta-mono'>
                     <span style='color:#fff'>● Live</span>
-                    <span>{row['display_time']}</span>
+                    <span>{get_relative_time(row['datetime'])}</span>
                     <span style='opacity:0.3'>|</span>
                     <span>{dt_str}</span>
                 </div>
@@ -457,16 +398,8 @@ else:
                 st.markdown("<div style='height:10px'></div>",
                             unsafe_allow_html=True)
 
-                # Post to X
-                tweet_body = (
-                    to_bold_unicode(row["headline"]) + "\n\n" +
-                    row["content"] + "\n\n" +
-                    " ".join([f"#{t}" for t in row['tags']])
-                )
-                x_intent = "https://x.com/intent/tweet?text=" + \
-                    urllib.parse.quote(tweet_body)
-
-                st.link_button("Post on 𝕏", x_intent,
+                # Post to X (intent link prebuilt at save time)
+                st.link_button("Post on 𝕏", row["x_link"],
                                type="primary", use_container_width=True)
 
                 # Delete Logic
@@ -482,10 +415,13 @@ else:
                     c_y, c_n = st.columns(2)
                     if c_y.button("Yes", key=f"y_{row['id']}", use_container_width=True):
                         try:
-                            shutil.rmtree(os.path.join(
-                                NEWS_DATA_STORE_DIR, row['id']))
+                            target_path = news_store.item_folder(row['id'])
+                            # folder first: if it cannot be removed, the item stays indexed and visible
+                            if os.path.exists(target_path):
+                                shutil.rmtree(target_path)
+                            news_store.delete(row['id'])
                             st.session_state[conf_key] = False
-                            st.cache_data.clear()
+                            get_feed_cache().invalidate()
                             st.rerun()
                         except Exception as e:
                             st.error(str(e))